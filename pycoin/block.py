@@ -1,11 +1,14 @@
 from __future__ import annotations
 
 import io
-from typing import Any, IO
+import struct
+from collections.abc import Sequence
+from typing import Any, IO, overload
 
 from .encoding.hash import double_sha256
-from .encoding.hexbytes import b2h, b2h_rev
-from .merkle import merkle
+from .encoding.hexbytes import b2h, b2h_rev, bytes_as_revhex
+from .merkle import merkle, MerkleTree
+from .satoshi.satoshi_int import unpack_satoshi_int_from
 from .satoshi.satoshi_struct import parse_struct, stream_struct
 
 
@@ -13,23 +16,203 @@ class BadMerkleRootError(Exception):
     pass
 
 
+def target_for_bits(bits: int) -> int:
+    """
+    Return the target encoded in the compact "bits" form used by block headers.
+    Raises ValueError for negative targets or ones that don't fit in 256 bits.
+    """
+    size = bits >> 24
+    word = bits & 0x007FFFFF
+    if size <= 3:
+        target = word >> (8 * (3 - size))
+    else:
+        target = word << (8 * (size - 3))
+    if word and bits & 0x00800000:
+        raise ValueError("negative target in bits %08x" % bits)
+    if target >> 256:
+        raise ValueError("target in bits %08x overflows" % bits)
+    return target
+
+
+def work_for_bits(bits: int) -> int:
+    """
+    Return the expected number of hashes needed to find a block with the
+    given bits, the amount it adds to a chain's total work. A zero target
+    can't be met, so it's worth nothing.
+    """
+    target = target_for_bits(bits)
+    if target == 0:
+        return 0
+    return (1 << 256) // (target + 1)
+
+
+def bits_for_target(target: int) -> int:
+    """
+    Return the compact "bits" form of a target, the inverse of
+    :func:`target_for_bits` (bits round the target down to three bytes).
+    """
+    size = (target.bit_length() + 7) // 8
+    if size <= 3:
+        word = target << (8 * (3 - size))
+    else:
+        word = target >> (8 * (size - 3))
+    # the top bit of the word is the sign
+    if word & 0x00800000:
+        word >>= 8
+        size += 1
+    return word | (size << 24)
+
+
 def difficulty_max_mask_for_bits(bits: int) -> int:
     prefix = bits >> 24
     mask = (bits & 0x7FFFF) << (8 * (prefix - 3))
     return mask
 
 
+class LazyTxList(Sequence[Any]):
+    """
+    The transactions of a block that was parsed lazily: transaction boundaries
+    are found by skipping over fields, and a Tx is only parsed the first time it's
+    looked up. The ids come straight from the raw bytes.
+
+    The buffer the block was parsed from must not change while this is in use.
+    """
+
+    def __init__(
+        self,
+        tx_class: Any,
+        buf: bytes | memoryview,
+        scans: list[tuple[int, int, int, int]],
+        base: int = 0,
+        include_offsets: Any = None,
+    ) -> None:
+        self.tx_class = tx_class
+        self.block: Any = None
+        self._buf = buf
+        # (start, io_start, io_end, end) of each transaction in buf
+        self._scans = scans
+        self._base = base
+        self._include_offsets = include_offsets
+        self._txs: list[Any] = [None] * len(scans)
+        self._hashes: list[bytes | None] = [None] * len(scans)
+
+    @classmethod
+    def scan(
+        class_: type[LazyTxList],
+        tx_class: Any,
+        buf: bytes | memoryview,
+        offset: int,
+        count: int,
+        base: int = 0,
+        include_offsets: Any = None,
+    ) -> tuple[LazyTxList, int]:
+        """
+        Find the boundaries of count transactions in buf starting at offset.
+        Raises NotImplementedError if tx_class can't scan its format.
+        """
+        scan_buffer = tx_class.scan_buffer
+        scans = []
+        for i in range(count):
+            io_start, io_end, end = scan_buffer(buf, offset)
+            scans.append((offset, io_start, io_end, end))
+            offset = end
+        return class_(tx_class, buf, scans, base, include_offsets), offset
+
+    def __len__(self) -> int:
+        return len(self._scans)
+
+    @overload
+    def __getitem__(self, index: int) -> Any: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[Any]: ...
+
+    def __getitem__(self, index: int | slice) -> Any:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        tx = self._txs[index]
+        if tx is None:
+            start = self._scans[index][0]
+            tx = self.tx_class.from_buffer(self._buf, start)[0]
+            if self.block is not None:
+                tx.block = self.block
+            if self._include_offsets:
+                tx.offset_in_block = start - self._base
+            self._txs[index] = tx
+        return tx
+
+    def is_parsed(self, index: int) -> bool:
+        return self._txs[index] is not None
+
+    def spans(self) -> list[tuple[int, int]]:
+        """Return (offset in block, length) of each transaction."""
+        return [(start - self._base, end - start) for start, _, _, end in self._scans]
+
+    def tx_bin(self, index: int) -> bytes:
+        """Return the bytes the transaction was parsed from."""
+        start, _, _, end = self._scans[index]
+        return bytes(self._buf[start:end])
+
+    def tx_hash(self, index: int) -> bytes:
+        """Return the hash of a transaction without parsing it, unless it already was."""
+        tx = self._txs[index]
+        if tx is not None:
+            return tx.hash()  # type: ignore[no-any-return]
+        h = self._hashes[index]
+        if h is None:
+            start, io_start, io_end, end = self._scans[index]
+            buf = self._buf
+            preimage: Any
+            if io_start == start + 4 and io_end == end - 4:
+                preimage = buf[start:end]
+            else:
+                preimage = b"".join(
+                    [buf[start : start + 4], buf[io_start:io_end], buf[end - 4 : end]]
+                )
+            h = self._hashes[index] = self.tx_class.HASH_F(preimage)
+        return h
+
+    def tx_hashes(self) -> list[bytes]:
+        return [self.tx_hash(i) for i in range(len(self))]
+
+    def stream(self, f: IO[bytes]) -> None:
+        """Stream the transactions; those never parsed are copied from the buffer."""
+        for i, tx in enumerate(self._txs):
+            if tx is None:
+                start, _, _, end = self._scans[i]
+                f.write(self._buf[start:end])
+            else:
+                tx.stream(f)
+
+
 class Block(object):
     """A Block is an element of the Bitcoin chain."""
 
     Tx: Any = None
 
+    height: int | None
+
+    __slots__ = (
+        "version",
+        "previous_block_hash",
+        "merkle_root",
+        "timestamp",
+        "difficulty",
+        "nonce",
+        "txs",
+        "__hash",
+        # only set by some sources of block headers
+        "height",
+        "info",
+        "index",
+    )
+
     @classmethod
     def make_subclass(class_: type[Block], symbol: str, tx: Any) -> type[Block]:
         return type(
             "%s_%s" % (symbol, class_.__name__),
             (class_,),
-            dict(Tx=tx),
+            dict(Tx=tx, __slots__=()),
         )
 
     @classmethod
@@ -46,10 +229,88 @@ class Block(object):
         block = class_.parse_as_header(f)
         if include_transactions:
             count = parse_struct("I", f)[0]
-            txs = block._parse_transactions(f, count, include_offsets=include_offsets)
+            getbuffer = getattr(f, "getbuffer", None)
+            if getbuffer and class_.Tx.has_buffer_parser():
+                # parse straight out of the underlying buffer of an io.BytesIO
+                with getbuffer() as buf:
+                    txs, offset = class_._parse_transactions_from_buffer(
+                        buf, f.tell(), count, include_offsets=include_offsets
+                    )
+                f.seek(offset)
+            else:
+                txs = block._parse_transactions(
+                    f, count, include_offsets=include_offsets
+                )
             block.set_txs(txs, check_merkle_hash=check_merkle_hash)
         return block
 
+    @classmethod
+    def from_buffer(
+        class_: type[Block],
+        buf: bytes | memoryview,
+        offset: int = 0,
+        include_transactions: bool = True,
+        include_offsets: Any = None,
+        check_merkle_hash: bool = True,
+        lazy: bool = False,
+    ) -> tuple[Block, int]:
+        """
+        Parse the Block from a bytes-like object (bytes, bytearray, memoryview, mmap)
+        starting at offset. Returns the block and the offset just past its end.
+
+        If lazy is set, block.txs is a :class:`LazyTxList` that parses each Tx only
+        when it's looked up, and keeps a reference to buf.
+        """
+        mv = memoryview(buf)
+        block_offset = offset
+        block, offset = class_.header_from_buffer(mv, offset)
+        if include_transactions:
+            count, offset = unpack_satoshi_int_from(mv, offset)
+            txs: Any = None
+            if lazy:
+                try:
+                    txs, offset = LazyTxList.scan(
+                        class_.Tx, mv, offset, count, block_offset, include_offsets
+                    )
+                except NotImplementedError:
+                    # this Tx class can't be scanned, so parse it up front
+                    pass
+            if txs is None:
+                txs, offset = class_._parse_transactions_from_buffer(
+                    mv,
+                    offset,
+                    count,
+                    include_offsets=include_offsets,
+                    base=block_offset,
+                )
+            block.set_txs(txs, check_merkle_hash=check_merkle_hash)
+        return block, offset
+
+    @classmethod
+    def header_from_buffer(
+        class_: type[Block], buf: bytes | memoryview, offset: int = 0
+    ) -> tuple[Block, int]:
+        """
+        Parse the Block header from buf starting at offset. Returns the block
+        header and the offset just past its end.
+        """
+        if class_.parse_as_header.__func__ is not Block.parse_as_header.__func__:  # type: ignore[attr-defined]
+            # this subclass has its own header format
+            f = io.BytesIO(memoryview(buf)[offset:])
+            return class_.parse_as_header(f), offset + f.tell()
+        (version, previous_block_hash, merkle_root, timestamp, difficulty, nonce) = (
+            struct.unpack_from("<L32s32sLLL", buf, offset)
+        )
+        block = class_(
+            version,
+            bytes_as_revhex(previous_block_hash),
+            bytes_as_revhex(merkle_root),
+            timestamp,
+            difficulty,
+            nonce,
+        )
+        return block, offset + 80
+
     @classmethod
     def parse_as_header(class_: type[Block], f: IO[bytes]) -> Block:
         """
@@ -64,8 +325,7 @@ class Block(object):
 
     @classmethod
     def from_bin(class_: type[Block], bytes: bytes) -> Block:
-        f = io.BytesIO(bytes)
-        return class_.parse(f)
+        return class_.from_buffer(bytes)[0]
 
     def __init__(
         self,
@@ -86,8 +346,10 @@ class Block(object):
 
     def set_nonce(self, nonce: int) -> None:
         self.nonce = nonce
-        if hasattr(self, "__hash"):
-            del self.__hash  # type: ignore[misc]
+        try:
+            del self.__hash
+        except AttributeError:
+            pass
 
     def _calculate_hash(self) -> bytes:
         s = io.BytesIO()
@@ -98,9 +360,11 @@ class Block(object):
         """Calculate the hash for the block header. Note that this has the bytes
         in the opposite order from how the header is usually displayed (so the
         long string of 00 bytes is at the end, not the beginning)."""
-        if not hasattr(self, "__hash"):
-            self.__hash = self._calculate_hash()  # type: ignore[misc]
-        return self.__hash  # type: ignore[misc,return-value]
+        try:
+            return self.__hash  # type: ignore[has-type,no-any-return]
+        except AttributeError:
+            self.__hash = self._calculate_hash()
+            return self.__hash
 
     @classmethod
     def _parse_transactions(
@@ -119,12 +383,34 @@ class Block(object):
                 tx.offset_in_block = offset_in_block
         return txs
 
+    @classmethod
+    def _parse_transactions_from_buffer(
+        class_: type[Block],
+        buf: bytes | memoryview,
+        offset: int,
+        count: int,
+        include_offsets: Any = None,
+        base: int = 0,
+    ) -> tuple[list[Any], int]:
+        txs = []
+        from_buffer = class_.Tx.from_buffer
+        for i in range(count):
+            tx, end = from_buffer(buf, offset)
+            txs.append(tx)
+            if include_offsets:
+                tx.offset_in_block = offset - base
+            offset = end
+        return txs, offset
+
     def set_txs(self, txs: list[Any], check_merkle_hash: bool = True) -> None:
         self.txs = txs
         if not txs:
             return
-        for tx in txs:
-            tx.block = self
+        if isinstance(txs, LazyTxList):
+            txs.block = self
+        else:
+            for tx in txs:
+                tx.block = self
         if check_merkle_hash:
             self.check_merkle_hash()
 
@@ -154,6 +440,9 @@ class Block(object):
     def _stream_transactions(self, f: IO[bytes]) -> None:
         if self.txs:
             stream_struct("I", f, len(self.txs))
+            if isinstance(self.txs, LazyTxList):
+                self.txs.stream(f)
+                return
             for tx in self.txs:
                 tx.stream(f)
 
@@ -183,10 +472,23 @@ class Block(object):
         they are usually displayed in."""
         return b2h_rev(self.previous_block_hash)
 
+    def tx_hashes(self) -> list[bytes]:
+        """Return the hashes of the transactions, without parsing them if the
+        block was parsed lazily."""
+        if isinstance(self.txs, LazyTxList):
+            return self.txs.tx_hashes()
+        return [tx.hash() for tx in self.txs]
+
+    def merkle_tree(self) -> MerkleTree:
+        """Return a :class:`MerkleTree <pycoin.merkle.MerkleTree>` of the transaction
+        hashes. Keep it around to produce merkle branches and partial merkle trees
+        without rehashing the whole block each time."""
+        return MerkleTree(self.tx_hashes(), double_sha256)
+
     def check_merkle_hash(self) -> None:
         """Raise a BadMerkleRootError if the Merkle hash of the
         transactions does not match the Merkle hash included in the block."""
-        calculated_hash = merkle([tx.hash() for tx in self.txs], double_sha256)
+        calculated_hash = merkle(self.tx_hashes(), double_sha256)
         if calculated_hash != self.merkle_root:
             raise BadMerkleRootError(
                 "calculated %s but block contains %s"
@@ -5,9 +5,13 @@ import weakref
 from collections.abc import Callable, Generator, Iterable
 from typing import Any
 
+from pycoin.block import work_for_bits
+from pycoin.coins.exceptions import HeaderValidationError
 from pycoin.encoding.hexbytes import b2h_rev
 
 from .ChainFinder import ChainFinder
+from .HeaderValidator import HeaderValidator
+from .LockedHeaderChain import LockedHeaderChain, header_bytes_for
 
 logger = logging.getLogger(__name__)
 ZERO_HASH = b"\0" * 32
@@ -34,6 +38,7 @@ class BlockChain(object):
         parent_hash: bytes = ZERO_HASH,
         unlocked_block_storage: dict[bytes, Any] = {},
         did_lock_to_index_f: Callable[..., Any] | None = None,
+        header_validator: HeaderValidator | None = None,
     ) -> None:
         self.parent_hash = parent_hash
         self.hash_to_index_lookup: dict[bytes, int] = {}
@@ -43,10 +48,35 @@ class BlockChain(object):
         self._longest_chain_cache: list[Any] | None = None
         self.did_lock_to_index_f = did_lock_to_index_f
         self.unlocked_block_storage = unlocked_block_storage
+        self.header_validator = header_validator
 
-        self._locked_chain: list[Any] = []
+        # for unlocked blocks descended from parent_hash: hash => (total work
+        # from parent_hash, count of blocks from parent_hash)
+        self.chain_work: dict[Any, tuple[int, int]] = {}
+        self._children: dict[Any, list[Any]] = {}
+        self._best_tip: Any = None
+
+        self._locked_chain: Any = []
 
     def preload_locked_blocks(self, headers_iter: Iterable[Any]) -> None:
+        """
+        Set the locked chain to headers_iter, an iterable of headers or a
+        LockedHeaderChain. A LockedHeaderChain is used as is (later locked
+        blocks are appended to it), and its hashes stay out of
+        hash_to_index_lookup. It must start at parent_hash, or a ValueError
+        is raised.
+        """
+        if isinstance(headers_iter, LockedHeaderChain):
+            if headers_iter.parent_hash != self.parent_hash:
+                raise ValueError(
+                    "locked chain starts at %s, not at the parent hash %s"
+                    % (b2h_rev(headers_iter.parent_hash), b2h_rev(self.parent_hash))
+                )
+            self._locked_chain = headers_iter
+            if len(headers_iter):
+                self.parent_hash = headers_iter.hash_for_index(-1)
+            self._rebuild_chain_work()
+            return
         self._locked_chain = []
         the_hash = self.parent_hash
         for idx, h in enumerate(headers_iter):
@@ -54,9 +84,10 @@ class BlockChain(object):
             self._locked_chain.append((the_hash, h.previous_block_hash, h.difficulty))
             self.hash_to_index_lookup[the_hash] = idx
         self.parent_hash = the_hash
+        self._rebuild_chain_work()
 
     def is_hash_known(self, the_hash: bytes) -> bool:
-        return the_hash in self.hash_to_index_lookup
+        return self.index_for_hash(the_hash) is not None
 
     def length(self) -> int:
         return len(self._longest_local_block_chain()) + len(self._locked_chain)
@@ -76,10 +107,8 @@ class BlockChain(object):
         index -= size
 
         longest_chain = self._longest_local_block_chain()
-        the_hash = longest_chain[-index - 1]
-        parent_hash = (
-            self.parent_hash if index <= 0 else self._longest_chain_cache[-index]  # type: ignore[index]
-        )
+        the_hash = longest_chain[index]
+        parent_hash = self.parent_hash if index <= 0 else longest_chain[index - 1]
         weight = self.weight_lookup.get(the_hash)
         return (the_hash, parent_hash, weight)
 
@@ -92,7 +121,10 @@ class BlockChain(object):
         return self.tuple_for_index(index)[0]  # type: ignore[no-any-return]
 
     def index_for_hash(self, the_hash: bytes) -> int | None:
-        return self.hash_to_index_lookup.get(the_hash)
+        index = self.hash_to_index_lookup.get(the_hash)
+        if index is None and isinstance(self._locked_chain, LockedHeaderChain):
+            index = self._locked_chain.index_for_hash(the_hash)
+        return index
 
     def add_change_callback(self, callback: Callable[..., Any]) -> None:
         self.change_callbacks.add(callback)
@@ -106,50 +138,233 @@ class BlockChain(object):
         excluded: set[Any] = set()
         the_hash: Any = None
         for idx in range(index):
-            the_hash = longest_chain[-idx - 1]
-            parent_hash = (
-                self.parent_hash if idx <= 0 else self._longest_chain_cache[-idx]  # type: ignore[index]
-            )
-            weight = self.weight_lookup.get(the_hash)
-            item = (the_hash, parent_hash, weight)
-            self._locked_chain.append(item)
+            the_hash = longest_chain[idx]
+            parent_hash = self.parent_hash if idx <= 0 else longest_chain[idx - 1]
+            if isinstance(self._locked_chain, LockedHeaderChain):
+                header = self.block_for_hash(the_hash)
+                self._locked_chain.append_header(header_bytes_for(header), the_hash)
+                del self.hash_to_index_lookup[the_hash]
+            else:
+                weight = self.weight_lookup.get(the_hash)
+                self._locked_chain.append((the_hash, parent_hash, weight))
             excluded.add(the_hash)
         if self.did_lock_to_index_f:
             self.did_lock_to_index_f(
                 self._locked_chain[old_length : old_length + index], old_length
             )
-        old_chain_finder = self.chain_finder
-        self.chain_finder = ChainFinder()
+        self.chain_finder.prune(excluded)
         self._longest_chain_cache = None
-
-        def iterate() -> Generator[tuple[Any, Any], None, None]:
-            for tree in old_chain_finder.trees_from_bottom.values():
-                for c in tree:
-                    if c in excluded:
-                        break
-                    excluded.add(c)
-                    if c in old_chain_finder.parent_lookup:
-                        yield (c, old_chain_finder.parent_lookup[c])
-
-        self.chain_finder.load_nodes(iterate())
         self.parent_hash = the_hash
+        self._rebuild_chain_work()
+
+    def _block_work(self, h: Any) -> int:
+        try:
+            return work_for_bits(self.weight_lookup.get(h, 0))
+        except (TypeError, ValueError):
+            return 0
+
+    def _rebuild_chain_work(self) -> None:
+        previous_tip = self._best_tip
+        self.chain_work = {}
+        self._children = {}
+        self._best_tip = None
+        for h, parent in self.chain_finder.parent_lookup.items():
+            self._children.setdefault(parent, []).append(h)
+        self._connect(self.parent_hash)
+        # the order of _children decides ties here, so keep the tip seen first
+        # unless another has more work
+        previous_work = self.chain_work.get(previous_tip)
+        if previous_work is not None and previous_work >= self.chain_work.get(
+            self._best_tip, (-1, -1)
+        ):
+            self._best_tip = previous_tip
+
+    def _connect(self, h: Any) -> None:
+        # set the chain work of the descendants of h, and update the best tip
+        best_tip = self._best_tip
+        best = self.chain_work.get(best_tip, (-1, -1))
+        todo = [h]
+        while todo:
+            h = todo.pop()
+            work, count = self.chain_work.get(h, (0, 0))
+            for child in self._children.get(h, []):
+                v = (work + self._block_work(child), count + 1)
+                self.chain_work[child] = v
+                # on a tie, the tip seen first stays
+                if v > best:
+                    best_tip, best = child, v
+                todo.append(child)
+        self._best_tip = best_tip
+
+    def _add_nodes(self, nodes: list[tuple[Any, Any]]) -> None:
+        for h, parent in nodes:
+            self._children.setdefault(parent, []).append(h)
+        for h, parent in nodes:
+            if h in self.chain_work:
+                # connected as the descendant of an earlier node
+                continue
+            if parent != self.parent_hash and parent not in self.chain_work:
+                continue
+            work, count = self.chain_work.get(parent, (0, 0))
+            v = (work + self._block_work(h), count + 1)
+            self.chain_work[h] = v
+            if v > self.chain_work.get(self._best_tip, (-1, -1)):
+                self._best_tip = h
+            self._connect(h)
 
     def _longest_local_block_chain(self) -> list[Any]:
+        # the unlocked part of the best chain, first block first
         if self._longest_chain_cache is None:
-            max_weight = 0
             longest: list[Any] = []
-            for chain in self.chain_finder.all_chains_ending_at(self.parent_hash):
-                weight = sum(self.weight_lookup.get(h, 0) for h in chain)
-                if weight > max_weight:
-                    longest = chain
-                    max_weight = weight
-            self._longest_chain_cache = longest[:-1]
+            h = self._best_tip
+            parent_lookup = self.chain_finder.parent_lookup
+            while h is not None and h != self.parent_hash:
+                longest.append(h)
+                h = parent_lookup.get(h)
+            longest.reverse()
+            self._longest_chain_cache = longest
         return self._longest_chain_cache
 
+    def _move_to_best_tip(self, chain: list[Any]) -> tuple[list[Any], list[Any]]:
+        """
+        Change chain, the unlocked part of the best chain, in place to end at the
+        best tip, walking back from it only as far as the fork. Returns the
+        (old_path, new_path) of hashes removed and added, last block first.
+        """
+        locked_length = len(self._locked_chain)
+        new_path = []
+        h = self._best_tip
+        parent_lookup = self.chain_finder.parent_lookup
+        pos = -1
+        while h is not None and h != self.parent_hash:
+            index = self.hash_to_index_lookup.get(h)
+            if index is not None:
+                pos = index - locked_length
+                if 0 <= pos < len(chain) and chain[pos] == h:
+                    break
+                pos = -1
+            new_path.append(h)
+            h = parent_lookup.get(h)
+        old_path = chain[pos + 1 :]
+        old_path.reverse()
+        del chain[pos + 1 :]
+        chain.extend(reversed(new_path))
+        return old_path, new_path
+
     def block_for_hash(self, h: bytes) -> Any:
         return self.unlocked_block_storage.get(h)
 
+    def _height_for_hash(self, h: Any) -> int | None:
+        locked_length = len(self._locked_chain)
+        if h == self.parent_hash:
+            return locked_length - 1
+        if h in self.chain_work:
+            return locked_length + self.chain_work[h][1] - 1
+        index = self.index_for_hash(h)
+        if index is not None and index < locked_length:
+            return index
+        return None
+
+    def _locked_info(self, index: int) -> tuple[Any, int | None, int]:
+        # (parent hash, timestamp, bits); a list of tuples has no timestamps
+        _, parent_hash, bits = self._locked_chain[index]
+        timestamp = None
+        if isinstance(self._locked_chain, LockedHeaderChain):
+            timestamp = self._locked_chain.timestamp_for_index(index)
+        return parent_hash, timestamp, bits
+
+    def _ancestor_f(
+        self, h: Any, height: int, pending: dict[Any, Any]
+    ) -> Callable[[int], tuple[int | None, int] | None]:
+        """
+        Return a function giving the (timestamp, bits) of the block h at height,
+        or of its ancestor at a lower height, walking back only as far as asked.
+        """
+        locked_length = len(self._locked_chain)
+        found: dict[int, tuple[int | None, int] | None] = {}
+        cursor = [h, height]
+
+        def ancestor_f(ancestor_height: int) -> tuple[int | None, int] | None:
+            h, height = cursor
+            while height >= ancestor_height and ancestor_height not in found:
+                if height < locked_length and self.index_for_hash(h) == height:
+                    # the rest are locked, and can be looked up by index
+                    parent_hash, timestamp, bits = self._locked_info(ancestor_height)
+                    return timestamp, bits
+                header = pending.get(h)
+                if header is None:
+                    header = self.unlocked_block_storage.get(h)
+                if header is None:
+                    found[ancestor_height] = None
+                    break
+                found[height] = (header.timestamp, header.difficulty)
+                h, height = header.previous_block_hash, height - 1
+                cursor[:] = [h, height]
+            return found.get(ancestor_height)
+
+        return ancestor_f
+
+    def _check_headers(self, headers: list[Any]) -> None:
+        """
+        Check headers with header_validator in runs of consecutive ones, each
+        run against the headers it extends. Headers already known are skipped.
+        """
+        validator: Any = self.header_validator
+        pending: dict[Any, Any] = {}
+        heights: dict[Any, int] = {}
+        run: list[Any] = []
+        # the positions in headers of the run, and the height of its parent
+        run_indices: list[int] = []
+        parent_height = -1
+
+        def check_run() -> None:
+            parent_hash = run[0].previous_block_hash
+            ancestor_f = self._ancestor_f(parent_hash, parent_height, pending)
+            try:
+                validator.check_headers(run, parent_height + 1, ancestor_f)
+            except HeaderValidationError as ex:
+                if ex.header_index is not None:
+                    ex.header_index = run_indices[ex.header_index]
+                raise
+            for idx, header in enumerate(run):
+                pending[header.hash()] = header
+                heights[header.hash()] = parent_height + 1 + idx
+
+        for idx, header in enumerate(headers):
+            h = header.hash()
+            if h in pending or h == self.parent_hash or self.is_hash_known(h):
+                continue
+            if h in self.chain_finder.parent_lookup:
+                continue
+            previous_hash = header.previous_block_hash
+            if run and previous_hash == run[-1].hash():
+                run.append(header)
+                run_indices.append(idx)
+                continue
+            if run:
+                check_run()
+            height = heights.get(previous_hash)
+            if height is None:
+                height = self._height_for_hash(previous_hash)
+            if height is None:
+                raise HeaderValidationError("block doesn't connect to the chain", idx)
+            run, run_indices, parent_height = [header], [idx], height
+        if run:
+            check_run()
+
     def add_headers(self, header_iter: Iterable[Any]) -> list[Any]:
+        """
+        Add headers, and return a list of ("add" or "remove", header, index)
+        operations that took the best chain from what it was to what it is.
+
+        With a header_validator, the headers are all checked first, and if any
+        fails, none are added and the HeaderValidationError is raised. Headers
+        must then connect to known ones or to earlier headers in the batch.
+        """
+        if self.header_validator:
+            header_iter = list(header_iter)
+            self._check_headers(header_iter)
+
         def iterate() -> Generator[tuple[Any, Any], None, None]:
             for header in header_iter:
                 h = header.hash()
@@ -157,22 +372,17 @@ class BlockChain(object):
                 self.unlocked_block_storage[h] = header
                 yield h, header.previous_block_hash
 
-        old_longest_chain = self._longest_local_block_chain()
+        longest_chain = self._longest_local_block_chain()
+        old_size = len(longest_chain) + len(self._locked_chain)
+        old_tip = self._best_tip
 
-        self.chain_finder.load_nodes(iterate())
+        new_nodes = self.chain_finder.load_nodes(iterate())
+        self._add_nodes(new_nodes)
 
-        self._longest_chain_cache = None
-        new_longest_chain = self._longest_local_block_chain()
-
-        if old_longest_chain and new_longest_chain:
-            old_path, new_path = self.chain_finder.find_ancestral_path(
-                old_longest_chain[0], new_longest_chain[0]
-            )
-            old_path = old_path[:-1]
-            new_path = new_path[:-1]
-        else:
-            old_path = old_longest_chain
-            new_path = new_longest_chain
+        old_path: list[Any] = []
+        new_path: list[Any] = []
+        if self._best_tip != old_tip:
+            old_path, new_path = self._move_to_best_tip(longest_chain)
         if old_path:
             logger.debug("old_path is %r-%r", old_path[0], old_path[-1])
         if new_path:
@@ -182,12 +392,12 @@ class BlockChain(object):
         # return a list of operations:
         # ("add"/"remove", the_hash, the_index)
         ops: list[Any] = []
-        size = len(old_longest_chain) + len(self._locked_chain)
+        size = old_size
         for idx, h in enumerate(old_path):
             op = ("remove", self.block_for_hash(h), size - idx - 1)
             ops.append(op)
             del self.hash_to_index_lookup[h]
-        size = len(new_longest_chain) + len(self._locked_chain)
+        size = len(longest_chain) + len(self._locked_chain)
         for idx, h in reversed(list(enumerate(new_path))):
             op = ("add", self.block_for_hash(h), size - idx - 1)
             ops.append(op)
@@ -200,8 +410,8 @@ class BlockChain(object):
     def __repr__(self) -> str:
         local_block_chain = self._longest_local_block_chain()
         if local_block_chain:
-            finish = b2h_rev(local_block_chain[0])
-            start = b2h_rev(local_block_chain[-1])
+            start = b2h_rev(local_block_chain[0])
+            finish = b2h_rev(local_block_chain[-1])
             longest_chain = "longest chain %s to %s of size %d" % (
                 start,
                 finish,
@@ -1,76 +1,159 @@
 from __future__ import annotations
 
-from collections.abc import Generator, Iterable
+import array
+from collections.abc import Generator, Iterable, Iterator, Mapping
 from typing import Any
 
 
+# the parent id of a node whose parent isn't known
+NO_PARENT = -1
+
+
 class ChainFinder(object):
+    """
+    Assemble (hash, parent hash) nodes, given in any order, into trees.
+
+    Each hash is interned once as a small integer id, and parents are kept
+    in an array of ids. A tree is the path from a leaf up to the first node
+    whose parent isn't known (its top), and is kept as (top id, length)
+    rather than as a list; trees_from_bottom, descendents_by_top and
+    parent_lookup are read-only views in terms of hashes.
+    """
+
     def __init__(self) -> None:
-        self.parent_lookup: dict[Any, Any] = {}
-        self.descendents_by_top: dict[Any, set[Any]] = {}
-        self.trees_from_bottom: dict[Any, list[Any]] = {}
+        self._ids: dict[Any, int] = {}
+        self._hashes: list[Any] = []
+        self._parents = array.array("l")
+        self._free_ids: list[int] = []
+        self._node_count = 0
+        # leaf id => (top id, length of the path from the leaf to the top)
+        self._trees: dict[int, tuple[int, int]] = {}
+        self._leaves_by_top: dict[int, set[int]] = {}
+        self.parent_lookup = ParentLookup(self)
+        self.trees_from_bottom = TreesFromBottom(self)
+        self.descendents_by_top = DescendentsByTop(self)
 
     def __repr__(self) -> str:
         return "<ChainFinder: trees_fb:%s d_b_tops:%s>" % (
-            self.trees_from_bottom,
-            self.descendents_by_top,
+            dict(self.trees_from_bottom),
+            dict(self.descendents_by_top),
         )
 
-    def load_nodes(self, nodes: Iterable[tuple[Any, Any]]) -> None:
-        # register everything
-        new_hashes: set[Any] = set()
+    def _intern(self, h: Any) -> int:
+        node_id = self._ids.get(h)
+        if node_id is None:
+            if self._free_ids:
+                node_id = self._free_ids.pop()
+                self._hashes[node_id] = h
+                self._parents[node_id] = NO_PARENT
+            else:
+                node_id = len(self._hashes)
+                self._hashes.append(h)
+                self._parents.append(NO_PARENT)
+            self._ids[h] = node_id
+        return node_id
+
+    def _forget(self, node_id: int) -> None:
+        del self._ids[self._hashes[node_id]]
+        self._hashes[node_id] = None
+        self._free_ids.append(node_id)
+
+    def _top(self, node_id: int) -> tuple[int, int]:
+        # the top of the trees through node_id, and the length of the path to it
+        parents = self._parents
+        length = 1
+        while parents[node_id] != NO_PARENT:
+            node_id = parents[node_id]
+            length += 1
+        return node_id, length
+
+    def _path(self, node_id: int, length: int) -> list[Any]:
+        path = []
+        for _ in range(length):
+            path.append(self._hashes[node_id])
+            node_id = self._parents[node_id]
+        return path
+
+    def load_nodes(self, nodes: Iterable[tuple[Any, Any]]) -> list[tuple[Any, Any]]:
+        """Add (hash, parent hash) nodes, and return those that weren't known."""
+        new_nodes = []
+        ids = self._ids
+        parents = self._parents
+        trees = self._trees
+        leaves_by_top = self._leaves_by_top
+        intern = self._intern
         for h, parent in nodes:
-            if h in self.parent_lookup:
+            node_id = ids.get(h)
+            if node_id is None:
+                node_id = intern(h)
+                below = None
+            elif parents[node_id] != NO_PARENT:
                 continue
-            self.parent_lookup[h] = parent
-            new_hashes.add(h)
-        if new_hashes:
-            self.meld_new_hashes(new_hashes)
-
-    def meld_new_hashes(self, new_hashes: set[Any]) -> None:
-        # make a list
-        while len(new_hashes) > 0:
-            h = new_hashes.pop()
-            path = [h]
-            while 1:
-                h = self.parent_lookup.get(h)
-                if h is None:
-                    break
-                new_hashes.discard(h)
-                preceding_path = self.trees_from_bottom.get(h)
-                if preceding_path:
-                    del self.trees_from_bottom[h]
-                    path.extend(preceding_path)
-                    # we extended an existing path. Fix up descendents_by_top
-                    self.descendents_by_top[preceding_path[-1]].remove(
-                        preceding_path[0]
-                    )
-                    break
-                path.append(h)
-            self.trees_from_bottom[path[0]] = path
-
-            # if len(path) <= 1:
-            #    # this is a lone element... don't bother trying to extend
-            #    continue
-
-            # now, perform extensions on any trees that start below here
-
-            bottom_h, top_h = path[0], path[-1]
-
-            top_descendents = self.descendents_by_top.setdefault(top_h, set())
-            bottom_descendents = self.descendents_by_top.get(bottom_h)
-            if bottom_descendents:
-                for descendent in bottom_descendents:
-                    prior_path = self.trees_from_bottom[descendent]
-                    prior_path.extend(path[1:])
-                    if path[0] in self.trees_from_bottom:
-                        del self.trees_from_bottom[path[0]]
-                    else:
-                        pass  # TODO: improve this
-                del self.descendents_by_top[bottom_h]
-                top_descendents.update(bottom_descendents)
             else:
-                top_descendents.add(bottom_h)
+                # it may be the top of other trees, which now reach further up
+                below = leaves_by_top.pop(node_id, None)
+            parent_id = ids.get(parent)
+            if parent_id is None:
+                parent_id = intern(parent)
+            parents[node_id] = parent_id
+            new_nodes.append((h, parent))
+            tree = trees.pop(parent_id, None)
+            if tree:
+                # the parent was a leaf, so this extends its tree
+                top_id, above = tree
+                leaves = leaves_by_top[top_id]
+                leaves.discard(parent_id)
+            else:
+                top_id, above = self._top(parent_id)
+                leaves = leaves_by_top.setdefault(top_id, set())
+            if below:
+                for leaf_id in below:
+                    trees[leaf_id] = (top_id, trees[leaf_id][1] + above)
+                leaves.update(below)
+            else:
+                trees[node_id] = (top_id, above + 1)
+                leaves.add(node_id)
+        self._node_count += len(new_nodes)
+        return new_nodes
+
+    def prune(self, hashes: Iterable[Any]) -> None:
+        """
+        Forget the nodes for hashes, which must include every known ancestor
+        of each one, as when the bottom of a chain is locked. Trees through
+        them are cut short, with the highest one forgotten as their top.
+        """
+        ids = self._ids
+        parents = self._parents
+        removed = set()
+        for h in hashes:
+            node_id = ids.get(h)
+            if node_id is not None and parents[node_id] != NO_PARENT:
+                removed.add(node_id)
+        if not removed:
+            return
+        old_tops = {parents[node_id] for node_id in removed} - removed
+        new_tops = set()
+        for top_id in old_tops:
+            for leaf_id in self._leaves_by_top.pop(top_id, ()):
+                if leaf_id in removed:
+                    del self._trees[leaf_id]
+                    continue
+                # walk up to the first removed node, or to the top if the
+                # tree doesn't go through any
+                node_id, length = leaf_id, 1
+                while node_id not in removed and parents[node_id] != NO_PARENT:
+                    node_id = parents[node_id]
+                    length += 1
+                self._trees[leaf_id] = (node_id, length)
+                self._leaves_by_top.setdefault(node_id, set()).add(leaf_id)
+                new_tops.add(node_id)
+        for node_id in removed:
+            parents[node_id] = NO_PARENT
+            self._node_count -= 1
+            if node_id not in new_tops:
+                self._forget(node_id)
+        for top_id in old_tops - new_tops:
+            self._forget(top_id)
 
     def all_chains_ending_at(self, h: Any) -> Generator[list[Any], None, None]:
         for bottom_h in self.descendents_by_top.get(h, []):
@@ -108,3 +191,85 @@ class ChainFinder(object):
                 return p1[: i1 + 1], p2[: i2 + 1]
             i1 += 1
             i2 += 1
+
+
+class ParentLookup(Mapping[Any, Any]):
+    """The parent hash of each node of a ChainFinder."""
+
+    def __init__(self, chain_finder: ChainFinder) -> None:
+        self._cf = chain_finder
+
+    def __getitem__(self, h: Any) -> Any:
+        parent_id = self._cf._parents[self._cf._ids[h]]
+        if parent_id == NO_PARENT:
+            raise KeyError(h)
+        return self._cf._hashes[parent_id]
+
+    def get(self, h: Any, default: Any = None) -> Any:
+        node_id = self._cf._ids.get(h)
+        if node_id is None:
+            return default
+        parent_id = self._cf._parents[node_id]
+        if parent_id == NO_PARENT:
+            return default
+        return self._cf._hashes[parent_id]
+
+    def __contains__(self, h: Any) -> bool:
+        node_id = self._cf._ids.get(h)
+        return node_id is not None and self._cf._parents[node_id] != NO_PARENT
+
+    def __iter__(self) -> Iterator[Any]:
+        return (h for h, _ in self.items())
+
+    def items(self) -> Any:
+        hashes = self._cf._hashes
+        return (
+            (hashes[node_id], hashes[parent_id])
+            for node_id, parent_id in enumerate(self._cf._parents)
+            if parent_id != NO_PARENT
+        )
+
+    def __len__(self) -> int:
+        return self._cf._node_count
+
+
+class TreesFromBottom(Mapping[Any, "list[Any]"]):
+    """The path of hashes from each leaf of a ChainFinder up to its top."""
+
+    def __init__(self, chain_finder: ChainFinder) -> None:
+        self._cf = chain_finder
+
+    def __getitem__(self, h: Any) -> list[Any]:
+        node_id = self._cf._ids.get(h)
+        if node_id is None or node_id not in self._cf._trees:
+            raise KeyError(h)
+        return self._cf._path(node_id, self._cf._trees[node_id][1])
+
+    def __iter__(self) -> Iterator[Any]:
+        hashes = self._cf._hashes
+        return (hashes[node_id] for node_id in self._cf._trees)
+
+    def __len__(self) -> int:
+        return len(self._cf._trees)
+
+
+class DescendentsByTop(Mapping[Any, "set[Any]"]):
+    """The leaf hashes of the trees ending at each top of a ChainFinder."""
+
+    def __init__(self, chain_finder: ChainFinder) -> None:
+        self._cf = chain_finder
+
+    def __getitem__(self, h: Any) -> set[Any]:
+        node_id = self._cf._ids.get(h)
+        if node_id is None or node_id not in self._cf._leaves_by_top:
+            raise KeyError(h)
+        leaves = self._cf._leaves_by_top[node_id]
+        hashes = self._cf._hashes
+        return {hashes[leaf_id] for leaf_id in leaves}
+
+    def __iter__(self) -> Iterator[Any]:
+        hashes = self._cf._hashes
+        return (hashes[top_id] for top_id in self._cf._leaves_by_top)
+
+    def __len__(self) -> int:
+        return len(self._cf._leaves_by_top)
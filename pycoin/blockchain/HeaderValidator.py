@@ -0,0 +1,279 @@
+"""
+Check block headers against the consensus rules that only need other headers:
+
+- proof of work: the hash is at or below the target of the header's bits, and
+  that target is no easier than the proof of work limit
+- difficulty: the bits are the same as the parent's, except every
+  retarget_interval blocks, where they must be the retarget of the parent's
+  bits over the time the last interval took
+- timestamps: each one is after the median time past, the median timestamp
+  of the previous 11 blocks
+
+Headers are checked in runs of consecutive blocks. The median time past is
+kept in a sliding window over the run, rather than being recomputed from
+eleven ancestors for each header, and when NumPy is installed, long runs
+have their timestamps and bits checked as arrays.
+
+Headers at or below the highest checkpoint have their proof of work checked,
+and are checked against the checkpoints, but not against the difficulty and
+timestamp rules, since a header matching a checkpoint commits to all of its
+ancestors. A fork below the last checkpoint may never reach one, so its
+proof of work is what keeps it from being made for free.
+
+The testnet rule allowing minimum difficulty blocks isn't supported.
+"""
+
+from __future__ import annotations
+
+import bisect
+import collections
+from collections.abc import Callable, Sequence
+from typing import Any
+
+from pycoin.block import bits_for_target, target_for_bits
+from pycoin.coins.exceptions import HeaderValidationError
+
+
+MEDIAN_TIME_SPAN = 11
+
+# runs shorter than this aren't worth converting to NumPy arrays
+NUMPY_MIN_HEADERS = 64
+
+
+# (timestamp, bits) of the ancestor at a height, or None if it isn't known.
+# The timestamp may be None where only the bits were kept.
+AncestorF = Callable[[int], "tuple[int | None, int] | None"]
+
+
+def _numpy() -> Any:
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def first_early_timestamp(
+    prior: Sequence[int | None], timestamps: Sequence[int], use_numpy: bool = True
+) -> int | None:
+    """
+    Return the index of the first of timestamps that isn't after the median
+    of the MEDIAN_TIME_SPAN timestamps before it, or None if they all are.
+
+    prior holds the timestamps before the first one: all of them up to
+    MEDIAN_TIME_SPAN, oldest first, with None for any that aren't known.
+    Timestamps whose window includes one that isn't known aren't checked.
+    """
+    prior = list(prior[-MEDIAN_TIME_SPAN:])
+    numpy = _numpy() if use_numpy else None
+    if (
+        numpy is not None
+        and len(prior) == MEDIAN_TIME_SPAN
+        and None not in prior
+        and len(timestamps) >= NUMPY_MIN_HEADERS
+    ):
+        a = numpy.array(prior + list(timestamps), dtype="i8")
+        windows = numpy.lib.stride_tricks.sliding_window_view(a[:-1], MEDIAN_TIME_SPAN)
+        medians = numpy.sort(windows, axis=1)[:, MEDIAN_TIME_SPAN // 2]
+        early = numpy.flatnonzero(a[MEDIAN_TIME_SPAN:] <= medians)
+        return int(early[0]) if len(early) else None
+
+    window: collections.deque[int | None] = collections.deque()
+    ordered: list[int] = []
+    unknown = 0
+
+    def push(timestamp: int | None) -> None:
+        nonlocal unknown
+        window.append(timestamp)
+        if timestamp is None:
+            unknown += 1
+        else:
+            bisect.insort(ordered, timestamp)
+        if len(window) > MEDIAN_TIME_SPAN:
+            old = window.popleft()
+            if old is None:
+                unknown -= 1
+            else:
+                del ordered[bisect.bisect_left(ordered, old)]
+
+    for timestamp in prior:
+        push(timestamp)
+    for idx, timestamp in enumerate(timestamps):
+        if unknown == 0 and ordered and timestamp <= ordered[len(ordered) // 2]:
+            return idx
+        push(timestamp)
+    return None
+
+
+class HeaderValidator(object):
+    """
+    :param pow_limit_bits: the bits of the easiest target allowed
+    :param retarget_interval: the number of blocks between difficulty changes
+    :param target_timespan: the number of seconds an interval should take
+    :param no_retargeting: (optional) the bits never change, as on regtest
+    :param checkpoints: (optional) a dict of height => block hash
+    :param use_numpy: (optional) use NumPy for long runs if it's installed
+    """
+
+    def __init__(
+        self,
+        pow_limit_bits: int = 0x1D00FFFF,
+        retarget_interval: int = 2016,
+        target_timespan: int = 14 * 24 * 60 * 60,
+        no_retargeting: bool = False,
+        checkpoints: dict[int, bytes] | None = None,
+        use_numpy: bool = True,
+    ) -> None:
+        self.pow_limit = target_for_bits(pow_limit_bits)
+        self.retarget_interval = retarget_interval
+        self.target_timespan = target_timespan
+        self.no_retargeting = no_retargeting
+        self.checkpoints = dict(checkpoints or {})
+        self.last_checkpoint_height = max(self.checkpoints, default=-1)
+        self.use_numpy = use_numpy
+        self._targets: dict[int, int] = {}
+
+    def next_bits(self, parent_bits: int, actual_timespan: int) -> int:
+        """
+        The bits required at a retarget, given those of its parent and the
+        seconds between the first and last blocks of the interval before it.
+        """
+        timespan = self.target_timespan
+        actual_timespan = max(timespan // 4, min(actual_timespan, timespan * 4))
+        target = target_for_bits(parent_bits) * actual_timespan // timespan
+        return bits_for_target(min(target, self.pow_limit))
+
+    def _target(self, bits: int) -> int:
+        # bits rarely change, so their targets are worth caching
+        target = self._targets.get(bits)
+        if target is None:
+            target = target_for_bits(bits)
+            if target == 0 or target > self.pow_limit:
+                raise ValueError("target in bits %08x is out of range" % bits)
+            self._targets[bits] = target
+        return target
+
+    def check_headers(
+        self, headers: Sequence[Any], height: int, ancestor_f: AncestorF | None = None
+    ) -> None:
+        """
+        Check headers, a run of consecutive headers with the first at height,
+        and raise a HeaderValidationError for the first one that fails (its
+        header_index is its position in headers).
+
+        ancestor_f(h) returns the (timestamp, bits) of the ancestor of the
+        first header at height h, or None if it isn't known; rules that need
+        an ancestor that isn't known aren't checked.
+        """
+        count = len(headers)
+        hashes = [header.hash() for header in headers]
+        for checkpoint_height, checkpoint_hash in self.checkpoints.items():
+            idx = checkpoint_height - height
+            if 0 <= idx < count and hashes[idx] != checkpoint_hash:
+                raise HeaderValidationError("block doesn't match checkpoint", idx)
+        timestamps = [header.timestamp for header in headers]
+        bits = [header.difficulty for header in headers]
+
+        def info_for_height(h: int) -> tuple[int | None, int] | None:
+            if h >= height:
+                return timestamps[h - height], bits[h - height]
+            return ancestor_f(h) if ancestor_f else None
+
+        # proof of work is checked everywhere, since a fork below the last
+        # checkpoint may never reach one
+        failures = [self._check_pow(hashes, bits, 0)]
+        start = max(0, min(count, self.last_checkpoint_height + 1 - height))
+        if start < count:
+            failures.append(self._check_bits(bits, height, start, info_for_height))
+            failures.append(
+                self._check_timestamps(timestamps, height, start, info_for_height)
+            )
+        failure = min((f for f in failures if f), default=None)
+        if failure:
+            raise HeaderValidationError(failure[1], failure[0])
+
+    def _check_pow(
+        self, hashes: list[bytes], bits: list[int], start: int
+    ) -> tuple[int, str] | None:
+        for idx in range(start, len(hashes)):
+            try:
+                target = self._target(bits[idx])
+            except ValueError as ex:
+                return idx, str(ex)
+            if int.from_bytes(hashes[idx], "little") > target:
+                return idx, "proof of work is above target"
+        return None
+
+    def _check_bits(
+        self,
+        bits: list[int],
+        height: int,
+        start: int,
+        info_for_height: Callable[[int], tuple[int | None, int] | None],
+    ) -> tuple[int, str] | None:
+        first_height = height + start
+        parent = info_for_height(first_height - 1) if first_height > 0 else None
+        parent_bits = None if parent is None else parent[1]
+        interval = self.retarget_interval
+
+        # anywhere but a retarget, the bits must be the parent's
+        bad = None
+        numpy = _numpy() if self.use_numpy else None
+        if numpy is not None and len(bits) - start >= NUMPY_MIN_HEADERS:
+            a = numpy.array(bits[start:], dtype="u4")
+            changed = numpy.empty(len(a), dtype=bool)
+            changed[0] = parent_bits is not None and a[0] != parent_bits
+            changed[1:] = a[1:] != a[:-1]
+            if not self.no_retargeting:
+                heights = numpy.arange(first_height, height + len(bits))
+                changed &= heights % interval != 0
+            changed_at = numpy.flatnonzero(changed)
+            if len(changed_at):
+                bad = start + int(changed_at[0])
+        else:
+            previous_bits = parent_bits
+            for idx in range(start, len(bits)):
+                is_retarget = (height + idx) % interval == 0
+                if previous_bits is not None and bits[idx] != previous_bits:
+                    if self.no_retargeting or not is_retarget:
+                        bad = idx
+                        break
+                previous_bits = bits[idx]
+
+        # at a retarget, they must follow from the last interval's timespan
+        end = len(bits) if bad is None else bad
+        if not self.no_retargeting:
+            first_retarget = -(-first_height // interval) * interval
+            for h in range(max(first_retarget, interval), height + end, interval):
+                parent = info_for_height(h - 1)
+                first = info_for_height(h - interval)
+                if parent is None or first is None:
+                    continue
+                if parent[0] is None or first[0] is None:
+                    continue
+                expected = self.next_bits(parent[1], parent[0] - first[0])
+                if bits[h - height] != expected:
+                    return h - height, "bits %08x don't match retarget %08x" % (
+                        bits[h - height],
+                        expected,
+                    )
+        if bad is not None:
+            return bad, "bits %08x changed outside a retarget" % bits[bad]
+        return None
+
+    def _check_timestamps(
+        self,
+        timestamps: list[int],
+        height: int,
+        start: int,
+        info_for_height: Callable[[int], tuple[int | None, int] | None],
+    ) -> tuple[int, str] | None:
+        first_height = height + start
+        prior = []
+        for h in range(max(0, first_height - MEDIAN_TIME_SPAN), first_height):
+            info = info_for_height(h)
+            prior.append(None if info is None else info[0])
+        idx = first_early_timestamp(prior, timestamps[start:], self.use_numpy)
+        if idx is None:
+            return None
+        return start + idx, "timestamp isn't after the median time past"
@@ -0,0 +1,231 @@
+"""
+A compact store for the locked part of a BlockChain.
+
+The headers are kept as one contiguous buffer of 80-byte records (a bytearray,
+or an mmap of a header file). A block's hash is the previous block hash field
+of the next header, so only the hash of the last header is kept separately.
+
+Looking up a hash uses one sorted array("Q") of (32-bit hash prefix << 32 |
+index) keys, plus a dict for headers appended since the array was last sorted.
+That's about 88 bytes per header, compared with several hundred for a tuple
+and a dict entry of bytes objects.
+"""
+
+from __future__ import annotations
+
+import array
+import bisect
+import io
+import mmap
+import struct
+import sys
+from collections.abc import Iterable
+from typing import Any, overload
+
+from pycoin.encoding.hash import double_sha256
+from pycoin.encoding.hexbytes import bytes_as_revhex
+
+
+HEADER_SIZE = 80
+ZERO_HASH = b"\0" * 32
+
+
+def _prefix(h: bytes) -> int:
+    return int.from_bytes(h[:4], "little")
+
+
+class LockedHeaderChain(object):
+    """
+    Acts like the list of (hash, parent_hash, difficulty) tuples BlockChain
+    keeps for locked blocks, and also finds the index of a hash.
+
+    :param parent_hash: the previous block hash of the first header
+    :param max_unsorted: how many appended headers are looked up through a
+        dict before they're merged into the sorted array
+    """
+
+    def __init__(
+        self, parent_hash: bytes = ZERO_HASH, max_unsorted: int = 4096
+    ) -> None:
+        self.parent_hash = parent_hash
+        self.max_unsorted = max_unsorted
+        self._headers: Any = bytearray()
+        self._count = 0
+        self._last_hash = parent_hash
+        self._sorted_keys = array.array("Q")
+        self._unsorted: dict[bytes, int] = {}
+
+    @classmethod
+    def from_headers(
+        class_: type[LockedHeaderChain],
+        buf: Any,
+        parent_hash: bytes = ZERO_HASH,
+        check_hashes: bool = True,
+        **kwargs: Any,
+    ) -> LockedHeaderChain:
+        """
+        Use buf (bytes, bytearray or mmap) of concatenated 80-byte headers.
+        If it's a bytearray, it's used as is and appends extend it.
+
+        With check_hashes, every header is hashed to check that the previous
+        block hashes link them into a chain starting at parent_hash, and a
+        ValueError is raised if they don't. Otherwise only the last header is
+        hashed, and the links are trusted.
+        """
+        if len(buf) % HEADER_SIZE:
+            raise ValueError("header data isn't a multiple of %d bytes" % HEADER_SIZE)
+        chain = class_(parent_hash, **kwargs)
+        count = len(buf) // HEADER_SIZE
+        mv = memoryview(buf)
+        if count == 0:
+            chain._headers = buf if isinstance(buf, bytearray) else mv
+            return chain
+        if mv[4:36] != parent_hash:
+            raise ValueError("headers don't start at the parent hash")
+        if check_hashes:
+            offsets = range(HEADER_SIZE, count * HEADER_SIZE, HEADER_SIZE)
+            previous_hashes = b"".join(
+                mv[offset + 4 : offset + 36] for offset in offsets
+            )
+            hashes = b"".join(
+                double_sha256(bytes(mv[offset - HEADER_SIZE : offset]))
+                for offset in offsets
+            )
+            if previous_hashes != hashes:
+                raise ValueError("headers don't form a chain")
+        chain._headers = buf if isinstance(buf, bytearray) else mv
+        chain._count = count
+        chain._last_hash = double_sha256(bytes(mv[-HEADER_SIZE:]))
+        # the hash of header i is the previous block hash of header i + 1, so
+        # its prefix is the second uint32 of header i + 1
+        prefixes = array.array("I")
+        with mv.cast("I") as words:
+            prefixes.frombytes(
+                words[HEADER_SIZE // 4 + 1 :: HEADER_SIZE // 4].tobytes()
+            )
+        if sys.byteorder == "big":
+            prefixes.byteswap()
+        prefixes.append(_prefix(chain._last_hash))
+        chain._sorted_keys = array.array(
+            "Q", sorted((prefix << 32) | i for i, prefix in enumerate(prefixes))
+        )
+        return chain
+
+    @classmethod
+    def from_header_file(
+        class_: type[LockedHeaderChain], path: str, **kwargs: Any
+    ) -> LockedHeaderChain:
+        """
+        Map a file of concatenated 80-byte headers, as written by save. The
+        chain is read-only: appending copies the headers into memory first.
+        """
+        with open(path, "rb") as f:
+            try:
+                buf: Any = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # an empty file can't be mapped
+                buf = b""
+        return class_.from_headers(buf, **kwargs)
+
+    def save(self, path: str) -> None:
+        with open(path, "wb") as f:
+            f.write(self._headers[: self._count * HEADER_SIZE])
+
+    def __len__(self) -> int:
+        return self._count
+
+    def header_bytes(self, index: int) -> bytes:
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        return bytes(self._headers[index * HEADER_SIZE : (index + 1) * HEADER_SIZE])
+
+    def hash_for_index(self, index: int) -> bytes:
+        if index < 0:
+            index += self._count
+        if index == self._count - 1:
+            return self._last_hash
+        offset = (index + 1) * HEADER_SIZE + 4
+        return bytes_as_revhex(self._headers[offset : offset + 32])
+
+    def timestamp_for_index(self, index: int) -> int:
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        (timestamp,) = struct.unpack_from("<L", self._headers, index * HEADER_SIZE + 68)
+        return timestamp  # type: ignore[no-any-return]
+
+    def _tuple_for_index(self, index: int) -> tuple[bytes, bytes, int]:
+        offset = index * HEADER_SIZE
+        parent_hash = bytes_as_revhex(self._headers[offset + 4 : offset + 36])
+        (difficulty,) = struct.unpack_from("<L", self._headers, offset + 72)
+        return self.hash_for_index(index), parent_hash, difficulty
+
+    @overload
+    def __getitem__(self, index: int) -> tuple[bytes, bytes, int]: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[tuple[bytes, bytes, int]]: ...
+
+    def __getitem__(self, index: int | slice) -> Any:
+        if isinstance(index, slice):
+            return [
+                self._tuple_for_index(i) for i in range(*index.indices(self._count))
+            ]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        return self._tuple_for_index(index)
+
+    def index_for_hash(self, h: bytes) -> int | None:
+        index = self._unsorted.get(h)
+        if index is not None:
+            return index
+        keys = self._sorted_keys
+        prefix = _prefix(h)
+        i = bisect.bisect_left(keys, prefix << 32)
+        while i < len(keys) and keys[i] >> 32 == prefix:
+            index = keys[i] & 0xFFFFFFFF
+            if self.hash_for_index(index) == h:
+                return index
+            i += 1
+        return None
+
+    def __contains__(self, h: bytes) -> bool:
+        return self.index_for_hash(h) is not None
+
+    def append_header(self, header_bytes: bytes, h: bytes | None = None) -> None:
+        """
+        Append an 80-byte header, whose hash is h (computed if not given).
+        Raises ValueError if it doesn't follow the last header.
+        """
+        if len(header_bytes) != HEADER_SIZE:
+            raise ValueError("header isn't %d bytes" % HEADER_SIZE)
+        if header_bytes[4:36] != self._last_hash:
+            raise ValueError("header doesn't follow the last one")
+        if not isinstance(self._headers, bytearray):
+            self._headers = bytearray(self._headers)
+        self._headers += header_bytes
+        if h is None:
+            h = double_sha256(header_bytes)
+        self._last_hash = h
+        self._unsorted[h] = self._count
+        self._count += 1
+        if len(self._unsorted) > self.max_unsorted:
+            self._sort()
+
+    def extend_headers(self, headers: Iterable[Any]) -> None:
+        """Append Block headers."""
+        for header in headers:
+            self.append_header(header_bytes_for(header), header.hash())
+
+    def _sort(self) -> None:
+        new_keys = ((_prefix(h) << 32) | index for h, index in self._unsorted.items())
+        self._sorted_keys = array.array("Q", sorted([*self._sorted_keys, *new_keys]))
+        self._unsorted = {}
+
+
+def header_bytes_for(header: Any) -> bytes:
+    """The 80-byte serialized header of a Block."""
+    f = io.BytesIO()
+    header.stream_header(f)
+    return f.getvalue()
@@ -0,0 +1,318 @@
+"""
+A persistent set of unspent transaction outputs.
+
+Each entry maps an outpoint (tx_hash, tx_out_index) to a UTXOEntry: the
+amount, script, height of the block that created it, and whether it came
+from a coinbase. Entries live in a sqlite3 database, with changes held in an
+in-memory write-back cache and written in one database transaction per flush,
+so the database always reflects a whole number of blocks.
+
+Applying a block records undo data (the outputs it created and the entries it
+spent), so the most recent blocks can be rolled back on a reorg.
+"""
+
+from __future__ import annotations
+
+import io
+import sqlite3
+from collections.abc import Iterable
+from typing import Any, NamedTuple
+
+from pycoin.coins.bitcoin.BlockValidator import UTXOProvider
+from pycoin.coins.bitcoin.TxOut import TxOut
+from pycoin.encoding.hexbytes import b2h_rev
+from pycoin.satoshi.satoshi_int import parse_satoshi_int, stream_satoshi_int
+from pycoin.satoshi.satoshi_struct import parse_struct, stream_struct
+
+
+OP_RETURN = 0x6A
+
+
+class UTXOEntry(NamedTuple):
+    coin_value: int
+    script: bytes
+    height: int
+    is_coinbase: bool
+
+
+Outpoint = tuple[bytes, int]
+
+
+def _stream_undo(
+    f: io.BytesIO, created: list[Outpoint], spent: list[tuple[Outpoint, UTXOEntry]]
+) -> None:
+    stream_satoshi_int(f, len(created))
+    for tx_hash, tx_out_index in created:
+        stream_struct("#L", f, tx_hash, tx_out_index)
+    stream_satoshi_int(f, len(spent))
+    for (tx_hash, tx_out_index), entry in spent:
+        stream_struct("#LQSLb", f, tx_hash, tx_out_index, *entry)
+
+
+def _parse_undo(
+    f: io.BytesIO,
+) -> tuple[list[Outpoint], list[tuple[Outpoint, UTXOEntry]]]:
+    created = [tuple(parse_struct("#L", f)) for _ in range(parse_satoshi_int(f))]
+    spent = []
+    for _ in range(parse_satoshi_int(f)):
+        tx_hash, tx_out_index, coin_value, script, height, is_coinbase = parse_struct(
+            "#LQSLb", f
+        )
+        spent.append(
+            (
+                (tx_hash, tx_out_index),
+                UTXOEntry(coin_value, script, height, is_coinbase),
+            )
+        )
+    return created, spent  # type: ignore[return-value]
+
+
+class UTXOStore(UTXOProvider):
+    """
+    :param sqlite3_db: the database to keep the UTXO set in. Defaults to an
+        in-memory database.
+    :param max_dirty: flush after applying a block once this many outpoints
+        have unwritten changes
+    :param undo_depth: how many of the most recent blocks keep undo data
+    :param tx_out_class: the class get_utxo and get_utxos return
+
+    The store is also a BlockChain change callback: pass it to
+    BlockChain.add_change_callback (which only keeps a weak reference), and
+    "add" and "remove" ops are applied and undone. The blocks in those ops
+    must include their transactions.
+
+    To fill in the unspents of a transaction, pass the store to
+    Tx.unspents_from_db.
+    """
+
+    def __init__(
+        self,
+        sqlite3_db: sqlite3.Connection | None = None,
+        max_dirty: int = 100000,
+        undo_depth: int = 100,
+        tx_out_class: type = TxOut,
+    ) -> None:
+        self.db = sqlite3_db or sqlite3.connect(":memory:")
+        self.max_dirty = max_dirty
+        self.undo_depth = undo_depth
+        self.tx_out_class = tx_out_class
+        # outpoint => UTXOEntry, or None for a deleted one
+        self._dirty: dict[Outpoint, UTXOEntry | None] = {}
+        # height => (block_hash, previous_block_hash, undo data), or None for a deleted one
+        self._dirty_undo: dict[int, tuple[bytes, bytes, bytes] | None] = {}
+        self._init_tables()
+        self._tip = self._load_tip()
+
+    def _exec_sql(self, sql: str, *args: Any) -> sqlite3.Cursor:
+        c = self.db.cursor()
+        c.execute(sql, args)
+        return c
+
+    def _init_tables(self) -> None:
+        self._exec_sql(
+            """create table if not exists UTXO (
+tx_hash blob not null,
+tx_out_index integer not null,
+coin_value integer not null,
+script blob not null,
+height integer not null,
+is_coinbase integer not null,
+primary key (tx_hash, tx_out_index)
+) without rowid;"""
+        )
+        self._exec_sql(
+            """create table if not exists UTXOUndo (
+height integer primary key,
+block_hash blob not null,
+previous_block_hash blob not null,
+data blob not null
+);"""
+        )
+        self._exec_sql(
+            """create table if not exists UTXOTip (
+id integer primary key check (id = 0),
+height integer not null,
+block_hash blob not null
+);"""
+        )
+        self.db.commit()
+
+    def _load_tip(self) -> tuple[int, bytes] | None:
+        r = self._exec_sql("select height, block_hash from UTXOTip").fetchone()
+        return (r[0], r[1]) if r else None
+
+    def tip(self) -> tuple[int, bytes] | None:
+        """The (height, block_hash) of the last block applied, or None."""
+        return self._tip
+
+    def dirty_count(self) -> int:
+        return len(self._dirty)
+
+    def _fetch(self, outpoint: Outpoint) -> UTXOEntry | None:
+        if outpoint in self._dirty:
+            return self._dirty[outpoint]
+        r = self._exec_sql(
+            "select coin_value, script, height, is_coinbase from UTXO"
+            " where tx_hash=? and tx_out_index=?",
+            *outpoint,
+        ).fetchone()
+        if r is None:
+            return None
+        return UTXOEntry(r[0], r[1], r[2], bool(r[3]))
+
+    def get_entry(self, tx_hash: bytes, tx_out_index: int) -> UTXOEntry | None:
+        """Return the UTXOEntry for an unspent output, or None."""
+        return self._fetch((tx_hash, tx_out_index))
+
+    def get_entries(self, outpoints: Iterable[Outpoint]) -> list[UTXOEntry | None]:
+        return [self._fetch(outpoint) for outpoint in outpoints]
+
+    def get_utxo(self, tx_hash: bytes, tx_out_index: int) -> Any:
+        entry = self._fetch((tx_hash, tx_out_index))
+        return None if entry is None else self.tx_out_class(entry[0], entry[1])
+
+    def get_utxos(self, outpoints: Iterable[Outpoint]) -> list[Any]:
+        tx_out_class = self.tx_out_class
+        return [
+            None if entry is None else tx_out_class(entry[0], entry[1])
+            for entry in self.get_entries(outpoints)
+        ]
+
+    def __contains__(self, outpoint: Outpoint) -> bool:
+        return self._fetch(outpoint) is not None
+
+    def apply_block(self, block: Any, height: int) -> None:
+        """
+        Spend the outputs the block's transactions spend and add the ones they
+        create. Raises a KeyError if an input spends an output that isn't in
+        the store, in which case the store is unchanged.
+        """
+        if self._tip is not None:
+            tip_height, tip_hash = self._tip
+            if height != tip_height + 1 or block.previous_block_hash != tip_hash:
+                raise ValueError(
+                    "block %s at height %d doesn't extend the tip at height %d"
+                    % (b2h_rev(block.hash()), height, tip_height)
+                )
+        changes: dict[Outpoint, UTXOEntry | None] = {}
+        created: list[Outpoint] = []
+        spent: list[tuple[Outpoint, UTXOEntry]] = []
+        for tx in block.txs:
+            is_coinbase = tx.is_coinbase()
+            if not is_coinbase:
+                for tx_in in tx.txs_in:
+                    outpoint = (tx_in.previous_hash, tx_in.previous_index)
+                    entry = (
+                        changes[outpoint]
+                        if outpoint in changes
+                        else self._fetch(outpoint)
+                    )
+                    if entry is None:
+                        raise KeyError(
+                            "can't find tx_out for %s:%d"
+                            % (b2h_rev(tx_in.previous_hash), tx_in.previous_index)
+                        )
+                    changes[outpoint] = None
+                    spent.append((outpoint, entry))
+            tx_hash = tx.hash()
+            for tx_out_index, tx_out in enumerate(tx.txs_out):
+                script = tx_out.script
+                if script[:1] == bytes([OP_RETURN]):
+                    continue
+                outpoint = (tx_hash, tx_out_index)
+                changes[outpoint] = UTXOEntry(
+                    tx_out.coin_value, script, height, is_coinbase
+                )
+                created.append(outpoint)
+
+        f = io.BytesIO()
+        _stream_undo(f, created, spent)
+        self._dirty.update(changes)
+        block_hash = block.hash()
+        self._dirty_undo[height] = (block_hash, block.previous_block_hash, f.getvalue())
+        if height - self.undo_depth >= 0:
+            self._dirty_undo[height - self.undo_depth] = None
+        self._tip = (height, block_hash)
+        if len(self._dirty) >= self.max_dirty:
+            self.flush()
+
+    def undo_block(self, block_hash: bytes) -> None:
+        """
+        Roll back the tip, which must be the block with the given hash, using
+        its undo data.
+        """
+        if self._tip is None or self._tip[1] != block_hash:
+            raise ValueError("block %s isn't the tip" % b2h_rev(block_hash))
+        height = self._tip[0]
+        if height in self._dirty_undo:
+            undo = self._dirty_undo[height]
+        else:
+            undo = self._exec_sql(
+                "select block_hash, previous_block_hash, data from UTXOUndo"
+                " where height=?",
+                height,
+            ).fetchone()
+        if undo is None:
+            raise ValueError("no undo data for height %d" % height)
+        _, previous_block_hash, data = undo
+        created, spent = _parse_undo(io.BytesIO(data))
+        # an output created and spent in the block is in both, so it must be
+        # deleted after the spent outputs are restored
+        for outpoint, entry in spent:
+            self._dirty[outpoint] = entry
+        for outpoint in created:
+            self._dirty[outpoint] = None
+        self._dirty_undo[height] = None
+        self._tip = (height - 1, previous_block_hash) if height > 0 else None
+        if len(self._dirty) >= self.max_dirty:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write all cached changes in one database transaction."""
+        with self.db:
+            c = self.db.cursor()
+            c.executemany(
+                "delete from UTXO where tx_hash=? and tx_out_index=?",
+                (k for k, v in self._dirty.items() if v is None),
+            )
+            c.executemany(
+                "insert or replace into UTXO values (?, ?, ?, ?, ?, ?)",
+                (
+                    (k[0], k[1], v[0], v[1], v[2], int(v[3]))
+                    for k, v in self._dirty.items()
+                    if v is not None
+                ),
+            )
+            c.executemany(
+                "delete from UTXOUndo where height=?",
+                ((k,) for k, v in self._dirty_undo.items() if v is None),
+            )
+            c.executemany(
+                "insert or replace into UTXOUndo values (?, ?, ?, ?)",
+                ((k,) + v for k, v in self._dirty_undo.items() if v is not None),
+            )
+            c.execute("delete from UTXOTip")
+            if self._tip is not None:
+                c.execute("insert into UTXOTip values (0, ?, ?)", self._tip)
+        self._dirty = {}
+        self._dirty_undo = {}
+
+    def __call__(self, blockchain: Any, ops: list[Any]) -> None:
+        for op, block, index in ops:
+            if op == "add":
+                self.apply_block(block, index)
+            elif op == "remove":
+                self.undo_block(block.hash())
+        self.flush()
+
+    def __len__(self) -> int:
+        count = self._exec_sql("select count(*) from UTXO").fetchone()[0]
+        for outpoint, entry in self._dirty.items():
+            in_db = (
+                self._exec_sql(
+                    "select 1 from UTXO where tx_hash=? and tx_out_index=?", *outpoint
+                ).fetchone()
+                is not None
+            )
+            count += (entry is not None) - in_db
+        return count  # type: ignore[no-any-return]
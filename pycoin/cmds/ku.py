@@ -3,19 +3,29 @@
 from __future__ import annotations
 
 import argparse
+import collections
+import concurrent.futures
+import itertools
 import json
+import os
 import re
 import subprocess
 import sys
+from collections.abc import Iterable, Iterator
 from typing import Any
 
 from pycoin.encoding.hexbytes import h2b
 from pycoin.networks.default import get_current_netcode
 from pycoin.networks.registry import network_codes, network_for_netcode
+from pycoin.tools.bulk_addresses import FIELDS, FORMATS, bulk_rows, write_rows
+from pycoin.tools.key_output import output_for_key
 
 
 HASH160_RE = re.compile(r"^([0-9a-fA-F]{40})$")
 
+# the number of items given to a worker at once with --stream
+STREAM_CHUNK_SIZE = 256
+
 
 def gpg_entropy() -> bytes:
     try:
@@ -131,6 +141,31 @@ def create_parser() -> argparse.ArgumentParser:
     parser.add_argument(
         "-s", "--subkey", help="subkey path (example: 0H/2/15-20)", default=""
     )
+    parser.add_argument(
+        "--bulk",
+        help="for a BIP32 key, write the sec, hash160 and addresses of each"
+        " subkey path, in several processes; -b selects fields from: %s"
+        % ", ".join(FIELDS),
+        action="store_true",
+    )
+    parser.add_argument(
+        "--bulk-format",
+        help="output format for --bulk",
+        choices=FORMATS,
+        default="jsonl",
+    )
+    parser.add_argument(
+        "--stream",
+        help="read items from stdin as they come, and write the output for each"
+        " key as a JSON line, in several processes; with -b, only those fields"
+        " are computed",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--workers",
+        help="number of worker processes for --bulk or --stream (default: one per CPU)",
+        type=int,
+    )
     parser.add_argument("-n", "--network", help="specify network", choices=codes)
     parser.add_argument(
         "--override-network",
@@ -204,6 +239,143 @@ def generate_output(args: argparse.Namespace, output_dict: dict[str, str], outpu
         dump_output(output_dict, output_order)
 
 
+def ku_bulk(
+    args: argparse.Namespace,
+    parser: argparse.ArgumentParser,
+    items: list[str],
+    parse_networks: list[Any],
+    override_network: Any,
+) -> None:
+    fields = tuple(args.brief or FIELDS)
+    for field in fields:
+        if field not in FIELDS:
+            parser.error("unknown field %s for --bulk" % field)
+    header = True
+    for item in items:
+        key = parse_key(item, parse_networks)
+        if key is None:
+            print("can't parse %s" % item, file=sys.stderr)
+            continue
+        if override_network:
+            key = key.override_network(override_network)
+        if not hasattr(key, "subkeys_range"):
+            print("%s isn't a BIP32 key, needed for --bulk" % item, file=sys.stderr)
+            continue
+        rows = bulk_rows(key, args.subkey, fields, args.workers)
+        write_rows(rows, sys.stdout, fields, args.bulk_format, header)
+        header = False
+
+
+def stdin_items() -> Iterator[str]:
+    for line in sys.stdin:
+        yield from line.split()
+
+
+def outputs_for_items(
+    items: Iterable[str],
+    parse_networks: list[Any],
+    override_network: Any,
+    fields: list[str],
+    subkey_path: str = "",
+    public: bool = False,
+) -> list[tuple[str, list[dict[str, str]] | None]]:
+    """
+    Return (item, the output dicts of its keys) for each of items, with None
+    for the outputs of an item that can't be parsed.
+    """
+    results: list[tuple[str, list[dict[str, str]] | None]] = []
+    for item in items:
+        key = parse_key(item, parse_networks)
+        if key is None:
+            results.append((item, None))
+            continue
+        if override_network:
+            key = key.override_network(override_network)
+        key_iter = key.subkeys(subkey_path) if hasattr(key, "subkeys") else [key]
+        outputs = []
+        for key in key_iter:
+            if public:
+                key = key.public_copy()
+            outputs.append(output_for_key(item, key, fields))
+        results.append((item, outputs))
+    return results
+
+
+def _outputs_for_items(
+    netcodes: list[str],
+    override_netcode: str | None,
+    items: list[str],
+    fields: list[str],
+    subkey_path: str,
+    public: bool,
+) -> list[tuple[str, list[dict[str, str]] | None]]:
+    # runs in a worker process
+    parse_networks = [network_for_netcode(netcode) for netcode in netcodes]
+    override_network = override_netcode and network_for_netcode(override_netcode)
+    return outputs_for_items(
+        items, parse_networks, override_network, fields, subkey_path, public
+    )
+
+
+def ku_stream(
+    args: argparse.Namespace,
+    items: Iterable[str],
+    parse_networks: list[Any],
+    override_network: Any,
+    fields: list[str],
+) -> None:
+    items = iter(items)
+    chunks = iter(lambda: list(itertools.islice(items, STREAM_CHUNK_SIZE)), [])
+
+    def write_results(
+        results: list[tuple[str, list[dict[str, str]] | None]],
+    ) -> None:
+        for item, outputs in results:
+            if outputs is None:
+                print("can't parse %s" % item, file=sys.stderr)
+                continue
+            for output in outputs:
+                sys.stdout.write(json.dumps(output))
+                sys.stdout.write("\n")
+        sys.stdout.flush()
+
+    max_workers = args.workers or os.cpu_count() or 1
+    if max_workers == 1:
+        for chunk in chunks:
+            write_results(
+                outputs_for_items(
+                    chunk,
+                    parse_networks,
+                    override_network,
+                    fields,
+                    args.subkey,
+                    args.public,
+                )
+            )
+        return
+
+    netcodes = [network.symbol for network in parse_networks]
+    override_netcode = override_network.symbol if override_network else None
+    with concurrent.futures.ProcessPoolExecutor(max_workers) as executor:
+        pending: collections.deque[concurrent.futures.Future[Any]] = collections.deque()
+        for chunk in chunks:
+            pending.append(
+                executor.submit(
+                    _outputs_for_items,
+                    netcodes,
+                    override_netcode,
+                    chunk,
+                    fields,
+                    args.subkey,
+                    args.public,
+                )
+            )
+            while pending and (len(pending) >= 2 * max_workers or pending[0].done()):
+                write_results(pending.popleft().result())
+        while pending:
+            write_results(pending.popleft().result())
+
+
 def ku(args: argparse.Namespace, parser: argparse.ArgumentParser) -> None:
     fallback_network = network_for_netcode(args.network or get_current_netcode())
     parse_networks = [fallback_network] + [
@@ -231,8 +403,19 @@ def ku(args: argparse.Namespace, parser: argparse.ArgumentParser) -> None:
     elif args.address:
         output_key_set.add("address" + ("_uncompressed" if args.uncompressed else ""))
 
+    if args.stream:
+        brief = args.brief or []
+        fields = list(brief) + sorted(output_key_set.difference(brief))
+        items = args.item if len(args.item) > 0 else stdin_items()
+        ku_stream(args, items, parse_networks, override_network, fields)
+        return
+
     items = args.item if len(args.item) > 0 else parse_stdin()
 
+    if args.bulk:
+        ku_bulk(args, parser, items, parse_networks, override_network)
+        return
+
     for item in items:
         key = parse_key(item, parse_networks)
         if key is None:
@@ -10,6 +10,28 @@ from .TxOut import TxOut
 from pycoin.encoding.hexbytes import b2h, b2h_rev, h2b
 
 
+class _BufferReader(object):
+    """
+    A file-like object that reads from a buffer, starting at offset, without
+    copying the rest of it.
+    """
+
+    __slots__ = ("_mv", "_pos")
+
+    def __init__(self, mv: memoryview, offset: int = 0) -> None:
+        self._mv = mv
+        self._pos = offset
+
+    def read(self, n: int = -1) -> bytes:
+        start = self._pos
+        end = len(self._mv) if n < 0 else min(start + n, len(self._mv))
+        self._pos = end
+        return self._mv[start:end].tobytes()
+
+    def tell(self) -> int:
+        return self._pos
+
+
 class Tx(object):
     TxIn: ClassVar[Any] = TxIn
     TxOut: ClassVar[Any] = TxOut
@@ -27,6 +49,41 @@ class Tx(object):
         """Parse a transaction Tx from the file-like object f."""
         raise NotImplementedError()
 
+    @classmethod
+    def from_buffer(
+        class_: type[Tx], buf: bytes | memoryview, offset: int = 0
+    ) -> tuple[Tx, int]:
+        """Parse a transaction Tx from buf, starting at offset.
+
+        :param buf: a bytes-like object (bytes, bytearray, memoryview, mmap)
+        :param offset: (optional) where the transaction starts in buf
+        :return: a tuple of the :class:`Tx` and the offset just past its end
+        """
+        with memoryview(buf) as mv:
+            f = _BufferReader(mv, offset)
+            tx = class_.parse(f)  # type: ignore[arg-type]
+            return tx, f.tell()
+
+    @classmethod
+    def has_buffer_parser(class_: type[Tx]) -> bool:
+        """Return True if from_buffer parses buf directly, rather than through parse."""
+        return False
+
+    @classmethod
+    def scan_buffer(
+        class_: type[Tx], buf: bytes | memoryview, offset: int = 0
+    ) -> tuple[int, int, int]:
+        """Find the extent of the transaction starting at offset in buf without
+        parsing it.
+
+        :return: a tuple (io_start, io_end, end). The transaction ends at end, and the
+            bytes hashed for its id are buf[offset:offset+4] + buf[io_start:io_end]
+            + buf[end-4:end].
+
+        Raises NotImplementedError if the transaction format can't be scanned.
+        """
+        raise NotImplementedError()
+
     @classmethod
     def from_bin(class_: type[Tx], blob: bytes) -> Tx:
         """Return the Tx for the given binary blob.
@@ -38,8 +95,9 @@ class Tx(object):
 
         If parsing fails, an exception is raised.
         """
+        tx, offset = class_.from_buffer(blob)
         f = io.BytesIO(blob)
-        tx = class_.parse(f)
+        f.seek(offset)
         try:
             tx.parse_unspents(f)  # type: ignore[attr-defined]
         except Exception:
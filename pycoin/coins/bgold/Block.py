@@ -24,6 +24,11 @@ class Block(BaseBlock):
 
     FORK_BLOCK = 491407
 
+    # the height is part of the header
+    height: int
+
+    __slots__ = ("solution",)
+
     @classmethod
     def parse_as_header(class_, f: IO[bytes]) -> Block:
         """
@@ -0,0 +1,347 @@
+"""
+Check a block against the consensus rules that can be checked given the
+outputs it spends.
+
+The checks run in a fixed order, and the first failure is raised as a
+BlockValidationError:
+
+- proof of work against the header's bits
+- coinbase placement, transaction checks (see :func:`Tx.check`), duplicate
+  txids, merkle root, witness commitment and block weight
+- inputs: each one must spend an output of an earlier tx in the block or an
+  unspent output from the UTXOProvider, and only once in the block
+- BIP30 (no tx may recreate unspent outputs), input and output values,
+  coinbase value, and sigop cost. As in Bitcoin Core, BIP30 isn't checked
+  for the two mainnet blocks that broke it, or from BIP34 activation (which
+  implies it) up to BIP34_IMPLIES_BIP30_LIMIT.
+- scripts, optionally on a concurrent.futures.Executor
+
+Script checks are split into runs of consecutive transactions, so a failure
+is always reported for the lowest (tx index, input index) no matter which
+job finishes first.
+"""
+
+from __future__ import annotations
+
+import concurrent.futures
+from typing import Any, Iterable
+
+from pycoin.block import target_for_bits
+from pycoin.convention import SATOSHI_PER_COIN
+from pycoin.encoding.hash import double_sha256
+from pycoin.encoding.hexbytes import h2b_rev
+from pycoin.merkle import merkle
+from pycoin.satoshi.satoshi_int import satoshi_int_size
+
+from ..exceptions import BlockValidationError, ValidationFailureError
+from ..SolutionChecker import ScriptError
+from .sigops import block_validation_cost
+
+
+MAX_BLOCK_WEIGHT = 4000000
+MAX_BLOCK_SIGOPS_COST = 80000
+SUBSIDY_HALVING_INTERVAL = 210000
+
+# the mainnet blocks whose coinbases duplicate earlier ones, by height
+BIP30_EXCEPTIONS = {
+    91842: h2b_rev("00000000000a4d0a398161ffc163c503763b1f4360639393e0e4c8e300e0caec"),
+    91880: h2b_rev("00000000000743f190a18c5577a3c2d2a1f610ae9601ac046a38084ccb7cd721"),
+}
+BIP34_HEIGHT = 227931
+# the first height where a coinbase could repeat one from before BIP34
+BIP34_IMPLIES_BIP30_LIMIT = 1983702
+
+WITNESS_COMMITMENT_HEADER = b"\x6a\x24\xaa\x21\xa9\xed"
+ZERO32 = b"\0" * 32
+
+
+class UTXOProvider(object):
+    """
+    Where BlockValidator looks up the outputs a block spends.
+    """
+
+    def get_utxo(self, tx_hash: bytes, tx_out_index: int) -> Any:
+        """Return the unspent TxOut, or None if there isn't one."""
+        raise NotImplementedError()
+
+    def get_utxos(self, outpoints: Iterable[tuple[bytes, int]]) -> list[Any]:
+        """Look up several (tx_hash, tx_out_index) outpoints at once."""
+        return [self.get_utxo(tx_hash, idx) for tx_hash, idx in outpoints]
+
+
+class DictUTXOProvider(UTXOProvider):
+    """A UTXOProvider backed by a dict mapping (tx_hash, tx_out_index) to TxOut."""
+
+    def __init__(self, utxos: dict[tuple[bytes, int], Any] | None = None) -> None:
+        self.utxos = utxos if utxos is not None else {}
+
+    def get_utxo(self, tx_hash: bytes, tx_out_index: int) -> Any:
+        return self.utxos.get((tx_hash, tx_out_index))
+
+    def get_utxos(self, outpoints: Iterable[tuple[bytes, int]]) -> list[Any]:
+        get = self.utxos.get
+        return [get(outpoint) for outpoint in outpoints]
+
+
+def block_subsidy(height: int) -> int:
+    halvings = height // SUBSIDY_HALVING_INTERVAL
+    if halvings >= 64:
+        return 0
+    return int(50 * SATOSHI_PER_COIN) >> halvings
+
+
+def _first_script_failure(
+    tx_class: Any, flags: int | None, items: list[tuple[int, bytes, list[Any]]]
+) -> tuple[int, int, str] | None:
+    # runs in an executor, so it gets the transactions as bytes: a Tx refers to
+    # its block, and pickling it would pickle every other tx too
+    for tx_index, tx_bin, unspents in items:
+        tx = tx_class.from_buffer(tx_bin)[0]
+        tx.set_unspents([tx_class.TxOut(*unspent) for unspent in unspents])
+        for idx in range(len(tx.txs_in)):
+            try:
+                tx.check_solution(idx, flags=flags)
+            except ScriptError as ex:
+                return tx_index, idx, str(ex) or ex.__class__.__name__
+    return None
+
+
+class BlockValidator(object):
+    """
+    Validate blocks against a UTXOProvider.
+
+    :param utxo_provider: a :class:`UTXOProvider` for the outputs spent by the block
+    :param flags: (optional) script verification flags (see pycoin.satoshi.flags).
+        Defaults to the SolutionChecker defaults.
+    :param executor: (optional) a concurrent.futures.Executor to check scripts
+        on. By default, scripts are checked in this thread.
+    :param script_jobs: the number of jobs the script checks are split into when
+        there's an executor
+    :param check_pow: (optional) check the header hash against its bits
+    :param check_bip30: (optional) reject transactions that recreate outputs the
+        utxo_provider still has
+    :param bip30_exceptions: (optional) a dict of height to block hash of the
+        blocks BIP30 isn't checked for. Defaults to the mainnet ones.
+    :param bip34_height: (optional) the height BIP34 activates at, from which
+        BIP30 isn't checked up to BIP34_IMPLIES_BIP30_LIMIT, or None to check it
+        at every height. Defaults to the mainnet height.
+
+    The validator doesn't change the utxo_provider, and it doesn't check rules
+    that depend on other headers (bits, timestamps) or coinbase maturity.
+    """
+
+    def __init__(
+        self,
+        utxo_provider: UTXOProvider,
+        flags: int | None = None,
+        executor: concurrent.futures.Executor | None = None,
+        script_jobs: int = 16,
+        check_pow: bool = True,
+        check_bip30: bool = True,
+        bip30_exceptions: dict[int, bytes] | None = None,
+        bip34_height: int | None = BIP34_HEIGHT,
+    ) -> None:
+        self.utxo_provider = utxo_provider
+        self.flags = flags
+        self.executor = executor
+        self.script_jobs = script_jobs
+        self.check_pow = check_pow
+        self.check_bip30 = check_bip30
+        self.bip30_exceptions = (
+            BIP30_EXCEPTIONS if bip30_exceptions is None else bip30_exceptions
+        )
+        self.bip34_height = bip34_height
+
+    def validate(self, block: Any, height: int) -> int:
+        """
+        Check the block, which will be at the given height, and raise a
+        BlockValidationError for the first failure. Returns the total fees.
+
+        As a side effect, the unspents of every transaction are set.
+        """
+        if self.check_pow:
+            self.check_header(block)
+        self.check_structure(block)
+        fees = self.check_inputs(block, height)
+        self.check_scripts(block)
+        return fees
+
+    def check_header(self, block: Any) -> None:
+        try:
+            target = target_for_bits(block.difficulty)
+        except ValueError as ex:
+            raise BlockValidationError(str(ex))
+        if int.from_bytes(block.hash(), "little") > target:
+            raise BlockValidationError("proof of work is above target")
+
+    def check_structure(self, block: Any) -> None:
+        """The checks that don't depend on the outputs the block spends."""
+        txs = block.txs
+        if len(txs) == 0:
+            raise BlockValidationError("block has no transactions")
+        if not txs[0].is_coinbase():
+            raise BlockValidationError("first transaction is not a coinbase", 0)
+        weight = 4 * (80 + satoshi_int_size(len(txs)))
+        tx_hashes = set()
+        for tx_index, tx in enumerate(txs):
+            if tx_index > 0 and tx.is_coinbase():
+                raise BlockValidationError("more than one coinbase", tx_index)
+            try:
+                tx.check()
+            except ValidationFailureError as ex:
+                raise BlockValidationError(str(ex), tx_index)
+            h = tx.hash()
+            if h in tx_hashes:
+                raise BlockValidationError("duplicate transaction", tx_index)
+            tx_hashes.add(h)
+            weight += tx.weight()
+        if weight > MAX_BLOCK_WEIGHT:
+            raise BlockValidationError("block weight %d too high" % weight)
+        if merkle(block.tx_hashes(), double_sha256) != block.merkle_root:
+            raise BlockValidationError("bad merkle root")
+        self._check_witness_commitment(txs)
+
+    def _check_witness_commitment(self, txs: Any) -> None:
+        coinbase = txs[0]
+        commitment = None
+        for tx_out in coinbase.txs_out:
+            script = tx_out.script
+            if len(script) >= 38 and script[:6] == WITNESS_COMMITMENT_HEADER:
+                commitment = script[6:38]
+        if commitment is None:
+            for tx_index, tx in enumerate(txs):
+                if tx.has_witness_data():
+                    raise BlockValidationError(
+                        "witness data without a witness commitment", tx_index
+                    )
+            return
+        witness = coinbase.txs_in[0].witness
+        if len(witness) != 1 or len(witness[0]) != 32:
+            raise BlockValidationError("bad witness reserved value", 0)
+        w_hashes = [ZERO32] + [tx.w_hash() for tx in txs[1:]]
+        witness_root = merkle(w_hashes, double_sha256)
+        if double_sha256(witness_root + witness[0]) != commitment:
+            raise BlockValidationError("bad witness commitment", 0)
+
+    def enforces_bip30(self, block: Any, height: int) -> bool:
+        if not self.check_bip30:
+            return False
+        if self.bip30_exceptions.get(height) == block.hash():
+            return False
+        if self.bip34_height is not None and height >= self.bip34_height:
+            return height >= BIP34_IMPLIES_BIP30_LIMIT
+        return True
+
+    def check_inputs(self, block: Any, height: int) -> int:
+        """
+        Find the outputs spent by each transaction, set them as its unspents,
+        and check values and sigop cost. Returns the total fees.
+        """
+        txs = block.txs
+        # outputs created in this block, and the earliest tx that may spend them
+        created: dict[tuple[bytes, int], tuple[int, Any]] = {}
+        spent: set[tuple[bytes, int]] = set()
+        lookups = []
+        for tx_index, tx in enumerate(txs):
+            if tx_index > 0:
+                for tx_in_index, tx_in in enumerate(tx.txs_in):
+                    outpoint = (tx_in.previous_hash, tx_in.previous_index)
+                    if outpoint in spent:
+                        raise BlockValidationError(
+                            "input spent twice in block", tx_index, tx_in_index
+                        )
+                    spent.add(outpoint)
+                    if outpoint not in created:
+                        lookups.append(outpoint)
+            h = tx.hash()
+            for tx_out_index, tx_out in enumerate(tx.txs_out):
+                created[(h, tx_out_index)] = (tx_index + 1, tx_out)
+
+        # the outputs the block creates are looked up with those it spends
+        bip30_outpoints = list(created) if self.enforces_bip30(block, height) else []
+        utxos = self.utxo_provider.get_utxos(lookups + bip30_outpoints)
+        found = dict(zip(lookups, utxos))
+        for outpoint, utxo in zip(bip30_outpoints, utxos[len(lookups) :]):
+            if utxo is not None:
+                raise BlockValidationError(
+                    "transaction overwrites an unspent output",
+                    created[outpoint][0] - 1,
+                )
+
+        fees = 0
+        for tx_index, tx in enumerate(txs):
+            if tx_index == 0:
+                continue
+            unspents = []
+            for tx_in_index, tx_in in enumerate(tx.txs_in):
+                outpoint = (tx_in.previous_hash, tx_in.previous_index)
+                utxo = found.get(outpoint)
+                if utxo is None:
+                    first_index, utxo = created.get(outpoint, (0, None))
+                    if first_index > tx_index:
+                        utxo = None
+                if utxo is None:
+                    raise BlockValidationError(
+                        "input spends a missing or spent output",
+                        tx_index,
+                        tx_in_index,
+                    )
+                unspents.append(utxo)
+            tx.set_unspents(unspents)
+            total_in = sum(utxo.coin_value for utxo in unspents)
+            if total_in > tx.MAX_MONEY:
+                raise BlockValidationError("input total out of range", tx_index)
+            fee = total_in - tx.total_out()
+            if fee < 0:
+                raise BlockValidationError("outputs exceed inputs", tx_index)
+            fees += fee
+
+        if txs[0].total_out() > block_subsidy(height) + fees:
+            raise BlockValidationError("coinbase pays too much", 0)
+
+        sigop_cost = block_validation_cost(block, flags=self.flags).sigop_cost()
+        if sigop_cost > MAX_BLOCK_SIGOPS_COST:
+            raise BlockValidationError("sigop cost %d too high" % sigop_cost)
+        return fees
+
+    def check_scripts(self, block: Any) -> None:
+        """Check the solutions of every input. The unspents must already be set."""
+        txs = block.txs
+        if self.executor is None:
+            for tx_index in range(1, len(txs)):
+                tx = txs[tx_index]
+                for idx in range(len(tx.txs_in)):
+                    try:
+                        tx.check_solution(idx, flags=self.flags)
+                    except ScriptError as ex:
+                        raise BlockValidationError(
+                            str(ex) or ex.__class__.__name__, tx_index, idx
+                        )
+            return
+
+        items = [
+            (
+                tx_index,
+                txs[tx_index].as_bin(),
+                [(u.coin_value, u.script) for u in txs[tx_index].unspents],
+            )
+            for tx_index in range(1, len(txs))
+        ]
+        job_size = -(-len(items) // max(1, self.script_jobs))
+        futures = [
+            self.executor.submit(
+                _first_script_failure,
+                block.Tx,
+                self.flags,
+                items[start : start + job_size],
+            )
+            for start in range(0, len(items), job_size)
+        ]
+        # the jobs are in order, so the first job with a failure has the first failure
+        for future in futures:
+            failure = future.result()
+            if failure:
+                for other in futures:
+                    other.cancel()
+                tx_index, idx, message = failure
+                raise BlockValidationError(message, tx_index, idx)
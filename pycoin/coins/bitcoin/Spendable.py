@@ -14,6 +14,14 @@ from .TxOut import TxOut
 class Spendable(TxOut):
     TxIn = TxIn
 
+    __slots__ = (
+        "tx_hash",
+        "tx_out_index",
+        "block_index_available",
+        "does_seem_spent",
+        "block_index_spent",
+    )
+
     def __init__(
         self,
         coin_value: int,
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
 import io
+import struct
 import warnings
-from typing import Any, IO
+from typing import Any, Callable, IO
 
 from ..Tx import Tx as BaseTx
 
@@ -12,15 +13,20 @@ from .SolutionChecker import BitcoinSolutionChecker as SolutionChecker
 
 from pycoin.convention import SATOSHI_PER_COIN
 from pycoin.encoding.hash import double_sha256
-from pycoin.encoding.hexbytes import b2h, b2h_rev, h2b_rev
-from pycoin.satoshi.satoshi_struct import parse_struct, stream_struct
-from pycoin.satoshi.satoshi_int import parse_satoshi_int
+from pycoin.encoding.hexbytes import b2h, b2h_rev, bytes_as_revhex, h2b_rev
+from pycoin.satoshi.satoshi_struct import pack_struct, parse_struct, stream_struct
+from pycoin.satoshi.satoshi_int import (
+    parse_satoshi_int,
+    satoshi_int_size,
+    unpack_satoshi_int_from,
+)
 from pycoin.satoshi.satoshi_string import parse_satoshi_string, stream_satoshi_string
 
 from ..exceptions import BadSpendableError, ValidationFailureError
 from .TxIn import TxIn
 from .TxOut import TxOut
 from .Spendable import Spendable
+from .sigops import ValidationCost, tx_validation_cost
 
 
 MAX_MONEY = 21000000 * SATOSHI_PER_COIN
@@ -28,6 +34,8 @@ MAX_BLOCK_SIZE = 1000000
 
 ZERO32 = b"\0" * 32
 
+_unpack_outpoint = struct.Struct("<32sL").unpack_from
+
 
 class Tx(BaseTx):
     TxIn = TxIn
@@ -41,6 +49,9 @@ class Tx(BaseTx):
 
     ALLOW_SEGWIT = True
 
+    # the hash used for txids
+    HASH_F: Callable[[bytes], bytes] = staticmethod(double_sha256)
+
     @classmethod
     def coinbase_tx(
         cls: type[Tx],
@@ -91,14 +102,163 @@ class Tx(BaseTx):
 
         if is_segwit:
             for tx_in in txs_in:
-                stack = []
                 count = parse_satoshi_int(f)
-                for i in range(count):
-                    stack.append(parse_satoshi_string(f))
-                tx_in.witness = stack
+                if count:
+                    tx_in.witness = [parse_satoshi_string(f) for i in range(count)]
         (lock_time,) = parse_struct("L", f)
         return class_(version, txs_in, txs_out, lock_time)
 
+    @classmethod
+    def from_buffer(  # type: ignore[override]
+        class_: type[Tx],
+        buf: bytes | memoryview,
+        offset: int = 0,
+        allow_segwit: bool | None = None,
+    ) -> tuple[Tx, int]:
+        """Parse a Bitcoin transaction Tx directly out of a buffer, without going
+        through file-like reads.
+
+        :param buf: a bytes-like object (bytes, bytearray, memoryview, mmap)
+        :param offset: (optional) where the transaction starts in buf
+        :param allow_segwit: (optional) as in :func:`Tx.parse <parse>`
+        :return: a tuple of the :class:`Tx` and the offset just past its end
+
+        Scripts and witness items are copied out of buf, so the transaction doesn't
+        keep buf alive.
+        """
+        if not class_.has_buffer_parser():
+            # this subclass has its own wire format
+            return super(Tx, class_).from_buffer(buf, offset)  # type: ignore[return-value]
+        if allow_segwit is None:
+            allow_segwit = class_.ALLOW_SEGWIT
+        # slicing bytes copies once; other buffers are sliced through a memoryview
+        mv = buf if isinstance(buf, bytes) else memoryview(buf)
+        unpack_from = struct.unpack_from
+        start = offset
+        (version,) = unpack_from("<L", mv, offset)
+        offset += 4
+        is_segwit = allow_segwit and mv[offset] == 0
+        flag = 0
+        if is_segwit:
+            if offset + 1 >= len(mv) or mv[offset + 1] == 0:
+                raise ValueError("bad flag in segwit")
+            flag = mv[offset + 1]
+            is_segwit = bool(flag & 1)
+            if is_segwit:
+                offset += 2
+
+        TxIn = class_.TxIn
+        count, offset = unpack_satoshi_int_from(mv, offset)
+        txs_in = []
+        txs_in_bins = []
+        for i in range(count):
+            tx_in_start = offset
+            previous_hash, previous_index = _unpack_outpoint(mv, offset)
+            size, offset = unpack_satoshi_int_from(mv, offset + 36)
+            script = bytes(mv[offset : offset + size])
+            offset += size
+            (sequence,) = unpack_from("<L", mv, offset)
+            offset += 4
+            tx_in = TxIn(
+                bytes_as_revhex(previous_hash), previous_index, script, sequence
+            )
+            # the parsed bytes seed the serialization caches
+            tx_in_bin = bytes(mv[tx_in_start:offset])
+            tx_in._bin = (
+                (tx_in.previous_hash, previous_index, script, sequence),
+                tx_in_bin,
+            )
+            txs_in.append(tx_in)
+            txs_in_bins.append(tx_in_bin)
+
+        TxOut = class_.TxOut
+        count, offset = unpack_satoshi_int_from(mv, offset)
+        txs_out = []
+        txs_out_bins = []
+        for i in range(count):
+            tx_out_start = offset
+            (coin_value,) = unpack_from("<Q", mv, offset)
+            size, offset = unpack_satoshi_int_from(mv, offset + 8)
+            tx_out = TxOut(coin_value, bytes(mv[offset : offset + size]))
+            offset += size
+            tx_out_bin = bytes(mv[tx_out_start:offset])
+            tx_out._bin = ((tx_out.coin_value, tx_out.script), tx_out_bin)
+            txs_out.append(tx_out)
+            txs_out_bins.append(tx_out_bin)
+
+        if is_segwit:
+            for tx_in in txs_in:
+                count, offset = unpack_satoshi_int_from(mv, offset)
+                if not count:
+                    continue
+                stack = []
+                for i in range(count):
+                    size, offset = unpack_satoshi_int_from(mv, offset)
+                    stack.append(bytes(mv[offset : offset + size]))
+                    offset += size
+                tx_in.witness = stack
+        (lock_time,) = unpack_from("<L", mv, offset)
+        offset += 4
+        tx = class_(version, txs_in, txs_out, lock_time)
+        witnesses = tuple(tuple(tx_in.witness) for tx_in in txs_in)
+        cache = tx._cache
+        cache["key"] = (version, lock_time, txs_in_bins, txs_out_bins)
+        cache["witnesses"] = witnesses
+        if not is_segwit:
+            cache["bin"] = bytes(mv[start:offset])
+        elif flag == 1 and any(witnesses):
+            # a segwit tx with no witness data streams in the old format, and
+            # any other flag streams as 1
+            cache["w_bin"] = bytes(mv[start:offset])
+        return tx, offset
+
+    @classmethod
+    def has_buffer_parser(class_: type[Tx]) -> bool:
+        # a subclass with its own parse has its own wire format
+        return class_.parse.__func__ is Tx.parse.__func__  # type: ignore[attr-defined,no-any-return]
+
+    @classmethod
+    def scan_buffer(  # type: ignore[override]
+        class_: type[Tx],
+        buf: bytes | memoryview,
+        offset: int = 0,
+        allow_segwit: bool | None = None,
+    ) -> tuple[int, int, int]:
+        """Find the extent of a Bitcoin transaction Tx in buf by skipping over
+        its fields. See :func:`pycoin.coins.Tx.Tx.scan_buffer`.
+        """
+        if not class_.has_buffer_parser():
+            raise NotImplementedError()
+        if allow_segwit is None:
+            allow_segwit = class_.ALLOW_SEGWIT
+        io_start = offset + 4
+        is_segwit = allow_segwit and buf[io_start] == 0
+        if is_segwit:
+            if io_start + 1 >= len(buf) or buf[io_start + 1] == 0:
+                raise ValueError("bad flag in segwit")
+            is_segwit = bool(buf[io_start + 1] & 1)
+            if is_segwit:
+                io_start += 2
+        txs_in_count, offset = unpack_satoshi_int_from(buf, io_start)
+        for i in range(txs_in_count):
+            size, offset = unpack_satoshi_int_from(buf, offset + 36)
+            offset += size + 4
+        count, offset = unpack_satoshi_int_from(buf, offset)
+        for i in range(count):
+            size, offset = unpack_satoshi_int_from(buf, offset + 8)
+            offset += size
+        io_end = offset
+        if is_segwit:
+            for i in range(txs_in_count):
+                count, offset = unpack_satoshi_int_from(buf, offset)
+                for j in range(count):
+                    size, offset = unpack_satoshi_int_from(buf, offset)
+                    offset += size
+        end = offset + 4
+        if end > len(buf):
+            raise ValueError("transaction extends past end of buffer")
+        return io_start, io_end, end
+
     @classmethod
     def tx_from_hex(cls: type[Tx], hex_string: str) -> Tx:  # type: ignore[override]
         warnings.simplefilter("always", DeprecationWarning)
@@ -135,6 +295,7 @@ class Tx(BaseTx):
         self.txs_out = txs_out
         self.lock_time = lock_time
         self.unspents: list[Any] = unspents or []
+        self._cache: dict[str, Any] = {}
         for tx_in in self.txs_in:
             assert type(tx_in) is self.TxIn
         for tx_out in self.txs_out:
@@ -157,26 +318,93 @@ class Tx(BaseTx):
         :param include_witness_data: (optional) stream segwit transactions including the witness data if the
             transaction has any witness data. Defaults to True.
         """
-        include_witnesses = include_witness_data and self.has_witness_data()
-        stream_struct("L", f, self.version)
-        if include_witnesses:
-            f.write(b"\0\1")
-        stream_struct("I", f, len(self.txs_in))
-        for t in self.txs_in:
-            t.stream(f, blank_solutions=blank_solutions)
-        stream_struct("I", f, len(self.txs_out))
-        for t in self.txs_out:
-            t.stream(f)
-        if include_witnesses:
-            for tx_in in self.txs_in:
-                witness = tx_in.witness
-                stream_struct("I", f, len(witness))
-                for w in witness:
-                    stream_satoshi_string(f, w)
-        stream_struct("L", f, self.lock_time)
+        if blank_solutions:
+            include_witnesses = include_witness_data and self.has_witness_data()
+            stream_struct("L", f, self.version)
+            if include_witnesses:
+                f.write(b"\0\1")
+            stream_struct("I", f, len(self.txs_in))
+            for t in self.txs_in:
+                t.stream(f, blank_solutions=blank_solutions)
+            stream_struct("I", f, len(self.txs_out))
+            for t in self.txs_out:
+                t.stream(f)
+            if include_witnesses:
+                for tx_in in self.txs_in:
+                    witness = tx_in.witness
+                    stream_struct("I", f, len(witness))
+                    for w in witness:
+                        stream_satoshi_string(f, w)
+            stream_struct("L", f, self.lock_time)
+        else:
+            f.write(self._as_bin(include_witness_data))
         if include_unspents and not self.missing_unspents():
             self.stream_unspents(f)
 
+    def as_bin(self, *args: Any, **kwargs: Any) -> bytes:
+        if args or kwargs:
+            return super(Tx, self).as_bin(*args, **kwargs)
+        return self._as_bin(True)
+
+    def mark_dirty(self) -> None:
+        """
+        Drop the cached serializations and hashes.
+
+        Changes to the transaction are normally noticed automatically. This is only
+        needed if a script or witness item is a mutable buffer changed in place.
+        """
+        self._cache.clear()
+        for t in self.txs_in:
+            t._bin = None
+        for t in self.txs_out:
+            t._bin = None
+
+    def _cached(self) -> dict[str, Any]:
+        """
+        Return the cache of serializations and hashes, first clearing what is
+        stale. The txs_in and txs_out cache their own serializations, so checking
+        is just comparing those (usually by identity) and the witnesses.
+        """
+        key = (
+            self.version,
+            self.lock_time,
+            [tx_in.as_bin() for tx_in in self.txs_in],
+            [tx_out.as_bin() for tx_out in self.txs_out],
+        )
+        witnesses = tuple(tuple(tx_in.witness) for tx_in in self.txs_in)
+        cache = self._cache
+        if cache.get("key") != key:
+            cache.clear()
+            cache["key"] = key
+            cache["witnesses"] = witnesses
+        elif cache["witnesses"] != witnesses:
+            cache.pop("w_bin", None)
+            cache.pop("w_hash", None)
+            cache["witnesses"] = witnesses
+        return cache
+
+    def _as_bin(self, include_witness_data: bool) -> bytes:
+        cache = self._cached()
+        witnesses = cache["witnesses"]
+        name = "w_bin" if include_witness_data and any(witnesses) else "bin"
+        b: bytes | None = cache.get(name)
+        if b is None:
+            version, lock_time, txs_in_bins, txs_out_bins = cache["key"]
+            parts = [pack_struct("L", version)]
+            if name == "w_bin":
+                parts.append(b"\0\1")
+            parts.append(pack_struct("I", len(txs_in_bins)))
+            parts.extend(txs_in_bins)
+            parts.append(pack_struct("I", len(txs_out_bins)))
+            parts.extend(txs_out_bins)
+            if name == "w_bin":
+                for witness in witnesses:
+                    parts.append(pack_struct("I", len(witness)))
+                    parts.extend(pack_struct("S", w) for w in witness)
+            parts.append(pack_struct("L", lock_time))
+            b = cache[name] = b"".join(parts)
+        return b
+
     def set_witness(self, tx_idx_in: int, witness: list[bytes]) -> None:
         """Set the witness data for a given :class:`TxIn`.
 
@@ -189,6 +417,69 @@ class Tx(BaseTx):
         """Return a boolean indicating if the transaction has any segwit data."""
         return any(len(tx_in.witness) > 0 for tx_in in self.txs_in)
 
+    def solution_sizes(self) -> list[tuple[int, int]]:
+        """Return the (script length, witness size) of each :class:`TxIn`. The witness
+        size includes the item count, and is 0 for no witness data."""
+        solution_sizes = []
+        for tx_in in self.txs_in:
+            witness = tx_in.witness
+            witness_size = 0
+            if witness:
+                witness_size = satoshi_int_size(len(witness))
+                for w in witness:
+                    witness_size += satoshi_int_size(len(w)) + len(w)
+            solution_sizes.append((len(tx_in.script), witness_size))
+        return solution_sizes
+
+    def sizes(
+        self, solution_sizes: list[tuple[int, int]] | None = None
+    ) -> tuple[int, int]:
+        """Return (stripped_size, size) of the streamed transaction, worked out from
+        the lengths of the fields rather than by streaming it.
+
+        :param solution_sizes: (optional) sizes to use instead of those from
+            :func:`solution_sizes`, to estimate the size of a transaction before
+            it's signed.
+        """
+        if solution_sizes is None:
+            solution_sizes = self.solution_sizes()
+        # version, lock_time, and 36 + 4 bytes of outpoint and sequence per TxIn
+        size = 8 + satoshi_int_size(len(self.txs_in)) + 40 * len(self.txs_in)
+        size += satoshi_int_size(len(self.txs_out))
+        witness_total = 0
+        has_witness = False
+        for script_size, witness_size in solution_sizes:
+            size += satoshi_int_size(script_size) + script_size
+            if witness_size:
+                has_witness = True
+                witness_total += witness_size
+            else:
+                witness_total += 1
+        for tx_out in self.txs_out:
+            script_size = len(tx_out.script)
+            size += 8 + satoshi_int_size(script_size) + script_size
+        if not has_witness:
+            return size, size
+        # the segwit marker and flag, then the witnesses
+        return size, size + 2 + witness_total
+
+    def size(self) -> int:
+        """Return the length of the streamed transaction, including witness data."""
+        return self.sizes()[1]
+
+    def stripped_size(self) -> int:
+        """Return the length of the streamed transaction without witness data."""
+        return self.sizes()[0]
+
+    def weight(self) -> int:
+        """Return the BIP141 weight: three times the stripped size plus the size."""
+        stripped_size, size = self.sizes()
+        return 3 * stripped_size + size
+
+    def vsize(self) -> int:
+        """Return the virtual size, which is the weight / 4 rounded up."""
+        return (self.weight() + 3) // 4
+
     def hash(self, hash_type: int | None = None) -> bytes:  # type: ignore[override]
         """Return the binary hash for this :class:`Tx` object.
 
@@ -196,18 +487,24 @@ class Tx(BaseTx):
 
         :return: 32 byte long binary blob corresponding to the hash
         """
-        s = io.BytesIO()
-        self.stream(s, include_witness_data=False)
         if hash_type is not None:
-            stream_struct("L", s, hash_type)
-        return double_sha256(s.getvalue())
+            return self.HASH_F(self._as_bin(False) + pack_struct("L", hash_type))
+        cache = self._cached()
+        h = cache.get("hash")
+        if h is None:
+            h = cache["hash"] = self.HASH_F(self._as_bin(False))
+        return h  # type: ignore[no-any-return]
 
     def w_hash(self) -> bytes:
         """Return the segwit-specific binary hash for this :class:`Tx` object.
 
         :return: 32 byte long binary blob corresponding to the hash
         """
-        return double_sha256(self.as_bin())
+        cache = self._cached()
+        h = cache.get("w_hash")
+        if h is None:
+            h = cache["w_hash"] = self.HASH_F(self._as_bin(True))
+        return h  # type: ignore[no-any-return]
 
     def w_id(self) -> str:
         """Return the segwit-specific binary hash for this :class:`Tx` object as a hex string.
@@ -228,7 +525,7 @@ class Tx(BaseTx):
         """
         s = io.BytesIO()
         self.stream(s, blank_solutions=True)
-        return double_sha256(s.getvalue())
+        return self.HASH_F(s.getvalue())
 
     def total_out(self) -> int:
         return sum(tx_out.coin_value for tx_out in self.txs_out)
@@ -261,7 +558,7 @@ class Tx(BaseTx):
             raise ValidationFailureError("txs_in = []")
 
     def _check_size_limit(self) -> None:
-        size = len(self.as_bin())
+        size = self.size()
         if size > self.MAX_TX_SIZE:
             raise ValidationFailureError("size > MAX_TX_SIZE")
 
@@ -277,7 +574,7 @@ class Tx(BaseTx):
 
     def _check_txs_in(self) -> None:
         # Check for duplicate inputs
-        if [x for x in self.txs_in if self.txs_in.count(x) > 1]:
+        if len(set(map(id, self.txs_in))) != len(self.txs_in):
             raise ValidationFailureError("duplicate inputs")
         if self.is_coinbase():
             if not (2 <= len(self.txs_in[0].script) <= 100):
@@ -303,6 +600,13 @@ class Tx(BaseTx):
         # Size limits
         self._check_size_limit()
 
+    def validation_cost(self, flags: int | None = None) -> ValidationCost:
+        """
+        Estimate how expensive checking the solutions of this transaction will be,
+        without running the VM. See :func:`pycoin.coins.bitcoin.sigops.tx_validation_cost`.
+        """
+        return tx_validation_cost(self, flags=flags)
+
     def bad_solution_count(self, *args: Any, **kwargs: Any) -> int:
         if self.is_coinbase():
             return 0
@@ -315,6 +619,14 @@ class Tx(BaseTx):
     """
 
     def unspents_from_db(self, tx_db: Any, ignore_missing: bool = False) -> None:
+        """
+        Set unspents from tx_db, which is either dict-like, mapping a tx hash
+        to the whole transaction, or has a get_utxos method that looks up
+        (tx_hash, tx_out_index) outpoints, like a UTXOStore.
+        """
+        if hasattr(tx_db, "get_utxos"):
+            self._unspents_from_utxos(tx_db, ignore_missing)
+            return
         unspents: list[Any] = []
         for tx_in in self.txs_in:
             if tx_in.is_coinbase():
@@ -332,6 +644,27 @@ class Tx(BaseTx):
                 )
         self.unspents = unspents
 
+    def _unspents_from_utxos(self, utxo_db: Any, ignore_missing: bool) -> None:
+        outpoints = [
+            (tx_in.previous_hash, tx_in.previous_index)
+            for tx_in in self.txs_in
+            if not tx_in.is_coinbase()
+        ]
+        found = iter(utxo_db.get_utxos(outpoints))
+        unspents: list[Any] = []
+        for tx_in in self.txs_in:
+            if tx_in.is_coinbase():
+                unspents.append(None)
+                continue
+            tx_out = next(found)
+            if tx_out is None and not ignore_missing:
+                raise KeyError(
+                    "can't find tx_out for %s:%d"
+                    % (b2h_rev(tx_in.previous_hash), tx_in.previous_index)
+                )
+            unspents.append(tx_out)
+        self.unspents = unspents
+
     def missing_unspent(self, idx: int) -> bool:
         if self.is_coinbase():
             return True
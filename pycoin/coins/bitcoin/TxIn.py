@@ -1,28 +1,45 @@
 from __future__ import annotations
 
-from typing import Any, IO
+from typing import Any, IO, Sequence
 
 from pycoin.encoding.hash import hash160
 from pycoin.encoding.hexbytes import b2h, b2h_rev, h2b
-from pycoin.satoshi.satoshi_struct import parse_struct, stream_struct
+from pycoin.satoshi.satoshi_struct import pack_struct, parse_struct, stream_struct
 
 from .ScriptTools import BitcoinScriptTools as ScriptTools  # BRAIN DAMAGE
 
 
 ZERO = b"\0" * 32
 
+# shared by every TxIn without witness data, so they don't each need a list
+EMPTY_WITNESS: tuple[bytes, ...] = ()
+
 
 class TxIn:
     """
     The part of a Tx that specifies where the Bitcoin comes from.
     """
 
+    __slots__ = (
+        "previous_hash",
+        "previous_index",
+        "script",
+        "sequence",
+        "witness",
+        "_bin",
+    )
+
+    witness: Sequence[bytes]
+    # (fields, serialization) of the last call to as_bin
+    _bin: tuple[tuple[Any, ...], bytes] | None
+
     def __init__(self, previous_hash: bytes, previous_index: int, script: bytes = b"", sequence: int = 4294967295) -> None:
         self.previous_hash = previous_hash
         self.previous_index = previous_index
         self.script = script
         self.sequence = sequence
-        self.witness: list[bytes] = []
+        self.witness = EMPTY_WITNESS
+        self._bin = None
 
     @classmethod
     def coinbase_tx_in(class_, script: bytes) -> TxIn:
@@ -30,10 +47,23 @@ class TxIn:
         return tx
 
     def stream(self, f: IO[bytes], blank_solutions: bool = False) -> None:
-        script = b"" if blank_solutions else self.script
-        stream_struct(
-            "#LSL", f, self.previous_hash, self.previous_index, script, self.sequence
-        )
+        if blank_solutions:
+            stream_struct(
+                "#LSL", f, self.previous_hash, self.previous_index, b"", self.sequence
+            )
+        else:
+            f.write(self.as_bin())
+
+    def as_bin(self) -> bytes:
+        """
+        Return the streamed TxIn (witness data isn't part of it). The result is
+        cached for as long as the streamed fields stay the same.
+        """
+        fields = (self.previous_hash, self.previous_index, self.script, self.sequence)
+        cached = self._bin
+        if cached is None or cached[0] != fields:
+            cached = self._bin = (fields, pack_struct("#LSL", *fields))
+        return cached[1]
 
     @classmethod
     def parse(cls, f: IO[bytes]) -> TxIn:
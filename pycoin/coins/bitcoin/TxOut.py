@@ -1,11 +1,11 @@
 from __future__ import annotations
 
-from typing import IO
+from typing import Any, IO
 
 from .ScriptTools import BitcoinScriptTools  # BRAIN DAMAGE
 from ...convention import satoshi_to_mbtc
 
-from pycoin.satoshi.satoshi_struct import parse_struct, stream_struct
+from pycoin.satoshi.satoshi_struct import pack_struct, parse_struct
 
 
 class TxOut:
@@ -15,13 +15,30 @@ class TxOut:
     The part of a Tx that specifies where the Bitcoin goes to.
     """
 
+    __slots__ = ("coin_value", "script", "_bin")
+
+    # (fields, serialization) of the last call to as_bin
+    _bin: tuple[tuple[Any, ...], bytes] | None
+
     def __init__(self, coin_value: int, script: bytes) -> None:
         assert isinstance(script, bytes)
         self.coin_value = self.COIN_VALUE_CAST_F(coin_value)
         self.script = script
+        self._bin = None
 
     def stream(self, f: IO[bytes]) -> None:
-        stream_struct("QS", f, self.coin_value, self.script)
+        f.write(TxOut.as_bin(self))
+
+    def as_bin(self) -> bytes:
+        """
+        Return the streamed TxOut. The result is cached for as long as coin_value
+        and script stay the same.
+        """
+        fields = (self.coin_value, self.script)
+        cached = self._bin
+        if cached is None or cached[0] != fields:
+            cached = self._bin = (fields, pack_struct("QS", *fields))
+        return cached[1]
 
     @classmethod
     def parse(cls, f: IO[bytes]) -> TxOut:
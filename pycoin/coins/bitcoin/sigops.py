@@ -0,0 +1,221 @@
+"""
+Static signature operation counting and validation cost estimation.
+
+Nothing here runs the VM. Each script is walked once with the ScriptStreamer,
+which is enough to reproduce the consensus sigop counting rules (legacy,
+accurate P2SH and witness) and to estimate how many EC verifications checking
+the transaction will take.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+from typing import Any
+
+from pycoin.satoshi.flags import VERIFY_P2SH, VERIFY_WITNESS
+
+from .ScriptTools import BitcoinScriptTools
+
+
+MAX_PUBKEYS_PER_MULTISIG = 20
+WITNESS_SCALE_FACTOR = 4
+
+OP_1 = BitcoinScriptTools.int_for_opcode("OP_1")
+OP_16 = BitcoinScriptTools.int_for_opcode("OP_16")
+OP_CHECKSIG = BitcoinScriptTools.int_for_opcode("OP_CHECKSIG")
+OP_CHECKSIGVERIFY = BitcoinScriptTools.int_for_opcode("OP_CHECKSIGVERIFY")
+OP_CHECKMULTISIG = BitcoinScriptTools.int_for_opcode("OP_CHECKMULTISIG")
+OP_CHECKMULTISIGVERIFY = BitcoinScriptTools.int_for_opcode("OP_CHECKMULTISIGVERIFY")
+
+
+@dataclasses.dataclass
+class ScriptSummary:
+    """
+    The result of a single pass over a script.
+
+    legacy_sigops: sigops counted the pre-P2SH way (every multisig is 20)
+    accurate_sigops: sigops with multisig counted from the preceding OP_n
+    push_only: True if every opcode pushes data
+    last_push: the data of the last push (the redeem script for p2sh)
+    """
+
+    legacy_sigops: int = 0
+    accurate_sigops: int = 0
+    push_only: bool = True
+    last_push: bytes | None = None
+
+
+@dataclasses.dataclass
+class ValidationCost:
+    """
+    Estimated cost of validating a transaction or a block.
+
+    legacy_sigops: scriptSig and scriptPubKey sigops, counted inaccurately
+    p2sh_sigops: accurate sigops in the redeem scripts of p2sh inputs
+    witness_sigops: accurate sigops in witness programs
+    ec_verifications: upper bound on signature checks the VM will do
+    script_size_histogram: maps a power of two to the number of scripts whose
+        size is at most that value (and more than half of it)
+    missing_unspents: inputs whose previous output was unknown; only their
+        legacy sigops are counted
+    """
+
+    legacy_sigops: int = 0
+    p2sh_sigops: int = 0
+    witness_sigops: int = 0
+    ec_verifications: int = 0
+    script_size_histogram: dict[int, int] = dataclasses.field(default_factory=dict)
+    missing_unspents: int = 0
+
+    def sigop_cost(self) -> int:
+        """Return the BIP141 sigop cost, as limited by MAX_BLOCK_SIGOPS_COST."""
+        return (
+            self.legacy_sigops + self.p2sh_sigops
+        ) * WITNESS_SCALE_FACTOR + self.witness_sigops
+
+    def add_script_size(self, size: int) -> None:
+        bucket = 1 << (size - 1).bit_length() if size > 0 else 0
+        self.script_size_histogram[bucket] = (
+            self.script_size_histogram.get(bucket, 0) + 1
+        )
+
+    def __add__(self, other: ValidationCost) -> ValidationCost:
+        histogram = dict(self.script_size_histogram)
+        for k, v in other.script_size_histogram.items():
+            histogram[k] = histogram.get(k, 0) + v
+        return ValidationCost(
+            legacy_sigops=self.legacy_sigops + other.legacy_sigops,
+            p2sh_sigops=self.p2sh_sigops + other.p2sh_sigops,
+            witness_sigops=self.witness_sigops + other.witness_sigops,
+            ec_verifications=self.ec_verifications + other.ec_verifications,
+            script_size_histogram=histogram,
+            missing_unspents=self.missing_unspents + other.missing_unspents,
+        )
+
+
+def summarize_script(script: bytes, script_streamer: Any = None) -> ScriptSummary:
+    """
+    Walk the script once, counting sigops both ways. Like bitcoind, stop
+    counting at the first opcode that can't be parsed.
+    """
+    if script_streamer is None:
+        script_streamer = BitcoinScriptTools.scriptStreamer
+    summary = ScriptSummary()
+    last_opcode = None
+    pc = 0
+    while pc < len(script):
+        opcode, data, pc, is_ok = script_streamer.get_opcode(script, pc)
+        if not is_ok:
+            summary.push_only = False
+            break
+        if opcode > OP_16:  # type: ignore[operator]
+            summary.push_only = False
+        if data is not None:
+            summary.last_push = data
+        if opcode in (OP_CHECKSIG, OP_CHECKSIGVERIFY):
+            summary.legacy_sigops += 1
+            summary.accurate_sigops += 1
+        elif opcode in (OP_CHECKMULTISIG, OP_CHECKMULTISIGVERIFY):
+            summary.legacy_sigops += MAX_PUBKEYS_PER_MULTISIG
+            if last_opcode is not None and OP_1 <= last_opcode <= OP_16:  # type: ignore[operator]
+                summary.accurate_sigops += last_opcode - OP_1 + 1  # type: ignore[operator]
+            else:
+                summary.accurate_sigops += MAX_PUBKEYS_PER_MULTISIG
+        last_opcode = opcode
+    return summary
+
+
+def script_sigop_count(script: bytes, accurate: bool = False) -> int:
+    """Return the sigop count of a script, as GetSigOpCount in bitcoind."""
+    summary = summarize_script(script)
+    return summary.accurate_sigops if accurate else summary.legacy_sigops
+
+
+def _witness_cost(
+    checker: Any, witness_program_script: bytes, witness: Any, cost: ValidationCost
+) -> None:
+    version = checker._witness_program_version(witness_program_script)
+    if version is None:
+        return
+    program = witness_program_script[2:]
+    if version == 0:
+        if len(program) == 20:
+            cost.witness_sigops += 1
+            cost.ec_verifications += 1
+        elif len(program) == 32 and len(witness) > 0:
+            summary = summarize_script(witness[-1], checker.VM.ScriptStreamer)
+            cost.add_script_size(len(witness[-1]))
+            cost.witness_sigops += summary.accurate_sigops
+            cost.ec_verifications += summary.accurate_sigops
+    elif version == 1 and len(program) == 32:
+        # taproot sigops are budgeted differently and aren't counted here
+        stack = list(witness)
+        if len(stack) >= 2 and len(stack[-1]) > 0 and stack[-1][0] == 0x50:
+            stack.pop()  # annex
+        if len(stack) == 1:
+            cost.ec_verifications += 1
+        elif len(stack) >= 2:
+            summary = summarize_script(stack[-2], checker.VM.ScriptStreamer)
+            cost.add_script_size(len(stack[-2]))
+            cost.ec_verifications += summary.accurate_sigops
+
+
+def tx_validation_cost(tx: Any, flags: int | None = None) -> ValidationCost:
+    """
+    Estimate the cost of validating the solutions of tx without running any script.
+
+    The previous outputs come from tx.unspents. Inputs without one can only
+    contribute their legacy sigops, and are counted in missing_unspents.
+    """
+    checker = tx.SolutionChecker(tx)
+    script_streamer = checker.VM.ScriptStreamer
+    if flags is None:
+        flags = checker.DEFAULT_FLAGS
+
+    cost = ValidationCost()
+    for tx_out in tx.txs_out:
+        cost.add_script_size(len(tx_out.script))
+        cost.legacy_sigops += summarize_script(
+            tx_out.script, script_streamer
+        ).legacy_sigops
+
+    is_coinbase = tx.is_coinbase()
+    for idx, tx_in in enumerate(tx.txs_in):
+        cost.add_script_size(len(tx_in.script))
+        solution_summary = summarize_script(tx_in.script, script_streamer)
+        cost.legacy_sigops += solution_summary.legacy_sigops
+        if is_coinbase:
+            continue
+        if tx.missing_unspent(idx):
+            cost.missing_unspents += 1
+            continue
+
+        puzzle_script = tx.unspents[idx].script
+        puzzle_summary = summarize_script(puzzle_script, script_streamer)
+        cost.ec_verifications += (
+            solution_summary.accurate_sigops + puzzle_summary.accurate_sigops
+        )
+
+        witness_program_script = puzzle_script
+        if flags & VERIFY_P2SH and checker.is_pay_to_script_hash(puzzle_script):
+            redeem_script = solution_summary.last_push
+            if not solution_summary.push_only or redeem_script is None:
+                continue
+            redeem_summary = summarize_script(redeem_script, script_streamer)
+            cost.add_script_size(len(redeem_script))
+            cost.p2sh_sigops += redeem_summary.accurate_sigops
+            cost.ec_verifications += redeem_summary.accurate_sigops
+            witness_program_script = redeem_script
+
+        if flags & VERIFY_WITNESS:
+            _witness_cost(checker, witness_program_script, tx_in.witness, cost)
+
+    return cost
+
+
+def block_validation_cost(block: Any, flags: int | None = None) -> ValidationCost:
+    """Sum tx_validation_cost over the transactions of a block."""
+    cost = ValidationCost()
+    for tx in block.txs:
+        cost = cost + tx_validation_cost(tx, flags=flags)
+    return cost
@@ -4,3 +4,42 @@ class ValidationFailureError(Exception):
 
 class BadSpendableError(Exception):
     pass
+
+
+class BlockValidationError(ValidationFailureError):
+    """
+    A block failed validation. tx_index and tx_in_index locate the failure
+    when it's specific to a transaction or an input.
+    """
+
+    def __init__(
+        self, message: str, tx_index: int | None = None, tx_in_index: int | None = None
+    ) -> None:
+        super(BlockValidationError, self).__init__(message)
+        self.tx_index = tx_index
+        self.tx_in_index = tx_in_index
+
+    def __str__(self) -> str:
+        where = ""
+        if self.tx_index is not None:
+            where = " (tx %d" % self.tx_index
+            if self.tx_in_index is not None:
+                where += ", input %d" % self.tx_in_index
+            where += ")"
+        return "%s%s" % (self.args[0], where)
+
+
+class HeaderValidationError(ValidationFailureError):
+    """
+    A block header failed validation. header_index is the position of the
+    header in the batch being checked.
+    """
+
+    def __init__(self, message: str, header_index: int | None = None) -> None:
+        super(HeaderValidationError, self).__init__(message)
+        self.header_index = header_index
+
+    def __str__(self) -> str:
+        if self.header_index is None:
+            return self.args[0]  # type: ignore[no-any-return]
+        return "%s (header %d)" % (self.args[0], self.header_index)
@@ -11,6 +11,8 @@ from .Tx import Tx
 class Block(BaseBlock):
     Tx = Tx
 
+    __slots__ = ()
+
     def _calculate_hash(self) -> bytes:
         s = io.BytesIO()
         self.stream_header(s)
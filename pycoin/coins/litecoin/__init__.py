@@ -36,11 +36,9 @@ class LTCTx(Tx):
             txs_out.append(class_.TxOut.parse(f))
         if is_segwit:
             for tx_in in txs_in:
-                stack = []
                 count = parse_satoshi_int(f)
-                for i in range(count):
-                    stack.append(parse_satoshi_string(f))
-                tx_in.witness = stack
+                if count:
+                    tx_in.witness = [parse_satoshi_string(f) for i in range(count)]
         if has_mweb:
             mweb_tx_type = ord(f.read(1))
             if mweb_tx_type:
@@ -53,3 +51,5 @@ class LTCTx(Tx):
 
 class LTCBlock(Block):
     Tx = LTCTx
+
+    __slots__ = ()
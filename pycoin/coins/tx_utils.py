@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import functools
 from collections.abc import Generator, Iterator
 from typing import Any
 
@@ -10,6 +11,64 @@ class SecretExponentMissing(Exception):
     pass
 
 
+# the (script length, witness size) of a typical solution for each script type.
+# Signatures are counted at 72 bytes (the largest low-S DER signature, with the
+# sighash byte), and public keys as compressed.
+SOLUTION_SIZES: dict[str, tuple[int, int]] = {
+    "p2pk": (1 + 72, 0),
+    "p2pkh": (1 + 72 + 1 + 33, 0),
+    "p2pkh_wit": (0, 1 + 1 + 72 + 1 + 33),
+    # assumed to be a p2pkh_wit script wrapped in p2sh
+    "p2sh": (1 + 22, 1 + 1 + 72 + 1 + 33),
+    # a key path spend with the default sighash
+    "p2tr": (0, 1 + 1 + 64),
+}
+
+
+@functools.lru_cache(maxsize=4096)
+def solution_size_for_script(contract: Any, script: bytes) -> tuple[int, int]:
+    """
+    Return the expected (script length, witness size) of a solution to the given
+    puzzle script. contract is a network's ContractAPI (network.contract).
+    """
+    info = contract.info_for_script(script)
+    script_type = info["type"]
+    if script_type == "multisig":
+        # OP_0 (for the OP_CHECKMULTISIG bug) and m signatures
+        return (1 + info["m"] * (1 + 72), 0)
+    if script_type not in SOLUTION_SIZES:
+        raise ValueError(
+            "can't estimate the solution size of a %s script" % script_type
+        )
+    return SOLUTION_SIZES[script_type]
+
+
+def estimated_sizes(network: Any, tx: Any) -> tuple[int, int]:
+    """
+    :param tx: a transaction, with unspents populated for inputs not yet signed
+    :return: the estimated (stripped_size, size) of tx once it is signed
+
+    Inputs that already have a solution are counted as they are. The rest use
+    :func:`solution_size_for_script` on the script of the coin they spend.
+    """
+    solution_sizes = tx.solution_sizes()
+    for idx, tx_in in enumerate(tx.txs_in):
+        if tx_in.script or tx_in.witness:
+            continue
+        if idx >= len(tx.unspents) or tx.unspents[idx] is None:
+            raise ValueError("missing unspent for tx_in %d" % idx)
+        solution_sizes[idx] = solution_size_for_script(
+            network.contract, tx.unspents[idx].script
+        )
+    return tx.sizes(solution_sizes)  # type: ignore[no-any-return]
+
+
+def estimated_vsize(network: Any, tx: Any) -> int:
+    """Return the estimated virtual size of tx once it is signed. See :func:`estimated_sizes`."""
+    stripped_size, size = estimated_sizes(network, tx)
+    return (3 * stripped_size + size + 3) // 4
+
+
 def create_tx(network: Any, spendables: list[Any], payables: list[Any], fee: int | str = "standard", lock_time: int = 0, version: int = 1) -> Any:
     """
     This function provides the easiest way to create an unsigned transaction.
@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import io
 from typing import Any
 
 TX_FEE_PER_THOUSAND_BYTES = 10000
@@ -15,8 +14,6 @@ def recommended_fee_for_tx(tx: Any) -> int:
       - whether any outputs are less than 0.001
       - update for bitcoind v0.90 new fee schedule
     """
-    s = io.BytesIO()
-    tx.stream(s)
-    tx_byte_count = len(s.getvalue())
+    tx_byte_count = int(tx.size())
     tx_fee = TX_FEE_PER_THOUSAND_BYTES * ((999 + tx_byte_count) // 1000)
     return tx_fee
@@ -0,0 +1,134 @@
+"""
+Multiply a generator by many integers at once.
+
+Each point addition on a :class:`Curve <pycoin.ecdsa.Curve.Curve>` costs a
+modular inverse, which is worth about ten multiplications. Here the points of
+a batch are added in step: all the inverses a step needs come from one
+inverse and three multiplications each (Montgomery's trick), leaving about
+six multiplications per addition.
+
+Multiples of the generator come from a table of ``d * 2**(8 * j) * G`` for
+every byte value d and window j, built on first use and kept on the
+generator, so each multiplication is at most one addition per byte of the
+integer and no doublings.
+
+These aren't blinded or time-deterministic like
+:meth:`Generator.__mul__ <pycoin.ecdsa.Generator.Generator.__mul__>`, so
+they're meant for public values, such as the children of a public BIP32 key.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+from typing import Any, Optional
+
+
+WINDOW_BITS = 8
+
+# an affine (x, y), or None for the point at infinity
+AffinePoint = Optional[tuple[int, int]]
+
+
+def batch_inverse(values: Sequence[int], m: int) -> list[int]:
+    """
+    :returns: the inverses mod m of values, which must all be invertible,
+        using a single modular inverse.
+    """
+    products = []
+    product = 1
+    for v in values:
+        products.append(product)
+        product = product * v % m
+    inverse = pow(product, -1, m)
+    inverses = [0] * len(values)
+    for idx in range(len(values) - 1, -1, -1):
+        inverses[idx] = inverse * products[idx] % m
+        inverse = inverse * values[idx] % m
+    return inverses
+
+
+def add_batch(
+    points0: Sequence[AffinePoint], points1: Sequence[AffinePoint], p: int, a: int
+) -> list[AffinePoint]:
+    """
+    :returns: the sums of points0[i] and points1[i] on the curve with prime p
+        and coefficient a, using a single modular inverse.
+    """
+    sums: list[AffinePoint] = list(points0)
+    todo = []
+    denominators = []
+    for idx, (P0, P1) in enumerate(zip(points0, points1)):
+        if P1 is None:
+            continue
+        if P0 is None:
+            sums[idx] = P1
+            continue
+        x0, y0 = P0
+        x1, y1 = P1
+        if x0 != x1:
+            denominators.append(x1 - x0)
+        elif (y0 + y1) % p == 0:
+            sums[idx] = None
+            continue
+        else:
+            denominators.append(2 * y0)
+        todo.append(idx)
+    inverses = batch_inverse(denominators, p)
+    for idx, inverse in zip(todo, inverses):
+        x0, y0 = points0[idx]  # type: ignore[misc]
+        x1, y1 = points1[idx]  # type: ignore[misc]
+        if x0 != x1:
+            slope = (y1 - y0) * inverse % p
+        else:
+            slope = (3 * x0 * x0 + a) * inverse % p
+        x2 = (slope * slope - x0 - x1) % p
+        sums[idx] = (x2, (slope * (x0 - x2) - y0) % p)
+    return sums
+
+
+def fixed_base_table(generator: Any) -> list[list[tuple[int, int]]]:
+    """
+    :returns: the table for generator, where ``table[j][d - 1]`` is
+        ``d * 2**(8 * j) * generator``. It's built on the first call, which
+        takes a few tens of milliseconds, and kept on the generator.
+    """
+    table = generator.__dict__.get("_fixed_base_table")
+    if table is not None:
+        return table  # type: ignore[no-any-return]
+    p, a = generator.p(), generator._a
+    window_count = -(-generator.order().bit_length() // WINDOW_BITS)
+    bases = [tuple(generator._powers[j * WINDOW_BITS]) for j in range(window_count)]
+    table = [[base] for base in bases]
+    for _ in range((1 << WINDOW_BITS) - 2):
+        multiples = add_batch([row[-1] for row in table], bases, p, a)
+        for row, P in zip(table, multiples):
+            row.append(P)
+    generator._fixed_base_table = table
+    return table
+
+
+def multiply_batch(
+    generator: Any, exponents: Sequence[int], point: AffinePoint = None
+) -> list[AffinePoint]:
+    """
+    :param generator: a :class:`Generator <pycoin.ecdsa.Generator.Generator>`
+    :param exponents: integers from 0 up to the generator's order
+    :param point: (optional) a point added to each product
+
+    :returns: ``e * generator + point`` for each e in exponents, as (x, y)
+        tuples, or None where that's the point at infinity.
+    """
+    table = fixed_base_table(generator)
+    p, a = generator.p(), generator._a
+    mask = (1 << WINDOW_BITS) - 1
+    results: list[AffinePoint] = [None] * len(exponents)
+    for j, row in enumerate(table):
+        shift = j * WINDOW_BITS
+        multiples = [
+            row[digit - 1] if digit else None
+            for digit in ((e >> shift) & mask for e in exponents)
+        ]
+        results = add_batch(results, multiples, p, a)
+    if point is not None:
+        results = add_batch(results, [point] * len(results), p, a)
+    return results
@@ -24,10 +24,14 @@ from typing import Any, Iterator
 
 from ..encoding.bytes32 import from_bytes_32, to_bytes_32
 from ..encoding.exceptions import EncodingError
-from ..encoding.sec import sec_to_public_pair
+from ..encoding.hash import hash160
+from ..encoding.sec import public_pair_to_sec, sec_to_public_pair
+from .DerivationCache import DerivationCache
 from .HierarchicalKey import HierarchicalKey
+from .SubkeyCache import SubkeyCache
 from .bip32 import (
     subkey_public_pair_chain_code_pair,
+    subkey_public_pairs_chain_codes,
     subkey_secret_exponent_chain_code_pair,
 )
 
@@ -42,6 +46,14 @@ class BIP32Node(HierarchicalKey):
     [https://github.com/bitcoin/bips/blob/master/bip-0032.mediawiki]
     """
 
+    # the most subkeys a node caches, unless set_subkey_cache_size is called;
+    # changing it affects nodes that haven't cached any subkeys yet
+    subkey_cache_size = 1024
+
+    # a DerivationCache consulted by subkey_for_path for public keys, for all
+    # nodes or (set on a node) for one
+    derivation_cache: DerivationCache | None = None
+
     @classmethod
     def from_master_secret(class_: type[BIP32Node], master_secret: bytes) -> BIP32Node:
         """Generate a Wallet from a master password."""
@@ -106,7 +118,7 @@ class BIP32Node(HierarchicalKey):
             raise EncodingError("parent_fingerprint wrong length")
         self._parent_fingerprint = parent_fingerprint
         self._child_index = child_index
-        self._subkey_cache: dict[tuple[int, bool, bool], BIP32Node] = dict()
+        self._subkey_cache: SubkeyCache | None = None
 
     def chain_code(self) -> bytes:
         return self._chain_code
@@ -228,9 +240,36 @@ class BIP32Node(HierarchicalKey):
         is_hardened = not not is_hardened
         as_private = not not as_private
         lookup = (i, is_hardened, as_private)
-        if lookup not in self._subkey_cache:
-            self._subkey_cache[lookup] = self._subkey(i, is_hardened, as_private)
-        return self._subkey_cache[lookup]
+        cache = self._subkey_cache
+        if cache is None:
+            if self.subkey_cache_size <= 0:
+                return self._subkey(i, is_hardened, as_private)
+            cache = self._subkey_cache = SubkeyCache(self.subkey_cache_size)
+        key: BIP32Node | None = cache.get(lookup)
+        if key is None:
+            key = self._subkey(i, is_hardened, as_private)
+            cache.put(lookup, key)
+        return key
+
+    def set_subkey_cache_size(self, size: int) -> None:
+        """
+        Cache at most size subkeys of this node, dropping the least recently
+        used ones if there are more. A size of 0 turns caching off, as for
+        streaming through many subkeys that are each only used once.
+        """
+        self.subkey_cache_size = size
+        if self._subkey_cache is not None:
+            self._subkey_cache.resize(size)
+
+    def subkey_cache_stats(self) -> dict[str, int]:
+        """
+        Return a dict with the hits and misses of this node's subkey cache,
+        the number of subkeys it holds (size), its max_size and an estimate
+        of the bytes they take.
+        """
+        if self._subkey_cache is None:
+            return SubkeyCache(self.subkey_cache_size).stats()
+        return self._subkey_cache.stats()
 
     def subkey_for_path(self, path: str) -> BIP32Node:  # type: ignore[override]
         """
@@ -245,10 +284,24 @@ class BIP32Node(HierarchicalKey):
 
         You should choose one of the H or p convention for private key
         derivation and stick with it.
+
+        Each step comes from the subkey cache of the node before it, so
+        paths with a common prefix only derive the steps after it. If the
+        key will be public and this node has a derivation_cache, the key
+        comes from there.
         """
         force_public = path[-4:] == ".pub"
         if force_public:
             path = path[:-4]
+        cache = self.derivation_cache
+        if cache is not None and path and (force_public or not self.is_private()):
+            return cache.public_subkey_for_path(self, path)  # type: ignore[no-any-return]
+        key = self._subkey_for_path(path)
+        if force_public and key.secret_exponent() is not None:
+            key = key.public_copy()
+        return key
+
+    def _subkey_for_path(self, path: str) -> BIP32Node:
         key: BIP32Node = self
         if path:
             invocations = path.split("/")
@@ -262,10 +315,62 @@ class BIP32Node(HierarchicalKey):
                     is_hardened=is_hardened,
                     as_private=key.secret_exponent() is not None,
                 )
-        if force_public and key.secret_exponent() is not None:
-            key = key.public_copy()
         return key
 
+    def subkeys_range(
+        self, start: int, count: int, hardened: bool = False, as_hash160: bool = False
+    ) -> list[Any]:
+        """
+        Return the children start to start + count - 1 of this node, as
+        subkey would, but without caching them. For a public node, their
+        public pairs are found together, which is several times faster
+        than deriving them one by one.
+
+        start:
+            the index of the first child.
+        count:
+            the number of children.
+        hardened:
+            use "hardened key derivation", which needs a private node.
+        as_hash160:
+            return the hash160 of each child's compressed sec, rather than
+            the child itself.
+        """
+        if start < 0 or count < 0:
+            raise ValueError("start and count can't be negative")
+        if start + count > 0x80000000:
+            raise ValueError("subkey index 0x%x too large" % (start + count - 1))
+        if self.secret_exponent() is not None:
+            keys = [
+                self._subkey(i, hardened, True) for i in range(start, start + count)
+            ]
+            if as_hash160:
+                return [key.hash160(is_compressed=True) for key in keys]
+            return keys
+        if hardened:
+            raise PublicPrivateMismatchError(
+                "can't derive a private key from a public key"
+            )
+        children = subkey_public_pairs_chain_codes(
+            self._generator, self.public_pair(), self._chain_code, start, count
+        )
+        if as_hash160:
+            return [
+                hash160(public_pair_to_sec(public_pair, compressed=True))
+                for public_pair, _ in children
+            ]
+        fingerprint = self.fingerprint()
+        return [
+            self.__class__(
+                chain_code=chain_code,
+                depth=self._depth + 1,
+                parent_fingerprint=fingerprint,
+                child_index=i,
+                public_pair=self._generator.Point(*public_pair),
+            )
+            for i, (public_pair, chain_code) in enumerate(children, start)
+        ]
+
     def children(
         self, max_level: int = 50, start_index: int = 0, include_hardened: bool = True
     ) -> Iterator[BIP32Node]:
@@ -0,0 +1,205 @@
+"""
+A persistent cache of public BIP32 subkeys, kept in a sqlite3 database.
+
+A subkey is found by (fingerprint, chain code hash, path) of the node it's
+derived from, and kept as its BIP32 serialization with the point
+uncompressed (so it can be rebuilt without a square root), along with its
+hash160.
+
+Each row has a checksum, an HMAC keyed with the chain code of the node it's
+derived from, so a row that's been damaged, or that doesn't belong to that
+node, is detected when it's read. The subkey is then derived again and the
+row replaced. The database as a whole is checked with sqlite's quick_check
+when the cache is opened.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import hmac
+import logging
+import sqlite3
+import textwrap
+from typing import Any
+
+from ..encoding.bytes32 import from_bytes_32, to_bytes_32
+
+
+logger = logging.getLogger(__name__)
+
+
+SCHEMA_VERSION = 1
+
+CHECKSUM_SIZE = 16
+
+# depth, parent fingerprint, child index, chain code, x and y
+NODE_SIZE = 1 + 4 + 4 + 32 + 32 + 32
+
+
+class DerivationCacheError(ValueError):
+    pass
+
+
+def _normalized_path(path: str) -> str:
+    if path.endswith(".pub"):
+        path = path[:-4]
+    return path.replace("'", "H").replace("p", "H")
+
+
+class DerivationCache(object):
+    """
+    :param sqlite3_db: (optional) a sqlite3 connection; it can be shared, as
+        with a Keychain or SQLite3Persistence. Rows aren't written until
+        commit is called.
+    :param check_integrity: (optional) run sqlite's quick_check on the
+        database, and raise a DerivationCacheError if it fails
+    """
+
+    def __init__(
+        self, sqlite3_db: sqlite3.Connection | None = None, check_integrity: bool = True
+    ) -> None:
+        self._db = sqlite3_db or sqlite3.connect(":memory:")
+        self.hits = 0
+        self.misses = 0
+        self.corrupt = 0
+        if check_integrity:
+            self.check_integrity()
+        self._init_tables()
+
+    def commit(self) -> None:
+        self._db.commit()
+
+    def _exec_sql(self, sql: str, *args: Any) -> sqlite3.Cursor:
+        c = self._db.cursor()
+        c.execute(textwrap.dedent(sql), args)
+        return c
+
+    def _init_tables(self) -> None:
+        self._exec_sql(
+            "create table if not exists DerivationCacheMeta (name text primary key, value integer)"
+        )
+        self._exec_sql(
+            """
+            create table if not exists DerivationCache (
+                fingerprint blob, chain_code_hash blob, path text,
+                node blob, hash160 blob, checksum blob,
+                primary key (fingerprint, chain_code_hash, path)
+            ) without rowid
+            """
+        )
+        self._exec_sql(
+            "insert or ignore into DerivationCacheMeta values ('version', ?)",
+            SCHEMA_VERSION,
+        )
+        self.commit()
+        c = self._exec_sql(
+            "select value from DerivationCacheMeta where name = 'version'"
+        )
+        version = c.fetchone()[0]
+        if version != SCHEMA_VERSION:
+            raise DerivationCacheError(
+                "derivation cache version %r isn't %d" % (version, SCHEMA_VERSION)
+            )
+
+    def check_integrity(self) -> None:
+        try:
+            results = [r[0] for r in self._exec_sql("pragma quick_check")]
+        except sqlite3.DatabaseError as ex:
+            raise DerivationCacheError("derivation cache database is corrupt: %s" % ex)
+        if results != ["ok"]:
+            raise DerivationCacheError(
+                "derivation cache database is corrupt: %s"
+                % "; ".join(map(str, results))
+            )
+
+    @staticmethod
+    def _checksum(node: Any, path: str, blob: bytes, h160: bytes) -> bytes:
+        msg = path.encode("utf8") + b"\0" + blob + h160
+        return hmac.new(node.chain_code(), msg, hashlib.sha256).digest()[:CHECKSUM_SIZE]
+
+    @staticmethod
+    def _lookup(node: Any, path: str) -> tuple[bytes, bytes, str]:
+        chain_code_hash = hashlib.sha256(node.chain_code()).digest()[:16]
+        return node.fingerprint(), chain_code_hash, path
+
+    def _node_for_row(self, node: Any, path: str, row: Any) -> Any:
+        blob, h160, checksum = (bytes(v) for v in row)
+        if len(blob) != NODE_SIZE:
+            return None
+        if not hmac.compare_digest(checksum, self._checksum(node, path, blob, h160)):
+            return None
+        public_pair = node._generator.Point(
+            from_bytes_32(blob[41:73]), from_bytes_32(blob[73:])
+        )
+        subkey = node.__class__(
+            chain_code=blob[9:41],
+            depth=blob[0],
+            parent_fingerprint=blob[1:5],
+            child_index=int.from_bytes(blob[5:9], "big"),
+            public_pair=public_pair,
+        )
+        subkey._hash160_compressed = h160
+        return subkey
+
+    def get(self, node: Any, path: str) -> Any:
+        """
+        Return the public subkey of the BIP32Node node for path, or None if
+        it's not cached, or its row is corrupt.
+        """
+        path = _normalized_path(path)
+        c = self._exec_sql(
+            "select node, hash160, checksum from DerivationCache where fingerprint = ? "
+            "and chain_code_hash = ? and path = ?",
+            *self._lookup(node, path),
+        )
+        row = c.fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        try:
+            subkey = self._node_for_row(node, path, row)
+        except ValueError:
+            subkey = None
+        if subkey is None:
+            logger.warning("corrupt derivation cache entry for path %s", path)
+            self.corrupt += 1
+            self.misses += 1
+            return None
+        self.hits += 1
+        return subkey
+
+    def put(self, node: Any, path: str, subkey: Any) -> None:
+        """Cache subkey as the subkey of the BIP32Node node for path."""
+        path = _normalized_path(path)
+        x, y = subkey.public_pair()
+        blob = subkey.serialize(as_private=False)[:41] + to_bytes_32(x) + to_bytes_32(y)
+        h160 = subkey.hash160(is_compressed=True)
+        self._exec_sql(
+            "insert or replace into DerivationCache values (?, ?, ?, ?, ?, ?)",
+            *self._lookup(node, path),
+            blob,
+            h160,
+            self._checksum(node, path, blob, h160),
+        )
+
+    def public_subkey_for_path(self, node: Any, path: str) -> Any:
+        """
+        Return the public subkey of the BIP32Node node for path, from the
+        cache if it's there, and otherwise deriving and caching it.
+        """
+        path = _normalized_path(path)
+        if not path:
+            return node.public_copy()
+        subkey = self.get(node, path)
+        if subkey is None:
+            subkey = node._subkey_for_path(path)
+            if subkey.secret_exponent() is not None:
+                subkey = subkey.public_copy()
+            self.put(node, path, subkey)
+        return subkey
+
+    def hash160_for_path(self, node: Any, path: str) -> bytes:
+        return self.public_subkey_for_path(node, path).hash160()  # type: ignore[no-any-return]
+
+    def stats(self) -> dict[str, int]:
+        return dict(hits=self.hits, misses=self.misses, corrupt=self.corrupt)
@@ -9,10 +9,23 @@ from typing import Any
 
 from pycoin.encoding.hash import hash160 as _hash160
 
+from .BIP32Node import BIP32Node
+from .DerivationCache import DerivationCache
+
 
 class Keychain(object):
-    def __init__(self, sqlite3_db: sqlite3.Connection | None = None) -> None:
+    def __init__(
+        self,
+        sqlite3_db: sqlite3.Connection | None = None,
+        derivation_cache: DerivationCache | None = None,
+    ) -> None:
+        """
+        derivation_cache:
+            a DerivationCache for the hash160s of paths of BIP32 keys added
+            with add_keys_path or add_key_paths
+        """
         self._db = sqlite3_db or sqlite3.connect(":memory:")
+        self._derivation_cache = derivation_cache
         self._db.text_factory = type(b"")
         self._init_tables()
         self.clear_secrets()
@@ -49,11 +62,16 @@ class Keychain(object):
         self._init_table_p2s()
         self.commit()
 
+    def _hash160_for_path(self, key: Any, path: str) -> bytes:
+        if self._derivation_cache is not None and isinstance(key, BIP32Node):
+            return self._derivation_cache.hash160_for_path(key, path)
+        return key.subkey_for_path(path).hash160()  # type: ignore[no-any-return]
+
     def add_keys_path(self, keys: Iterable[Any], path: str) -> int:
         total = 0
         for key in keys:
             fingerprint = key.fingerprint()
-            h160 = key.subkey_for_path(path).hash160()
+            h160 = self._hash160_for_path(key, path)
             self._exec_sql(
                 "insert or ignore into HASH160 values (?, ?, ?)",
                 h160,
@@ -67,7 +85,7 @@ class Keychain(object):
         fingerprint = key.fingerprint()
         total = 0
         for path in path_iterator:
-            h160 = key.subkey_for_path(path).hash160()
+            h160 = self._hash160_for_path(key, path)
             self._exec_sql(
                 "insert or ignore into HASH160 values (?, ?, ?)",
                 h160,
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import collections
+import sys
+from typing import Any
+
+
+def _approximate_size(value: Any) -> int:
+    # the object, its attributes and what they refer to directly
+    size = sys.getsizeof(value)
+    attributes = getattr(value, "__dict__", None)
+    if attributes is not None:
+        size += sys.getsizeof(attributes)
+        size += sum(sys.getsizeof(v) for v in attributes.values())
+    return size
+
+
+class SubkeyCache(object):
+    """
+    A least recently used cache of the subkeys of a node.
+
+    :param max_size: the most subkeys kept; 0 keeps none
+
+    The bytes held are an estimate, made when a subkey is added, of the
+    memory taken by it and its attributes. They don't include anything
+    the subkey caches itself.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.byte_count = 0
+        self._items: collections.OrderedDict[Any, tuple[Any, int]] = (
+            collections.OrderedDict()
+        )
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: Any) -> Any:
+        """Return the subkey for key, or None if it's not cached."""
+        item = self._items.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._items.move_to_end(key)
+        return item[0]
+
+    def put(self, key: Any, value: Any) -> None:
+        if key in self._items:
+            self.byte_count -= self._items.pop(key)[1]
+        size = _approximate_size(value)
+        self._items[key] = (value, size)
+        self.byte_count += size
+        self._trim()
+
+    def resize(self, max_size: int) -> None:
+        self.max_size = max_size
+        self._trim()
+
+    def clear(self) -> None:
+        self._items.clear()
+        self.byte_count = 0
+
+    def _trim(self) -> None:
+        while len(self._items) > self.max_size:
+            _, (_, size) = self._items.popitem(last=False)
+            self.byte_count -= size
+
+    def stats(self) -> dict[str, int]:
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            size=len(self._items),
+            max_size=self.max_size,
+            bytes=self.byte_count,
+        )
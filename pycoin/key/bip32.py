@@ -6,6 +6,7 @@ import logging
 import struct
 from typing import Any
 
+from ..ecdsa.batch import multiply_batch
 from ..encoding.bytes32 import from_bytes_32, to_bytes_32
 from ..encoding.sec import public_pair_to_sec
 
@@ -120,6 +121,48 @@ def subkey_public_pair_chain_code_pair(
     return the_point, new_chain_code
 
 
+def subkey_public_pairs_chain_codes(
+    generator: Any, public_pair: Any, chain_code_bytes: bytes, start: int, count: int
+) -> list[tuple[tuple[int, int], bytes]]:
+    """
+    Return info for the children start to start + count - 1 of this node, as
+    subkey_public_pair_chain_code_pair does for one of them, but with the
+    points found together by pycoin.ecdsa.batch.multiply_batch.
+
+    generator:
+        the ecdsa generator
+    public_pair:
+        base public pair
+    chain_code:
+        base chain code
+    start:
+        the index of the first child
+    count:
+        the number of children
+
+    Returns a list of (new_public_pair, new_chain_code) pairs, where each
+    new_public_pair is an (x, y) tuple
+    """
+    ORDER = generator.order()
+    sec = public_pair_to_sec(public_pair, compressed=True)
+    exponents = []
+    chain_codes = []
+    for i in range(start, start + count):
+        I64 = hmac.HMAC(
+            key=chain_code_bytes,
+            msg=sec + struct.pack(">l", i),
+            digestmod=hashlib.sha512,
+        ).digest()
+        exponents.append(from_bytes_32(I64[:32]) % ORDER)
+        chain_codes.append(I64[32:])
+    points = multiply_batch(generator, exponents, tuple(public_pair))
+    for i, point in enumerate(points, start):
+        if point is None:
+            logger.critical(_SUBKEY_VALIDATION_LOG_ERR_FMT)
+            raise DerivationError("K_{} == {}".format(i, generator.infinity()))
+    return list(zip(points, chain_codes))  # type: ignore[arg-type]
+
+
 """
 A BIP0032-style hierarchical wallet.
 
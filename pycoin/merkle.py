@@ -1,6 +1,7 @@
 from __future__ import annotations
 
-from typing import Callable
+import bisect
+from typing import Callable, Iterable
 
 from .encoding.hash import double_sha256
 from .encoding.hexbytes import h2b_rev
@@ -24,6 +25,154 @@ def merkle_pair(hashes: list[bytes], hash_f: Callable[[bytes], bytes]) -> list[b
     return items
 
 
+def merkle_branch_root(
+    h: bytes,
+    index: int,
+    branch: list[bytes],
+    hash_f: Callable[[bytes], bytes] = double_sha256,
+) -> bytes:
+    """Return the root hash implied by a leaf hash h at index and its merkle branch."""
+    for sibling in branch:
+        if index & 1:
+            h = hash_f(sibling + h)
+        else:
+            h = hash_f(h + sibling)
+        index >>= 1
+    return h
+
+
+def verify_merkle_branch(
+    h: bytes,
+    index: int,
+    branch: list[bytes],
+    root: bytes,
+    hash_f: Callable[[bytes], bytes] = double_sha256,
+) -> bool:
+    """Return True if branch proves that h is the leaf at index of the tree with the given root."""
+    return merkle_branch_root(h, index, branch, hash_f) == root
+
+
+class MerkleTree(object):
+    """
+    A merkle tree that keeps every level, so merkle branches can be produced
+    and single leaves appended or replaced in O(log n) hashes.
+
+    levels[0] holds the leaf hashes, and levels[-1] holds just the root.
+    """
+
+    def __init__(
+        self,
+        hashes: Iterable[bytes],
+        hash_f: Callable[[bytes], bytes] = double_sha256,
+    ) -> None:
+        self.hash_f = hash_f
+        self.levels = [list(hashes)]
+        while len(self.levels[-1]) > 1:
+            self.levels.append(merkle_pair(self.levels[-1], hash_f))
+        self._index_lookup: dict[bytes, int] | None = None
+
+    def __len__(self) -> int:
+        return len(self.levels[0])
+
+    def root(self) -> bytes:
+        if not self.levels[0]:
+            raise ValueError("empty merkle tree has no root")
+        return self.levels[-1][0]
+
+    def index(self, h: bytes) -> int:
+        """Return the index of the first leaf with hash h, or raise KeyError."""
+        if self._index_lookup is None:
+            lookup: dict[bytes, int] = {}
+            for idx, leaf in enumerate(self.levels[0]):
+                lookup.setdefault(leaf, idx)
+            self._index_lookup = lookup
+        return self._index_lookup[h]
+
+    def branch(self, index: int) -> list[bytes]:
+        """
+        Return the merkle branch for the leaf at index: the sibling hashes from the
+        leaf level up. Use :func:`verify_merkle_branch` to check it.
+        """
+        if not 0 <= index < len(self):
+            raise IndexError("leaf index out of range")
+        branch = []
+        for level in self.levels[:-1]:
+            sibling = index ^ 1
+            branch.append(level[sibling] if sibling < len(level) else level[index])
+            index >>= 1
+        return branch
+
+    def _update_parents(self, index: int) -> None:
+        for level_index in range(len(self.levels)):
+            level = self.levels[level_index]
+            if len(level) == 1:
+                del self.levels[level_index + 1 :]
+                return
+            if level_index + 1 == len(self.levels):
+                self.levels.append([])
+            left = level[index & ~1]
+            right = level[index | 1] if index | 1 < len(level) else left
+            parent_level = self.levels[level_index + 1]
+            index >>= 1
+            h = self.hash_f(left + right)
+            if index < len(parent_level):
+                parent_level[index] = h
+            else:
+                parent_level.append(h)
+
+    def append(self, h: bytes) -> None:
+        """Add a leaf hash to the end."""
+        self.levels[0].append(h)
+        if self._index_lookup is not None:
+            self._index_lookup.setdefault(h, len(self) - 1)
+        self._update_parents(len(self) - 1)
+
+    def replace(self, index: int, h: bytes) -> None:
+        """Replace the leaf hash at index."""
+        if not 0 <= index < len(self):
+            raise IndexError("leaf index out of range")
+        self.levels[0][index] = h
+        self._index_lookup = None
+        self._update_parents(index)
+
+    def partial_tree(
+        self, matched_indices: Iterable[int]
+    ) -> tuple[int, list[bytes], list[int]]:
+        """
+        Build the BIP37 partial merkle tree proving the leaves at matched_indices,
+        as used in a merkleblock message. Returns (total_transactions, hashes, flags),
+        where flags are packed into byte values least significant bit first.
+        """
+        matched = sorted(set(matched_indices))
+        if not self.levels[0]:
+            raise ValueError("empty merkle tree")
+        if matched and not 0 <= matched[0] <= matched[-1] < len(self):
+            raise IndexError("leaf index out of range")
+        hashes: list[bytes] = []
+        bits: list[int] = []
+
+        def traverse(height: int, pos: int) -> None:
+            # is there a match among the leaves under this node?
+            first = bisect.bisect_left(matched, pos << height)
+            parent_of_match = (
+                first < len(matched) and matched[first] < (pos + 1) << height
+            )
+            bits.append(parent_of_match)
+            if height == 0 or not parent_of_match:
+                hashes.append(self.levels[height][pos])
+                return
+            traverse(height - 1, pos * 2)
+            if pos * 2 + 1 < len(self.levels[height - 1]):
+                traverse(height - 1, pos * 2 + 1)
+
+        traverse(len(self.levels) - 1, 0)
+        flags = [0] * ((len(bits) + 7) // 8)
+        for idx, bit in enumerate(bits):
+            if bit:
+                flags[idx >> 3] |= 1 << (idx & 7)
+        return len(self), hashes, flags
+
+
 def test_merkle() -> None:
     s1 = h2b_rev("56dee62283a06e85e182e2d0b421aceb0eadec3d5f86cdadf9688fc095b72510")
     assert merkle([s1], double_sha256) == s1
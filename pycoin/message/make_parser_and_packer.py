@@ -8,7 +8,7 @@ from typing import Any, IO
 from pycoin.encoding.hash import double_sha256
 from pycoin.encoding.hexbytes import b2h_rev
 from pycoin.satoshi.satoshi_int import parse_satoshi_int
-from pycoin.satoshi.satoshi_streamer import Streamer, STREAMER_FUNCTIONS
+from pycoin.satoshi.satoshi_streamer import Streamer, STREAMER_FUNCTIONS, STRUCT_CODES
 
 from .InvItem import InvItem
 from .PeerAddress import PeerAddress
@@ -257,6 +257,12 @@ def standard_streamer(
     streamer = Streamer()
     streamer.register_array_count_parse(parse_satoshi_int)
     streamer.register_functions(parsing_functions)
+    # only fields still parsed the standard way can use the struct fast path
+    streamer.register_struct_codes(
+        (c, v)
+        for c, v in STRUCT_CODES.items()
+        if streamer.parse_lookup.get(c) is STREAMER_FUNCTIONS[c][0]
+    )
     return streamer
 
 
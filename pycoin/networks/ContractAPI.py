@@ -5,21 +5,61 @@ import hashlib
 from typing import Any
 
 from pycoin.encoding.hash import hash160
-from pycoin.encoding.hexbytes import b2h
+from pycoin.encoding.hexbytes import b2h, bytes_as_hex
 
 from .Contract import Contract
 
 
 class ContractAPI(object):
+    # standard scripts that are a fixed prefix, one push of fixed size, then a fixed suffix
+    # (type, info key, prefix disassembly, data size, suffix disassembly)
+    _FIXED_TEMPLATES: list[tuple[str, str, str, int, str]] = [
+        ("p2pkh", "hash160", "OP_DUP OP_HASH160", 20, "OP_EQUALVERIFY OP_CHECKSIG"),
+        ("p2pkh_wit", "hash160", "OP_0", 20, ""),
+        ("p2sh_wit", "hash256", "OP_0", 32, ""),
+        ("p2sh", "hash160", "OP_HASH160", 20, "OP_EQUAL"),
+        ("p2pk", "sec", "", 33, "OP_CHECKSIG"),
+        ("p2pk", "sec", "", 65, "OP_CHECKSIG"),
+        ("p2tr", "synthetic_key", "OP_1", 32, ""),
+    ]
+
+    ADDRESS_CACHE_SIZE = 16384
+
     def __init__(self, network: Any, script_tools: Any) -> None:
         self._network = network
         self._script_tools = script_tools
+        self._compiled_templates: dict[str, bytes] = {}
+        self._templates_by_length: dict[int, list[tuple[bytes, bytes, str, str]]] = {}
+        self._templates_by_type: dict[str, tuple[str, dict[int, tuple[bytes, bytes]]]] = {}
+        self._address_script_cache: dict[str, bytes] = {}
+        compile_push_data = script_tools.scriptStreamer.compile_push_data
+        for type, key, prefix_text, size, suffix_text in self._FIXED_TEMPLATES:
+            push_opcode = compile_push_data(b"\0" * size)[:-size]
+            prefix = script_tools.compile(prefix_text) + push_opcode
+            suffix = script_tools.compile(suffix_text)
+            length = len(prefix) + size + len(suffix)
+            self._templates_by_length.setdefault(length, []).append(
+                (prefix, suffix, type, key)
+            )
+            by_size = self._templates_by_type.setdefault(type, (key, {}))[1]
+            by_size[size] = (prefix, suffix)
+        self._OP_RETURN = script_tools.compile("OP_RETURN")
+        self._OP_1 = script_tools.int_for_opcode("OP_1")
+        self._OP_16 = script_tools.int_for_opcode("OP_16")
+        self._OP_CHECKMULTISIG = script_tools.int_for_opcode("OP_CHECKMULTISIG")
 
     def for_address(self, address: str) -> bytes | None:
-        info = self._network.parse.address(address)
-        if info:
-            return info.script()  # type: ignore[no-any-return]
-        return None
+        script = self._address_script_cache.get(address)
+        if script is None:
+            info = self._network.parse.address(address)
+            if not info:
+                return None
+            script = info.script()
+            cache = self._address_script_cache
+            if len(cache) >= self.ADDRESS_CACHE_SIZE:
+                del cache[next(iter(cache))]
+            cache[address] = script  # type: ignore[assignment]
+        return script
 
     def for_p2pk(self, sec: bytes) -> bytes:
         return self.for_info(dict(type="p2pk", sec=sec))
@@ -43,8 +83,7 @@ class ContractAPI(object):
         return self.for_info(dict(type="nulldata", data=data))
 
     def for_nulldata_push(self, data: bytes) -> bytes:
-        # BRAIN DAMAGE
-        return self._script_tools.compile("OP_RETURN [%s]" % b2h(data))  # type: ignore[no-any-return]
+        return self._OP_RETURN + self._script_tools.compile_push_data_list([data])  # type: ignore[no-any-return]
 
     # BRAIN DAMAGE: the stuff above is redundant
 
@@ -57,8 +96,13 @@ class ContractAPI(object):
     def for_p2tr(self, synthetic_key: bytes) -> bytes:
         return self.for_info(dict(type="p2tr", synthetic_key=synthetic_key))
 
-    def match(self, template_disassembly: str, script: bytes) -> dict[str, list[Any]] | None:
-        template = self._script_tools.compile(template_disassembly)
+    def match(
+        self, template_disassembly: str, script: bytes
+    ) -> dict[str, list[Any]] | None:
+        template = self._compiled_templates.get(template_disassembly)
+        if template is None:
+            template = self._script_tools.compile(template_disassembly)
+            self._compiled_templates[template_disassembly] = template
         r: dict[str, list[Any]] = collections.defaultdict(list)
         pc1 = pc2 = 0
         while 1:
@@ -104,29 +148,73 @@ class ContractAPI(object):
         p2sh=lambda info: "OP_HASH160 %s OP_EQUAL" % b2h(info.get("hash160")),
         p2sh_wit=lambda info: "OP_0 %s" % b2h(info.get("hash256")),
         p2tr=lambda info: "OP_1 %s" % b2h(info.get("synthetic_key")),
-        multisig=lambda info: (
-            "%d %s %d OP_CHECKMULTISIG"
-            % (
-                info.get("m"),
-                " ".join(b2h(sk) for sk in info.get("sec_keys")),
-                len(info.get("sec_keys")),
-            )
-        ),
     )
 
+    def _script_for_template(self, type: str, data: bytes) -> bytes | None:
+        """
+        Splice data into the precompiled prefix and suffix for the given script type.
+        Returns None if there is no template for this data size.
+        """
+        prefix_suffix = self._templates_by_type[type][1].get(len(data))
+        if prefix_suffix is None:
+            return None
+        return prefix_suffix[0] + data + prefix_suffix[1]
+
+    def _multisig_script(self, m: int, sec_keys: list[bytes]) -> bytes:
+        int_to_script_bytes = self._script_tools.intStreamer.int_to_script_bytes
+        data_list = [int_to_script_bytes(m)] + list(sec_keys)
+        data_list.append(int_to_script_bytes(len(sec_keys)))
+        script = self._script_tools.compile_push_data_list(data_list)
+        return script + bytes([self._OP_CHECKMULTISIG])  # type: ignore[no-any-return]
+
     def for_info(self, info: dict[str, Any]) -> bytes:
         type = info.get("type")
         if type == "nulldata":
-            return self._script_tools.compile("OP_RETURN") + info.get("data")  # type: ignore[no-any-return]
+            return self._OP_RETURN + info.get("data")  # type: ignore[no-any-return,operator]
         if type == "unknown":
             return info["script"]  # type: ignore[no-any-return]
+        if type == "multisig":
+            return self._multisig_script(info["m"], info["sec_keys"])
+        if type in self._templates_by_type:
+            key = self._templates_by_type[type][0]
+            script = self._script_for_template(type, info[key])
+            if script is not None:
+                return script
         script_text = self._SCRIPT_LOOKUP[type](info)  # type: ignore[index]
         return self._script_tools.compile(script_text)  # type: ignore[no-any-return]
 
     def new(self, script_info: dict[str, Any]) -> Contract:
         return Contract(script_info, self._network)
 
+    def _info_for_standard_script(self, script: bytes) -> dict[str, Any] | None:
+        """
+        Recognize the canonical encodings of the standard scripts by length and
+        their leading and trailing bytes. Returns None if it's not one of them.
+        """
+        size = len(script)
+        for prefix, suffix, type, key in self._templates_by_length.get(size, ()):
+            if script.startswith(prefix) and script.endswith(suffix):
+                data = bytes_as_hex(script[len(prefix) : size - len(suffix)])
+                return {"type": type, key: data}
+        if size == 0:
+            return None
+        if script[:1] == self._OP_RETURN:
+            return dict(type="nulldata", data=script[1:])
+        if (
+            script[-1] == self._OP_CHECKMULTISIG
+            and self._OP_1 <= script[0] <= self._OP_16
+        ):
+            return self._info_from_multisig_script(script)
+        return None
+
     def info_for_script(self, script: bytes) -> dict[str, Any]:
+        info = self._info_for_standard_script(script)
+        if info:
+            return info
+        return self._info_for_script_by_matching(script)
+
+    def _info_for_script_by_matching(self, script: bytes) -> dict[str, Any]:
+        # match templates opcode by opcode, which also handles non-canonical pushes
         d = self.match(
             "OP_DUP OP_HASH160 'PUBKEYHASH' OP_EQUALVERIFY OP_CHECKSIG", script
         )
@@ -154,7 +242,7 @@ class ContractAPI(object):
             if len(d["SYNTHETIC_KEY"][0]) == 32:
                 return dict(type="p2tr", synthetic_key=d["SYNTHETIC_KEY"][0])
 
-        if self._script_tools.compile("OP_RETURN") == script[:1]:
+        if self._OP_RETURN == script[:1]:
             return dict(type="nulldata", data=script[1:])
 
         d = self._info_from_multisig_script(script)
@@ -13,6 +13,8 @@ from pycoin.coins.tx_utils import (
     distribute_from_split_pool,
     sign_tx,
     create_signed_tx,
+    estimated_sizes,
+    estimated_vsize,
 )
 from pycoin.coins.SolutionChecker import ScriptError
 from pycoin.contrib.msg_signing import MessageSigner
@@ -291,6 +293,8 @@ def create_bitcoinish_network(symbol: str, network_name: str, subnet_name: str,
         create_signed_tx=lambda *a, **kw: create_signed_tx(network, *a, **kw),
         split_with_remainder=lambda *a, **kw: split_with_remainder(*a, **kw),
         distribute_from_split_pool=distribute_from_split_pool,
+        estimated_sizes=lambda *a, **kw: estimated_sizes(network, *a, **kw),
+        estimated_vsize=lambda *a, **kw: estimated_vsize(network, *a, **kw),
     )
 
     network.bip32_as_string = bip32_as_string
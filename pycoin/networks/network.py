@@ -53,6 +53,8 @@ class NetworkTxUtils:
     create_signed_tx: Callable[..., Any]
     split_with_remainder: Callable[..., Any]
     distribute_from_split_pool: Callable[..., Any]
+    estimated_sizes: Callable[..., Any]
+    estimated_vsize: Callable[..., Any]
 
 
 @dataclasses.dataclass
@@ -16,6 +16,34 @@ def parse_satoshi_int(f: IO[bytes], v: int | None = None) -> int:
     return v
 
 
+def unpack_satoshi_int_from(
+    buf: bytes | memoryview, offset: int = 0
+) -> tuple[int, int]:
+    """
+    Parse a satoshi int from buf at offset, like struct.unpack_from.
+    Returns the value and the offset just past it.
+    """
+    v = buf[offset]
+    if v < 253:
+        return v, offset + 1
+    if v == 253:
+        return struct.unpack_from("<H", buf, offset + 1)[0], offset + 3
+    if v == 254:
+        return struct.unpack_from("<L", buf, offset + 1)[0], offset + 5
+    return struct.unpack_from("<Q", buf, offset + 1)[0], offset + 9
+
+
+def satoshi_int_size(v: int) -> int:
+    """Return the number of bytes stream_satoshi_int writes for v."""
+    if v < 253:
+        return 1
+    if v <= 65535:
+        return 3
+    if v <= 0xFFFFFFFF:
+        return 5
+    return 9
+
+
 def stream_satoshi_int(f: IO[bytes], v: int) -> None:
     if v < 253:
         f.write(struct.pack("<B", v))
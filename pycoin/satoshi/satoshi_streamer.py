@@ -30,6 +30,17 @@ STREAMER_FUNCTIONS = {
     ),
 }
 
+# fixed-size fields, so runs of them can be packed and unpacked in one go
+STRUCT_CODES = {
+    "h": ("!H", None),
+    "L": ("<L", None),
+    "Q": ("<Q", None),
+    "#": ("<32s", bytes_as_revhex),
+    "@": ("<16s", None),
+    "b": ("<?", None),
+}
+
 SATOSHI_STREAMER = Streamer()
 SATOSHI_STREAMER.register_array_count_parse(parse_satoshi_int)
 SATOSHI_STREAMER.register_functions(STREAMER_FUNCTIONS.items())
+SATOSHI_STREAMER.register_struct_codes(STRUCT_CODES.items())
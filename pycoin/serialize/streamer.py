@@ -1,27 +1,99 @@
 from __future__ import annotations
 
 import io
+import struct
 from typing import Any, Callable, IO
 
 
+ParseF = Callable[[IO[bytes]], tuple[Any, ...]]
+StreamF = Callable[..., None]
+
+
 class Streamer(object):
+    """
+    Parse and stream structures described by format strings, where each
+    character names a field type registered with register_functions.
+
+    Format strings are compiled once into a parse and a stream function and
+    cached. Runs of consecutive fields that have a struct code registered
+    with register_struct_codes are merged into a single struct.Struct.
+    """
+
     def __init__(self) -> None:
         self.parse_lookup: dict[str, Any] = {}
         self.stream_lookup: dict[str, Any] = {}
+        self.struct_code_lookup: dict[str, tuple[str, str, Any]] = {}
+        self._parse_cache: dict[str, ParseF] = {}
+        self._stream_cache: dict[str, StreamF] = {}
 
     def register_functions(self, lookup: Any) -> None:
         for c, v in lookup:
             parse_f, stream_f = v
             self.parse_lookup[c] = parse_f
             self.stream_lookup[c] = stream_f
+            self.struct_code_lookup.pop(c, None)
+        self._clear_caches()
+
+    def register_struct_codes(self, lookup: Any) -> None:
+        """
+        lookup: pairs (c, (code, parse_post_f)) where code is a struct format
+        for the field including its byte order (like "<L" or "!H"), and
+        parse_post_f (or None) converts the unpacked value. The field must
+        already have functions registered; these are the slow path.
+        """
+        for c, v in lookup:
+            code, parse_post_f = v
+            self.struct_code_lookup[c] = (code[0], code[1:], parse_post_f)
+        self._clear_caches()
 
     def register_array_count_parse(
         self, array_count_parse_f: Callable[[IO[bytes]], int]
     ) -> None:
         self.array_count_parse_f = array_count_parse_f
+        self._clear_caches()
 
-    def parse_struct(self, fmt: str, f: IO[bytes]) -> tuple[Any, ...]:
-        items: list[Any] = []
+    def _clear_caches(self) -> None:
+        self._parse_cache.clear()
+        self._stream_cache.clear()
+
+    def _struct_runs(self, fmt: str) -> list[tuple[str, Any]]:
+        """
+        Split a flat format into ("struct", (Struct, converters, fields)) for
+        runs of fixed-size fields sharing a byte order, and ("field", c) for
+        the rest.
+        """
+        runs: list[tuple[str, Any]] = []
+        byte_order = None
+        codes: list[str] = []
+        converters: list[Any] = []
+        fields: list[str] = []
+
+        def flush() -> None:
+            if codes:
+                s = struct.Struct(byte_order + "".join(codes))  # type: ignore[operator]
+                runs.append(("struct", (s, list(converters), "".join(fields))))
+                del codes[:]
+                del converters[:]
+                del fields[:]
+
+        for c in fmt:
+            code = self.struct_code_lookup.get(c)
+            if code is None:
+                flush()
+                runs.append(("field", c))
+                continue
+            if code[0] != byte_order:
+                flush()
+                byte_order = code[0]
+            codes.append(code[1])
+            converters.append(code[2])
+            fields.append(c)
+        flush()
+        return runs
+
+    def _compile_parse(self, fmt: str) -> ParseF:
+        # each step returns a tuple of values
+        steps: list[ParseF] = []
         i = 0
         while i < len(fmt):
             c = fmt[i]
@@ -29,20 +101,120 @@ class Streamer(object):
                 end = fmt.find("]", i)
                 if end < 0:
                     raise ValueError("no closing ] character")
-                subfmt = fmt[i + 1 : end]
-                count = self.array_count_parse_f(f)
-                array = []
-                for j in range(count):
-                    if len(subfmt) == 1:
-                        array.append(self.parse_struct(subfmt, f)[0])
-                    else:
-                        array.append(self.parse_struct(subfmt, f))
-                items.append(tuple(array))
-                i = end
+                steps.append(self._compile_array_parse(fmt[i + 1 : end]))
+                i = end + 1
+                continue
+            end = fmt.find("[", i)
+            if end < 0:
+                end = len(fmt)
+            for kind, v in self._struct_runs(fmt[i:end]):
+                if kind == "struct":
+                    steps.append(self._compile_struct_parse(v[0], v[1]))
+                else:
+                    steps.append(self._compile_field_parse(self.parse_lookup[v]))
+            i = end
+
+        if len(steps) == 1:
+            return steps[0]
+
+        def parse(f: IO[bytes]) -> tuple[Any, ...]:
+            items: list[Any] = []
+            for step in steps:
+                items.extend(step(f))
+            return tuple(items)
+
+        return parse
+
+    @staticmethod
+    def _compile_field_parse(parse_f: Callable[[IO[bytes]], Any]) -> ParseF:
+        def parse(f: IO[bytes]) -> tuple[Any, ...]:
+            return (parse_f(f),)
+
+        return parse
+
+    def _compile_struct_parse(self, s: struct.Struct, converters: list[Any]) -> ParseF:
+        size = s.size
+        unpack = s.unpack
+        if not any(converters):
+            return lambda f: unpack(f.read(size))
+        conversions = [(idx, c) for idx, c in enumerate(converters) if c]
+
+        def parse(f: IO[bytes]) -> tuple[Any, ...]:
+            items = list(unpack(f.read(size)))
+            for idx, c in conversions:
+                items[idx] = c(items[idx])
+            return tuple(items)
+
+        return parse
+
+    def _compile_array_parse(self, subfmt: str) -> ParseF:
+        array_count_parse_f = self.array_count_parse_f
+        item_parse_f = self._parser_for(subfmt)
+        if len(subfmt) == 1:
+            return lambda f: (
+                tuple(item_parse_f(f)[0] for _ in range(array_count_parse_f(f))),
+            )
+        return lambda f: (
+            tuple(item_parse_f(f) for _ in range(array_count_parse_f(f))),
+        )
+
+    def _parser_for(self, fmt: str) -> ParseF:
+        parse_f = self._parse_cache.get(fmt)
+        if parse_f is None:
+            parse_f = self._parse_cache[fmt] = self._compile_parse(fmt)
+        return parse_f
+
+    def _compile_stream(self, fmt: str) -> StreamF:
+        # each step is (value count, stream function taking f and that many values)
+        steps: list[tuple[int, StreamF]] = []
+        for kind, v in self._struct_runs(fmt):
+            if kind == "struct":
+                steps.append((len(v[2]), self._compile_struct_stream(v[0], v[2])))
             else:
-                items.append(self.parse_lookup[c](f))
-            i += 1
-        return tuple(items)
+                steps.append((1, self.stream_lookup[v]))
+
+        if len(steps) == 1:
+            return steps[0][1]
+
+        def stream(f: IO[bytes], *args: Any) -> None:
+            i = 0
+            for count, stream_f in steps:
+                stream_f(f, *args[i : i + count])
+                i += count
+
+        return stream
+
+    def _compile_struct_stream(self, s: struct.Struct, fields: str) -> StreamF:
+        pack = s.pack
+        # a bytes value packed as "32s" is padded or truncated to 32 bytes, but
+        # the registered stream functions may not pad, so a value of another
+        # size is streamed by them instead
+        byte_sizes = []
+        for idx, c in enumerate(fields):
+            code = self.struct_code_lookup[c][1]
+            if code.endswith("s"):
+                byte_sizes.append((idx, struct.calcsize(code)))
+        if not byte_sizes:
+
+            def stream(f: IO[bytes], *args: Any) -> None:
+                f.write(pack(*args))
+
+            return stream
+
+        stream_fs = [self.stream_lookup[c] for c in fields]
+
+        def stream_checking_sizes(f: IO[bytes], *args: Any) -> None:
+            for idx, size in byte_sizes:
+                if len(args[idx]) != size:
+                    for stream_f, v in zip(stream_fs, args):
+                        stream_f(f, v)
+                    return
+            f.write(pack(*args))
+
+        return stream_checking_sizes
+
+    def parse_struct(self, fmt: str, f: IO[bytes]) -> tuple[Any, ...]:
+        return self._parser_for(fmt)(f)
 
     def parse_as_dict(
         self, attribute_list: list[str], pack_list: str, f: IO[bytes]
@@ -50,8 +222,14 @@ class Streamer(object):
         return dict(list(zip(attribute_list, self.parse_struct(pack_list, f))))
 
     def stream_struct(self, fmt: str, f: IO[bytes], *args: Any) -> None:
-        for c, v in zip(fmt, args):
-            self.stream_lookup[c](f, v)
+        if len(args) != len(fmt):
+            # like zip, stream only as many fields as there are both of
+            fmt = fmt[: len(args)]
+            args = args[: len(fmt)]
+        stream_f = self._stream_cache.get(fmt)
+        if stream_f is None:
+            stream_f = self._stream_cache[fmt] = self._compile_stream(fmt)
+        stream_f(f, *args)
 
     def unpack_struct(self, fmt: str, b: bytes) -> tuple[Any, ...]:
         return self.parse_struct(fmt, io.BytesIO(b))
@@ -22,6 +22,17 @@ logger = logging.getLogger(__file__)
 # (etc)
 
 
+def default_base_dir() -> str:
+    LOOKUP = dict(Darwin="~/Library/Application Support/Bitcoin/", Linux="~/.bitcoin/")
+    system = platform.system()
+    path = LOOKUP.get(system)
+    if path is None:
+        raise ValueError(
+            "unknown base path for system %s; you should submit a patch!" % system
+        )
+    return os.path.expanduser(path)
+
+
 class Blockfiles(object):
     def __init__(
         self,
@@ -49,16 +60,7 @@ class Blockfiles(object):
         self.f.close()
 
     def default_base(self) -> str:
-        LOOKUP = dict(
-            Darwin="~/Library/Application Support/Bitcoin/", Linux="~/.bitcoin/"
-        )
-        system = platform.system()
-        path = LOOKUP.get(system)
-        if path is None:
-            raise ValueError(
-                "unknown base path for system %s; you should submit a patch!" % system
-            )
-        return os.path.expanduser(path)
+        return default_base_dir()
 
     def read(self, N: int) -> bytes:
         d = self.f.read(N)
@@ -89,7 +91,7 @@ class Blockfiles(object):
         if not os.path.exists(full_path):
             return False
         self.f.close()
-        self.f = open(full_path, "r+b")
+        self.f = open(full_path, "rb")
         return True
 
     def next_offset(
@@ -113,6 +115,16 @@ class Blockfiles(object):
         next_offset = self.offset_info()
         return block_offset, next_offset
 
+    def block_bytes(self, block_info: tuple[int, int]) -> bytes:
+        """
+        Return the raw block at block_info, like the info of the headers yielded
+        by locked_blocks_iterator.
+        """
+        file_index, offset = block_info
+        self.jump_to((file_index, offset - 4))
+        size = struct.unpack("<L", self.f.read(4))[0]
+        return self.f.read(size)
+
     def offset_info(self) -> tuple[int, int]:
         return self._file_index, self.f.tell()  # type: ignore[return-value]
 
@@ -0,0 +1,246 @@
+"""
+An index of where each block is in bitcoind's blk*.dat files.
+
+BlockIndex records, for every block found in the files, its hash, previous
+block hash, bits, location (file_index, offset, size) and the total work of
+the chain ending at it. The best chain (the one with the most work) gets its
+own table mapping height to hash, so a block can be found by hash or by height
+with one lookup and one read of the block file.
+
+The index is kept in a sqlite3 database along with the position just past the
+last record scanned, so update() only scans records added since the last call.
+Blocks found before their parent are kept aside until the parent shows up.
+
+Usage::
+
+    blockfiles = MappedBlockfiles(base_dir)
+    block_index = BlockIndex(sqlite3.connect("block_index.db"))
+    block_index.update(blockfiles)
+    block = block_index.block_for_height(blockfiles, 100000, network.block)
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from typing import Any
+
+from pycoin.block import Block, work_for_bits
+from pycoin.encoding.hexbytes import b2h_rev
+
+
+ZERO_HASH = b"\0" * 32
+
+
+def _work_blob(work: int) -> bytes:
+    # big-endian, so blobs sort like the integers they hold
+    return work.to_bytes(32, "big")
+
+
+class BlockIndex(object):
+    """
+    :param sqlite3_db: the database holding the index. Defaults to an in-memory one.
+    :param parent_hash: the previous block hash of the first block (genesis)
+    """
+
+    def __init__(
+        self,
+        sqlite3_db: sqlite3.Connection | None = None,
+        parent_hash: bytes = ZERO_HASH,
+    ) -> None:
+        self.db = sqlite3_db or sqlite3.connect(":memory:")
+        self.parent_hash = parent_hash
+        self._init_tables()
+
+    def _exec_sql(self, sql: str, *args: Any) -> sqlite3.Cursor:
+        c = self.db.cursor()
+        c.execute(sql, args)
+        return c
+
+    def _init_tables(self) -> None:
+        self._exec_sql(
+            """create table if not exists BlockLocation (
+hash blob primary key,
+previous_hash blob not null,
+bits integer not null,
+file_index integer not null,
+offset integer not null,
+size integer not null,
+chain_work blob
+);"""
+        )
+        self._exec_sql(
+            "create index if not exists BlockLocationByPrevious"
+            " on BlockLocation (previous_hash)"
+        )
+        self._exec_sql(
+            "create index if not exists BlockLocationByWork on BlockLocation (chain_work)"
+        )
+        self._exec_sql(
+            """create table if not exists BestChain (
+height integer primary key,
+hash blob not null unique
+);"""
+        )
+        self._exec_sql(
+            """create table if not exists BlockIndexPosition (
+id integer primary key check (id = 0),
+file_index integer not null,
+offset integer not null
+);"""
+        )
+        self.db.commit()
+
+    def position(self) -> tuple[int, int]:
+        """The (file_index, offset) where the next update starts scanning."""
+        r = self._exec_sql(
+            "select file_index, offset from BlockIndexPosition"
+        ).fetchone()
+        return (r[0], r[1]) if r else (0, 0)
+
+    def __len__(self) -> int:
+        return self._exec_sql("select count(*) from BlockLocation").fetchone()[0]  # type: ignore[no-any-return]
+
+    def _chain_work(self, block_hash: bytes) -> int | None:
+        if block_hash == self.parent_hash:
+            return 0
+        r = self._exec_sql(
+            "select chain_work from BlockLocation where hash=?", block_hash
+        ).fetchone()
+        if r is None or r[0] is None:
+            return None
+        return int.from_bytes(r[0], "big")
+
+    def _connect(self, block_hash: bytes, chain_work: int) -> None:
+        # set the chain work of the block and then of any descendants that were waiting
+        todo = [(block_hash, chain_work)]
+        while todo:
+            block_hash, chain_work = todo.pop()
+            self._exec_sql(
+                "update BlockLocation set chain_work=? where hash=?",
+                _work_blob(chain_work),
+                block_hash,
+            )
+            for child_hash, bits in self._exec_sql(
+                "select hash, bits from BlockLocation"
+                " where previous_hash=? and chain_work is null",
+                block_hash,
+            ).fetchall():
+                todo.append((child_hash, chain_work + work_for_bits(bits)))
+
+    def update(self, blockfiles: Any, block_class: type[Block] = Block) -> int:
+        """
+        Index the records in blockfiles (a :class:`MappedBlockfiles
+        <pycoin.tools.mapped_blockfiles.MappedBlockfiles>`) after the last one
+        indexed, then update the best chain. Returns the number of new blocks.
+        """
+        start_info = self.position()
+        count = 0
+        with self.db:
+            for file_index, offset, mv in blockfiles.iter_records(start_info):
+                header = block_class.header_from_buffer(mv)[0]
+                block_hash = header.hash()
+                previous_hash = header.previous_block_hash
+                start_info = (file_index, offset + len(mv))
+                c = self._exec_sql(
+                    "insert or ignore into BlockLocation values (?, ?, ?, ?, ?, ?, null)",
+                    block_hash,
+                    previous_hash,
+                    header.difficulty,
+                    file_index,
+                    offset,
+                    len(mv),
+                )
+                if c.rowcount == 0:
+                    # we already have it
+                    continue
+                count += 1
+                parent_work = self._chain_work(previous_hash)
+                if parent_work is not None:
+                    self._connect(
+                        block_hash, parent_work + work_for_bits(header.difficulty)
+                    )
+            self._exec_sql("delete from BlockIndexPosition")
+            self._exec_sql(
+                "insert into BlockIndexPosition values (0, ?, ?)", *start_info
+            )
+            self._update_best_chain()
+        return count
+
+    def _update_best_chain(self) -> None:
+        # the tip with the most work; on a tie, the block indexed first wins
+        r = self._exec_sql(
+            "select hash from BlockLocation where chain_work is not null"
+            " order by chain_work desc, rowid limit 1"
+        ).fetchone()
+        if r is None:
+            return
+        tip_height = self.height_for_hash(r[0])
+        # walk back from the best tip until the best chain we have agrees
+        path = []
+        block_hash = r[0]
+        while tip_height is None and block_hash != self.parent_hash:
+            path.append(block_hash)
+            block_hash = self._exec_sql(
+                "select previous_hash from BlockLocation where hash=?", block_hash
+            ).fetchone()[0]
+            tip_height = self.height_for_hash(block_hash)
+        if tip_height is None:
+            tip_height = -1
+        self._exec_sql("delete from BestChain where height > ?", tip_height)
+        for idx, block_hash in enumerate(reversed(path)):
+            self._exec_sql(
+                "insert into BestChain values (?, ?)", tip_height + 1 + idx, block_hash
+            )
+
+    def height(self) -> int:
+        """The height of the tip of the best chain, or -1 if it's empty."""
+        r = self._exec_sql("select max(height) from BestChain").fetchone()
+        return -1 if r[0] is None else r[0]  # type: ignore[no-any-return]
+
+    def hash_for_height(self, height: int) -> bytes | None:
+        r = self._exec_sql(
+            "select hash from BestChain where height=?", height
+        ).fetchone()
+        return None if r is None else r[0]  # type: ignore[no-any-return]
+
+    def height_for_hash(self, block_hash: bytes) -> int | None:
+        """The height of the block, or None if it isn't in the best chain."""
+        r = self._exec_sql(
+            "select height from BestChain where hash=?", block_hash
+        ).fetchone()
+        return None if r is None else r[0]  # type: ignore[no-any-return]
+
+    def location_for_hash(self, block_hash: bytes) -> tuple[int, int, int] | None:
+        """The (file_index, offset, size) of any block found, or None."""
+        r = self._exec_sql(
+            "select file_index, offset, size from BlockLocation where hash=?",
+            block_hash,
+        ).fetchone()
+        return None if r is None else tuple(r)  # type: ignore[return-value]
+
+    def block_bytes_for_hash(self, blockfiles: Any, block_hash: bytes) -> Any:
+        location = self.location_for_hash(block_hash)
+        if location is None:
+            raise KeyError("no block %s" % b2h_rev(block_hash))
+        return blockfiles.block_bytes(location[:2])
+
+    def block_for_hash(
+        self, blockfiles: Any, block_hash: bytes, block_class: type[Block] = Block
+    ) -> Block:
+        """
+        Read and parse a block, using blockfiles (a Blockfiles or
+        MappedBlockfiles) for the same directory.
+        """
+        data = self.block_bytes_for_hash(blockfiles, block_hash)
+        block = block_class.from_buffer(data)[0]
+        block.height = self.height_for_hash(block_hash)
+        return block
+
+    def block_for_height(
+        self, blockfiles: Any, height: int, block_class: type[Block] = Block
+    ) -> Block:
+        """Read and parse the block at height in the best chain."""
+        block_hash = self.hash_for_height(height)
+        if block_hash is None:
+            raise KeyError("no block at height %d" % height)
+        return self.block_for_hash(blockfiles, block_hash, block_class)
@@ -0,0 +1,210 @@
+"""
+Derive the keys and addresses for a range of BIP32 subkey paths, in several
+processes at once.
+
+The paths of a range like ``0/0-99999`` come from
+:func:`subpaths_for_path_range <pycoin.key.subpaths.subpaths_for_path_range>`
+one chunk at a time, and each chunk is derived and formatted by a worker
+process. Runs of consecutive siblings in a chunk are derived together with
+:meth:`BIP32Node.subkeys_range <pycoin.key.BIP32Node.BIP32Node.subkeys_range>`.
+Results come back in the order of the paths, with only a few chunks in
+flight at once, so memory doesn't grow with the size of the range.
+
+Usage::
+
+    for row in bulk_rows(key, "0/0-99999"):
+        ...
+
+    write_rows(bulk_rows(key, "0-1/0-99999"), sys.stdout, FIELDS, "csv")
+"""
+
+from __future__ import annotations
+
+import collections
+import concurrent.futures
+import csv
+import itertools
+import json
+import os
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from typing import Any, TextIO
+
+from pycoin.encoding.hexbytes import b2h
+from pycoin.key.subpaths import subpaths_for_path_range
+from pycoin.networks.registry import network_for_netcode
+
+
+# the names are those ku uses for the same values
+FIELDS = (
+    "subkey_path",
+    "key_pair_as_sec",
+    "hash160",
+    "address",
+    "p2sh_segwit",
+    "address_segwit",
+)
+
+FORMATS = ("jsonl", "csv")
+
+# network, path, public subkey => value
+FieldF = Callable[[Any, str, Any], "str | None"]
+
+
+def _p2sh_segwit(network: Any, path: str, key: Any) -> str | None:
+    script = network.contract.for_p2pkh_wit(key.hash160(is_compressed=True))
+    return network.address.for_p2s(script)  # type: ignore[no-any-return]
+
+
+FIELD_FUNCTIONS: dict[str, FieldF] = {
+    "subkey_path": lambda network, path, key: path,
+    "key_pair_as_sec": lambda network, path, key: b2h(key.sec(is_compressed=True)),
+    "hash160": lambda network, path, key: b2h(key.hash160(is_compressed=True)),
+    "address": lambda network, path, key: network.address.for_p2pkh(
+        key.hash160(is_compressed=True)
+    ),
+    "p2sh_segwit": _p2sh_segwit,
+    "address_segwit": lambda network, path, key: network.address.for_p2pkh_wit(
+        key.hash160(is_compressed=True)
+    ),
+}
+
+SEGWIT_FIELDS = ("p2sh_segwit", "address_segwit")
+
+
+def _split_path(path: str) -> tuple[str, int | None]:
+    # the parent path and the last index, or None if it's hardened
+    parent_path, _, last = path.rpartition("/")
+    if last and last[-1] not in "'pH":
+        return parent_path, int(last)
+    return parent_path, None
+
+
+def public_subkeys_for_paths(
+    key: Any, paths: Sequence[str]
+) -> Iterator[tuple[str, Any]]:
+    """
+    Yield (path, public subkey of key) for each of paths, deriving runs of
+    consecutive siblings together.
+    """
+    idx = 0
+    while idx < len(paths):
+        parent_path, i = _split_path(paths[idx])
+        end = idx + 1
+        if i is not None:
+            while end < len(paths) and _split_path(paths[end]) == (
+                parent_path,
+                i + end - idx,
+            ):
+                end += 1
+        if end - idx == 1:
+            subkey = key.subkey_for_path(paths[idx])
+            yield paths[idx], subkey.public_copy() if subkey.is_private() else subkey
+        else:
+            parent = key.subkey_for_path(parent_path)
+            if parent.is_private():
+                parent = parent.public_copy()
+            yield from zip(paths[idx:end], parent.subkeys_range(i, end - idx))
+        idx = end
+
+
+def rows_for_paths(
+    key: Any, paths: Sequence[str], fields: Sequence[str] = FIELDS
+) -> list[tuple[str | None, ...]]:
+    """
+    Return a row of the values of fields for each of paths of key. The
+    segwit fields are None on networks without segwit.
+    """
+    network = key._network
+    field_fs: list[FieldF | None] = [FIELD_FUNCTIONS[field] for field in fields]
+    if network.address.for_p2pkh_wit(b"\0" * 20) is None:
+        field_fs = [
+            None if field in SEGWIT_FIELDS else f for field, f in zip(fields, field_fs)
+        ]
+    return [
+        tuple(f(network, path, subkey) if f else None for f in field_fs)
+        for path, subkey in public_subkeys_for_paths(key, paths)
+    ]
+
+
+# the keys parsed by a worker process, by (netcode, hwif)
+_worker_keys: dict[tuple[str, str], Any] = {}
+
+
+def _rows_for_paths(
+    netcode: str, hwif: str, paths: list[str], fields: Sequence[str]
+) -> list[tuple[str | None, ...]]:
+    # runs in a worker process
+    key = _worker_keys.get((netcode, hwif))
+    if key is None:
+        key = network_for_netcode(netcode).parse.bip32(hwif)
+        _worker_keys[(netcode, hwif)] = key
+    return rows_for_paths(key, paths, fields)
+
+
+def bulk_rows(
+    key: Any,
+    path_range: str,
+    fields: Sequence[str] = FIELDS,
+    max_workers: int | None = None,
+    chunk_size: int = 1000,
+) -> Iterator[tuple[str | None, ...]]:
+    """
+    Yield a row of the values of fields for each path of the BIP32 key in
+    path_range (as for subpaths_for_path_range), in order.
+
+    :param max_workers: the number of worker processes; with 1, everything
+        is done in this process
+    :param chunk_size: the number of paths given to a worker at once
+    """
+    for field in fields:
+        if field not in FIELD_FUNCTIONS:
+            raise ValueError("unknown field %s" % field)
+    if key.is_private() and not any(c in path_range for c in "'pH"):
+        # workers don't need the private key
+        key = key.public_copy()
+    paths = subpaths_for_path_range(path_range)
+    chunks = iter(lambda: list(itertools.islice(paths, chunk_size)), [])
+
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1:
+        for chunk in chunks:
+            yield from rows_for_paths(key, chunk, fields)
+        return
+
+    netcode = key._network.symbol
+    hwif = key.hwif(as_private=key.is_private())
+    with concurrent.futures.ProcessPoolExecutor(max_workers) as executor:
+        pending: collections.deque[concurrent.futures.Future[Any]] = collections.deque()
+        for chunk in chunks:
+            pending.append(
+                executor.submit(_rows_for_paths, netcode, hwif, chunk, fields)
+            )
+            if len(pending) >= 2 * max_workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def write_rows(
+    rows: Iterable[Sequence[str | None]],
+    f: TextIO,
+    fields: Sequence[str] = FIELDS,
+    format: str = "jsonl",
+    header: bool = True,
+) -> None:
+    """
+    Write rows to f as JSON lines (objects keyed by field), or as CSV with a
+    header line unless header is False. None is written as null or as an
+    empty value.
+    """
+    if format == "jsonl":
+        for row in rows:
+            f.write(json.dumps(dict(zip(fields, row))))
+            f.write("\n")
+    elif format == "csv":
+        writer = csv.writer(f, lineterminator="\n")
+        if header:
+            writer.writerow(fields)
+        writer.writerows(rows)
+    else:
+        raise ValueError("unknown format %s" % format)
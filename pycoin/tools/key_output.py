@@ -0,0 +1,167 @@
+"""
+The values ku shows for a key, computed one field at a time.
+
+:meth:`Key.ku_output <pycoin.key.Key.Key.ku_output>` computes every field of
+a key: both secs, both hash160s and every address. When only a few fields
+are wanted, as with ``ku -b``, the functions here compute just those, and
+give the same values.
+
+Usage::
+
+    output_for_key(item, key, ["address", "hash160"])
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Sequence
+from typing import Any
+
+from pycoin.encoding.hexbytes import b2h
+from pycoin.key.HierarchicalKey import HierarchicalKey
+from pycoin.key.Key import Key
+
+
+# item, key => value, or None if the key doesn't have it
+FieldF = Callable[[str, Any], "str | None"]
+
+
+def _secret_exponent(key: Any, format: str) -> str | None:
+    secret_exponent = key.secret_exponent()
+    return format % secret_exponent if secret_exponent else None
+
+
+def _sec(key: Any, is_compressed: bool) -> str | None:
+    sec = key.sec(is_compressed=is_compressed)
+    return b2h(sec) if sec else None
+
+
+def _address_segwit(key: Any) -> str | None:
+    return key._network.address.for_p2pkh_wit(  # type: ignore[no-any-return]
+        key.hash160(is_compressed=True)
+    )
+
+
+def _p2sh_segwit_script(key: Any) -> bytes | None:
+    if not _address_segwit(key):
+        return None
+    return key._network.contract.for_p2pkh_wit(  # type: ignore[no-any-return]
+        key.hash160(is_compressed=True)
+    )
+
+
+def _p2sh_segwit(key: Any) -> str | None:
+    script = _p2sh_segwit_script(key)
+    return key._network.address.for_p2s(script) if script else None
+
+
+def _p2sh_segwit_script_hex(key: Any) -> str | None:
+    script = _p2sh_segwit_script(key)
+    return b2h(script) if script else None
+
+
+def _child_index(key: Any) -> str:
+    child_number = key.child_index()
+    if child_number >= 0x80000000:
+        return "%dH (%d)" % (child_number - 0x80000000, child_number)
+    return "%d" % child_number
+
+
+def _hierarchical(f: Callable[[Any], str | None]) -> FieldF:
+    return lambda item, key: f(key) if isinstance(key, HierarchicalKey) else None
+
+
+FIELD_FUNCTIONS: dict[str, FieldF] = {
+    "input": lambda item, key: item,
+    "network": lambda item, key: (
+        "%s %s" % (key._network.network_name, key._network.subnet_name)
+    ),
+    "symbol": lambda item, key: key._network.symbol,
+    "wallet_key": _hierarchical(lambda key: key.hwif(as_private=key.is_private())),
+    "public_version": _hierarchical(
+        lambda key: key.hwif(as_private=False) if key.is_private() else None
+    ),
+    "tree_depth": _hierarchical(lambda key: "%d" % key.tree_depth()),
+    "fingerprint": _hierarchical(lambda key: b2h(key.fingerprint())),
+    "parent_fingerprint": _hierarchical(lambda key: b2h(key.parent_fingerprint())),
+    "child_index": _hierarchical(_child_index),
+    "chain_code": _hierarchical(lambda key: b2h(key.chain_code())),
+    "private_key": _hierarchical(lambda key: "yes" if key.is_private() else "no"),
+    "secret_exponent": lambda item, key: _secret_exponent(key, "%d"),
+    "secret_exponent_hex": lambda item, key: _secret_exponent(key, "%x"),
+    "wif": lambda item, key: key.wif(is_compressed=True),
+    "wif_uncompressed": lambda item, key: key.wif(is_compressed=False),
+    "public_pair_x": lambda item, key: "%d" % key.public_pair()[0],
+    "public_pair_y": lambda item, key: "%d" % key.public_pair()[1],
+    "public_pair_x_hex": lambda item, key: "%x" % key.public_pair()[0],
+    "public_pair_y_hex": lambda item, key: "%x" % key.public_pair()[1],
+    "y_parity": lambda item, key: "odd" if key.public_pair()[1] & 1 else "even",
+    "key_pair_as_sec": lambda item, key: _sec(key, True),
+    "key_pair_as_sec_uncompressed": lambda item, key: _sec(key, False),
+    "hash160": lambda item, key: b2h(key.hash160(is_compressed=True)),
+    "hash160_uncompressed": lambda item, key: b2h(key.hash160(is_compressed=False)),
+    "address": lambda item, key: key.address(is_compressed=True),
+    "address_uncompressed": lambda item, key: key.address(is_compressed=False),
+    "address_segwit": lambda item, key: _address_segwit(key),
+    "p2sh_segwit": lambda item, key: _p2sh_segwit(key),
+    "p2sh_segwit_script": lambda item, key: _p2sh_segwit_script_hex(key),
+}
+
+
+def has_standard_output(key: Any) -> bool:
+    """
+    Return whether the ku output of key is the one made by Key and
+    HierarchicalKey, so FIELD_FUNCTIONS give the same values.
+    """
+    cls = type(key)
+    if not isinstance(key, Key) or cls.secret_exponent is not Key.secret_exponent:
+        return False
+    for name in [
+        "ku_output_for_secret_exponent",
+        "ku_output_for_public_pair",
+        "ku_output_for_address",
+    ]:
+        if getattr(cls, name) is not getattr(Key, name):
+            return False
+    if isinstance(key, HierarchicalKey):
+        return (
+            cls.ku_output is HierarchicalKey.ku_output
+            and cls.ku_output_for_hk is HierarchicalKey.ku_output_for_hk
+        )
+    return cls.ku_output is Key.ku_output
+
+
+def output_for_key(item: str, key: Any, fields: Sequence[str] = ()) -> dict[str, str]:
+    """
+    Return the ku output of key, parsed from the text item, as a dict with
+    the non-empty values of fields, or of every field if fields is empty.
+
+    When the key has the standard output and every field has a function in
+    FIELD_FUNCTIONS, only those fields are computed. Otherwise, the values
+    come from the key's ku_output.
+    """
+    if (
+        fields
+        and all(field in FIELD_FUNCTIONS for field in fields)
+        and has_standard_output(key)
+    ):
+        output = {}
+        for field in fields:
+            value = FIELD_FUNCTIONS[field](item, key)
+            if value:
+                output[field] = value
+        return output
+
+    field_set = set(fields)
+    output = {}
+    key_output = [
+        ("input", item, None),
+        ("network", FIELD_FUNCTIONS["network"](item, key), None),
+        ("symbol", key._network.symbol, None),
+    ]
+    key_output.extend(key.ku_output())
+    for name, value, text in key_output:
+        if field_set and name not in field_set:
+            continue
+        if value:
+            output[name.strip() if text == "legacy" else name.strip().lower()] = value
+    return output
@@ -0,0 +1,261 @@
+"""
+Read bitcoind blk*.dat files through mmap.
+
+Each record in a block file is the network magic, a little-endian uint32 size
+and the serialized block. MappedBlockfiles yields (file_index, offset,
+memoryview) for each record, where offset is the position of the block data
+(the same block_info :class:`Blockfiles <pycoin.tools.bitcoind_disk.Blockfiles>`
+uses), and the memoryview points straight into the mapped file.
+
+Bitcoin Core 28 and later XOR the files in the blocks directory with the
+8-byte key in blocks/xor.dat. When the key isn't all zero, a whole file is
+de-obfuscated at once with a single big integer XOR, so the records are then
+views into that copy rather than into the mapping.
+
+Usage::
+
+    blockfiles = MappedBlockfiles(base_dir)
+    for block in blockfiles.blocks(network.block, lazy=True):
+        ...
+
+    # process each file in a worker process; func must be picklable
+    for file_index, results in blockfiles.map_files(func):
+        ...
+"""
+
+from __future__ import annotations
+
+import collections
+import concurrent.futures
+import mmap
+import os
+import struct
+from collections.abc import Callable, Generator, Iterable
+from typing import Any
+
+from pycoin.encoding.hexbytes import h2b
+
+from .bitcoind_disk import default_base_dir
+
+
+XOR_KEY_SIZE = 8
+
+
+def read_xor_key(base_dir: str) -> bytes | None:
+    """Return the key from blocks/xor.dat, or None if there's no (non-zero) key."""
+    path = os.path.join(base_dir, "blocks", "xor.dat")
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        key = f.read()
+    if len(key) != XOR_KEY_SIZE:
+        raise ValueError("%s should be %d bytes" % (path, XOR_KEY_SIZE))
+    if key == bytes(XOR_KEY_SIZE):
+        return None
+    return key
+
+
+def deobfuscate(data: bytes | memoryview, key: bytes, offset: int = 0) -> bytes:
+    """
+    XOR data, which starts at offset in its file, with the repeating key.
+    (The same call obfuscates.)
+    """
+    size = len(data)
+    if size == 0:
+        return b""
+    start = offset % len(key)
+    key_stream = (key[start:] + key[:start]) * (size // len(key) + 1)
+    v = int.from_bytes(data, "little") ^ int.from_bytes(key_stream[:size], "little")
+    return v.to_bytes(size, "little")
+
+
+def iter_records(
+    buf: Any, magic: bytes, offset: int = 0
+) -> Generator[tuple[int, int], None, None]:
+    """
+    Yield (offset, size) for each block record in buf from offset on. Stops at
+    the end of buf, at zero padding (preallocated space), or at a truncated
+    record. Raises ValueError for bad magic.
+    """
+    end = len(buf)
+    while offset + 8 <= end:
+        record_magic = bytes(buf[offset : offset + 4])
+        if record_magic != magic:
+            if record_magic == b"\0\0\0\0":
+                return
+            raise ValueError("bad magic at offset %d" % offset)
+        (size,) = struct.unpack_from("<L", buf, offset + 4)
+        offset += 8
+        if offset + size > end:
+            return
+        yield offset, size
+        offset += size
+
+
+def _map_file(
+    base_dir: str,
+    magic: bytes,
+    xor_key: bytes | None,
+    file_index: int,
+    func: Callable[[int, int, memoryview], Any],
+) -> list[Any]:
+    # runs in a worker process
+    blockfiles = MappedBlockfiles(base_dir, MAGIC=magic, xor_key=xor_key)
+    try:
+        results = []
+        for record in blockfiles.records(file_index):
+            results.append(func(*record))
+            record[2].release()
+        return results
+    finally:
+        blockfiles.close()
+
+
+class MappedBlockfiles(object):
+    """
+    :param base_dir: the bitcoind data directory. Defaults to the usual place.
+    :param MAGIC: the network magic
+    :param xor_key: the obfuscation key. Defaults to the one in blocks/xor.dat,
+        or None if there isn't one. Pass b"" to ignore that file.
+
+    Memoryviews handed out by records and block_bytes (and lazily parsed
+    blocks) refer to the file mapping, which stays mapped until the last of
+    them is gone.
+    """
+
+    def __init__(
+        self,
+        base_dir: str | None = None,
+        MAGIC: bytes = h2b("f9beb4d9"),
+        xor_key: bytes | None = None,
+    ) -> None:
+        if base_dir is None:
+            base_dir = default_base_dir()
+        self.base_dir = base_dir
+        self._magic = MAGIC
+        if xor_key is None:
+            xor_key = read_xor_key(base_dir)
+        self.xor_key = xor_key
+        # the buffer of the most recently used file
+        self._file_index: int | None = None
+        self._buf: Any = None
+
+    def path_for_file_index(self, file_index: int) -> str:
+        return os.path.join(self.base_dir, "blocks", "blk%05d.dat" % file_index)
+
+    def file_indices(self, start: int = 0) -> Generator[int, None, None]:
+        """Yield the index of each block file from start until one is missing."""
+        file_index = start
+        while os.path.exists(self.path_for_file_index(file_index)):
+            yield file_index
+            file_index += 1
+
+    def buffer(self, file_index: int) -> Any:
+        """
+        Return the (de-obfuscated) contents of a block file, as an mmap or bytes.
+        Only the most recently used file is kept open.
+        """
+        if self._file_index != file_index:
+            self.close()
+            with open(self.path_for_file_index(file_index), "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    buf: Any = b""
+                else:
+                    buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if self.xor_key and len(buf):
+                mapped = buf
+                buf = deobfuscate(mapped, self.xor_key)
+                mapped.close()
+            self._file_index, self._buf = file_index, buf
+        return self._buf
+
+    def close(self) -> None:
+        if isinstance(self._buf, mmap.mmap):
+            try:
+                self._buf.close()
+            except BufferError:
+                # views of it are still around; it's unmapped when they're gone
+                pass
+        self._file_index, self._buf = None, None
+
+    def records(
+        self, file_index: int, offset: int = 0
+    ) -> Generator[tuple[int, int, memoryview], None, None]:
+        """Yield (file_index, offset, memoryview) for each block record in one file."""
+        buf = self.buffer(file_index)
+        with memoryview(buf) as mv:
+            for block_offset, size in iter_records(buf, self._magic, offset):
+                yield file_index, block_offset, mv[block_offset : block_offset + size]
+
+    def iter_records(
+        self, start_info: tuple[int, int] = (0, 0)
+    ) -> Generator[tuple[int, int, memoryview], None, None]:
+        """
+        Yield (file_index, offset, memoryview) for each block record, starting
+        at the record at start_info, a (file_index, offset) pair whose offset is
+        that of the record's magic.
+        """
+        file_index, offset = start_info
+        for file_index in self.file_indices(file_index):
+            yield from self.records(file_index, offset)
+            offset = 0
+
+    def blocks(
+        self,
+        block_class: Any,
+        start_info: tuple[int, int] = (0, 0),
+        lazy: bool = True,
+        check_merkle_hash: bool = True,
+    ) -> Generator[Any, None, None]:
+        """
+        Yield each block, parsed with block_class.from_buffer, with its
+        (file_index, offset) as block.info. With lazy, transactions are
+        parsed when they're first used.
+        """
+        for file_index, offset, mv in self.iter_records(start_info):
+            block = block_class.from_buffer(
+                mv, lazy=lazy, check_merkle_hash=check_merkle_hash
+            )[0]
+            block.info = (file_index, offset)
+            yield block
+
+    def block_bytes(self, block_info: tuple[int, int]) -> memoryview:
+        """Return the raw block at block_info, a (file_index, offset) pair."""
+        file_index, offset = block_info
+        buf = self.buffer(file_index)
+        (size,) = struct.unpack_from("<L", buf, offset - 4)
+        return memoryview(buf)[offset : offset + size]
+
+    def map_files(
+        self,
+        func: Callable[[int, int, memoryview], Any],
+        file_indices: Iterable[int] | None = None,
+        max_workers: int | None = None,
+    ) -> Generator[tuple[int, list[Any]], None, None]:
+        """
+        Call func(file_index, offset, memoryview) for every record, with each
+        file handled by a worker process that maps it itself. The memoryview is
+        released when func returns, so func must copy anything it keeps.
+        Yields (file_index, results) in file order, with at most two files per
+        worker in flight.
+        """
+        if file_indices is None:
+            file_indices = self.file_indices()
+        # the key is already known, so workers don't look in xor.dat again
+        xor_key = self.xor_key or b""
+        max_workers = max_workers or os.cpu_count() or 1
+        with concurrent.futures.ProcessPoolExecutor(max_workers) as executor:
+            pending: collections.deque[
+                tuple[int, concurrent.futures.Future[list[Any]]]
+            ] = collections.deque()
+            for file_index in file_indices:
+                future = executor.submit(
+                    _map_file, self.base_dir, self._magic, xor_key, file_index, func
+                )
+                pending.append((file_index, future))
+                if len(pending) >= 2 * max_workers:
+                    file_index, future = pending.popleft()
+                    yield file_index, future.result()
+            while pending:
+                file_index, future = pending.popleft()
+                yield file_index, future.result()
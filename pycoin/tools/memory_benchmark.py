@@ -0,0 +1,100 @@
+"""
+Measure the memory used by each TxIn, TxOut, Spendable and Block object.
+
+Each class is compared with a subclass that adds nothing but a per-instance
+__dict__, which is what these classes had before they declared __slots__.
+The "dict" TxIn also gets its own empty witness list, like it used to.
+
+    python -m pycoin.tools.memory_benchmark [count]
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import sys
+import tracemalloc
+from typing import Any, Callable
+
+from pycoin.block import Block
+from pycoin.coins.bitcoin.Spendable import Spendable
+from pycoin.coins.bitcoin.TxIn import TxIn
+from pycoin.coins.bitcoin.TxOut import TxOut
+
+
+HASH = b"\1" * 32
+SCRIPT = b"\x51" * 25
+
+
+def bytes_per_object(make_f: Callable[[], Any], count: int = 100000) -> float:
+    """Return the average number of bytes allocated by a call to make_f."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        objects = [make_f() for i in range(count)]
+        size = tracemalloc.get_traced_memory()[0] - start - sys.getsizeof(objects)
+    finally:
+        tracemalloc.stop()
+    return size / count
+
+
+def _with_dict(class_: type) -> type:
+    return type(class_.__name__, (class_,), {})
+
+
+def _dict_tx_in(class_: type) -> Any:
+    tx_in = class_(HASH, 0, SCRIPT)
+    tx_in.witness = []
+    return tx_in
+
+
+def benchmarks() -> list[tuple[str, Callable[[], Any], Callable[[], Any]]]:
+    """Return (name, make slotted object, make object with a __dict__) triples."""
+    dict_classes = {c: _with_dict(c) for c in (TxIn, TxOut, Spendable, Block)}
+    return [
+        (
+            "TxIn",
+            lambda: TxIn(HASH, 0, SCRIPT),
+            lambda: _dict_tx_in(dict_classes[TxIn]),
+        ),
+        (
+            "TxOut",
+            lambda: TxOut(5000, SCRIPT),
+            lambda: dict_classes[TxOut](5000, SCRIPT),
+        ),
+        (
+            "Spendable",
+            lambda: Spendable(5000, SCRIPT, HASH, 0),
+            lambda: dict_classes[Spendable](5000, SCRIPT, HASH, 0),
+        ),
+        (
+            "Block",
+            lambda: Block(1, HASH, HASH, 0, 0, 0),
+            lambda: dict_classes[Block](1, HASH, HASH, 0, 0, 0),
+        ),
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Show the bytes used per object with and without __slots__."
+    )
+    parser.add_argument(
+        "count", type=int, nargs="?", default=100000, help="objects to create"
+    )
+    args = parser.parse_args()
+    print("%-10s %10s %10s" % ("class", "__dict__", "__slots__"))
+    for name, make_slotted_f, make_dict_f in benchmarks():
+        print(
+            "%-10s %10.1f %10.1f"
+            % (
+                name,
+                bytes_per_object(make_dict_f, args.count),
+                bytes_per_object(make_slotted_f, args.count),
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Parse the transactions of large blocks in several processes at once.
+
+The block is scanned once for transaction boundaries (see
+:func:`pycoin.coins.Tx.Tx.scan_buffer`), copied into a single
+multiprocessing.shared_memory segment, and each worker parses a run of
+transactions straight out of that segment. Only the parsed transactions
+travel back through pickle.
+
+Usage, with blocks found by locked_blocks_iterator::
+
+    with ParallelBlockParser() as parser:
+        for bh in locked_blocks_iterator(blockfiles):
+            block = parser.parse(network.block, blockfiles.block_bytes(bh.info))
+"""
+
+from __future__ import annotations
+
+import concurrent.futures
+import os
+from multiprocessing import shared_memory
+from typing import Any
+
+from pycoin.block import Block, LazyTxList
+from pycoin.satoshi.satoshi_int import unpack_satoshi_int_from
+
+
+def _parse_txs(shm_name: str, tx_class: Any, offsets: list[int]) -> list[Any]:
+    # runs in a worker process. Workers share the resource tracker of the process
+    # that created the segment, so attaching doesn't register it a second time.
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        # from_buffer copies what it needs, so nothing refers to shm.buf afterwards
+        return [tx_class.from_buffer(shm.buf, offset)[0] for offset in offsets]
+    finally:
+        shm.close()
+
+
+class ParallelBlockParser(object):
+    """
+    Parse block transactions using a pool of worker processes. Blocks with fewer
+    than min_parallel_txs transactions (or Tx classes that can't be scanned) are
+    parsed in this process.
+
+    The results are the same as :func:`Block.parse <pycoin.block.Block.parse>`.
+    """
+
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        min_parallel_txs: int = 256,
+        chunks_per_worker: int = 4,
+    ) -> None:
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.min_parallel_txs = min_parallel_txs
+        self.chunks_per_worker = chunks_per_worker
+        self._executor: concurrent.futures.ProcessPoolExecutor | None = None
+
+    def __enter__(self) -> ParallelBlockParser:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._executor:
+            self._executor.shutdown()
+            self._executor = None
+
+    def executor(self) -> concurrent.futures.ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = concurrent.futures.ProcessPoolExecutor(self.max_workers)
+        return self._executor
+
+    def parse(
+        self,
+        block_class: type[Block],
+        buf: bytes | memoryview,
+        offset: int = 0,
+        include_offsets: Any = None,
+        check_merkle_hash: bool = True,
+    ) -> Block:
+        """
+        Parse the block at offset in buf, with its transactions.
+        """
+        mv = memoryview(buf)
+        block_offset = offset
+        block, offset = block_class.header_from_buffer(mv, offset)
+        count, offset = unpack_satoshi_int_from(mv, offset)
+        lazy_txs = None
+        try:
+            lazy_txs, end = LazyTxList.scan(block_class.Tx, mv, offset, count)
+        except NotImplementedError:
+            pass
+        if lazy_txs is None or len(lazy_txs) < self.min_parallel_txs:
+            return block_class.from_buffer(
+                buf,
+                block_offset,
+                include_offsets=include_offsets,
+                check_merkle_hash=check_merkle_hash,
+            )[0]
+
+        spans = lazy_txs.spans()
+        # copy the transactions into shared memory, and find their offsets there
+        tx_start = spans[0][0]
+        shm = shared_memory.SharedMemory(create=True, size=end - tx_start)
+        try:
+            assert shm.buf is not None
+            shm.buf[: end - tx_start] = mv[tx_start:end]
+            offsets = [start - tx_start for start, _ in spans]
+            futures = [
+                self.executor().submit(
+                    _parse_txs, shm.name, block_class.Tx, offsets[start:stop]
+                )
+                for start, stop in self._chunks(spans)
+            ]
+            txs = []
+            for future in futures:
+                txs.extend(future.result())
+        finally:
+            shm.close()
+            shm.unlink()
+
+        if include_offsets:
+            for tx, (start, _) in zip(txs, spans):
+                tx.offset_in_block = start - block_offset
+        block.set_txs(txs, check_merkle_hash=check_merkle_hash)
+        return block
+
+    def _chunks(self, spans: list[tuple[int, int]]) -> list[tuple[int, int]]:
+        """Split spans into index ranges holding about the same number of bytes."""
+        chunk_count = min(len(spans), self.max_workers * self.chunks_per_worker)
+        total = sum(length for _, length in spans)
+        chunks: list[tuple[int, int]] = []
+        start = 0
+        size = 0
+        for idx, (_, length) in enumerate(spans):
+            size += length
+            if size * chunk_count >= total * (len(chunks) + 1):
+                chunks.append((start, idx + 1))
+                start = idx + 1
+        if start < len(spans):
+            chunks.append((start, len(spans)))
+        return chunks
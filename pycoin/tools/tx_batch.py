@@ -0,0 +1,227 @@
+"""
+Flatten the transactions of a sequence of blocks into columns (a
+"struct of arrays"), for analytics that would otherwise loop over
+Tx.txs_in and Tx.txs_out in Python.
+
+Columns are stdlib arrays, or memoryviews of a memory-mapped file after
+:func:`TxBatch.load`. :func:`TxBatch.to_numpy` wraps them as NumPy arrays
+without copying (NumPy is optional, and only needed for that)::
+
+    batch = TxBatch.from_blocks(blocks, network.contract)
+    a = batch.to_numpy()
+    # satoshis paid to each script type
+    totals = numpy.bincount(a["script_type"], weights=a["value"])
+    # outputs of transaction i
+    a["value"][a["tx_out_start"][i] : a["tx_out_start"][i + 1]]
+"""
+
+from __future__ import annotations
+
+import array
+import json
+import mmap
+import sys
+from typing import Any, Iterable
+
+
+# (name, array typecode, items per row) in the order they're saved
+COLUMNS: tuple[tuple[str, str, int], ...] = (
+    # index of the first transaction of each block, plus the total at the end
+    ("block_tx_start", "Q", 1),
+    ("tx_hash", "B", 32),
+    ("version", "I", 1),
+    ("lock_time", "I", 1),
+    # index of the first input and output of each transaction, plus the totals
+    ("tx_in_start", "Q", 1),
+    ("tx_out_start", "Q", 1),
+    ("prevout_hash", "B", 32),
+    ("prevout_index", "I", 1),
+    ("sequence", "I", 1),
+    ("value", "q", 1),
+    # offset of each output script in scripts, plus the total length
+    ("script_start", "Q", 1),
+    ("script_type", "B", 1),
+    ("scripts", "B", 1),
+)
+
+# script_type is an index into this tuple
+SCRIPT_TYPES: tuple[str, ...] = (
+    "unknown",
+    "p2pk",
+    "p2pkh",
+    "p2sh",
+    "p2pkh_wit",
+    "p2sh_wit",
+    "p2tr",
+    "multisig",
+    "nulldata",
+)
+
+NUMPY_DTYPES = dict(B="u1", I="u4", q="i8", Q="u8")
+
+MAGIC = b"pycoin-TxBatch\0\0"
+
+
+class TxBatch(object):
+    """
+    The transactions of several blocks, stored column by column. See COLUMNS for
+    the columns and their meaning.
+    """
+
+    def __init__(self, columns: dict[str, Any]) -> None:
+        self.columns = columns
+        self._buffer: Any = None
+
+    def __getattr__(self, name: str) -> Any:
+        columns = self.__dict__.get("columns", {})
+        if name in columns:
+            return columns[name]
+        raise AttributeError(name)
+
+    @classmethod
+    def from_blocks(
+        class_: type[TxBatch], blocks: Iterable[Any], contract: Any
+    ) -> TxBatch:
+        """
+        Build a batch from parsed blocks. contract is a network's ContractAPI
+        (network.contract), used to find the script_type of each output.
+        """
+        columns: dict[str, Any] = {
+            name: array.array(typecode) for name, typecode, _ in COLUMNS
+        }
+        type_codes = {name: idx for idx, name in enumerate(SCRIPT_TYPES)}
+        info_for_script = contract.info_for_script
+        block_tx_start = columns["block_tx_start"]
+        tx_hash = columns["tx_hash"]
+        version = columns["version"]
+        lock_time = columns["lock_time"]
+        tx_in_start = columns["tx_in_start"]
+        tx_out_start = columns["tx_out_start"]
+        prevout_hash = columns["prevout_hash"]
+        prevout_index = columns["prevout_index"]
+        sequence = columns["sequence"]
+        value = columns["value"]
+        script_start = columns["script_start"]
+        script_type = columns["script_type"]
+        scripts = columns["scripts"]
+        for block in blocks:
+            block_tx_start.append(len(version))
+            for tx in block.txs:
+                tx_hash.frombytes(tx.hash())
+                version.append(tx.version)
+                lock_time.append(tx.lock_time)
+                tx_in_start.append(len(sequence))
+                tx_out_start.append(len(value))
+                for tx_in in tx.txs_in:
+                    prevout_hash.frombytes(tx_in.previous_hash)
+                    prevout_index.append(tx_in.previous_index)
+                    sequence.append(tx_in.sequence)
+                for tx_out in tx.txs_out:
+                    value.append(tx_out.coin_value)
+                    script_start.append(len(scripts))
+                    script_type.append(
+                        type_codes.get(info_for_script(tx_out.script)["type"], 0)
+                    )
+                    scripts.frombytes(tx_out.script)
+        block_tx_start.append(len(version))
+        tx_in_start.append(len(sequence))
+        tx_out_start.append(len(value))
+        script_start.append(len(scripts))
+        return class_(columns)
+
+    def __len__(self) -> int:
+        return len(self.columns["version"])
+
+    def block_count(self) -> int:
+        return len(self.columns["block_tx_start"]) - 1
+
+    def tx_in_range(self, tx_index: int) -> range:
+        """Return the indices of the inputs of a transaction."""
+        starts = self.columns["tx_in_start"]
+        return range(starts[tx_index], starts[tx_index + 1])
+
+    def tx_out_range(self, tx_index: int) -> range:
+        """Return the indices of the outputs of a transaction."""
+        starts = self.columns["tx_out_start"]
+        return range(starts[tx_index], starts[tx_index + 1])
+
+    def script(self, out_index: int) -> bytes:
+        """Return the script of an output."""
+        starts = self.columns["script_start"]
+        return bytes(self.columns["scripts"][starts[out_index] : starts[out_index + 1]])
+
+    def value_by_script_type(self) -> dict[str, int]:
+        """Return the total output value for each script type that appears."""
+        try:
+            import numpy
+        except ImportError:
+            totals = [0] * len(SCRIPT_TYPES)
+            for type_code, value in zip(
+                self.columns["script_type"], self.columns["value"]
+            ):
+                totals[type_code] += value
+        else:
+            a = self.to_numpy()
+            np_totals = numpy.zeros(len(SCRIPT_TYPES), dtype="i8")
+            numpy.add.at(np_totals, a["script_type"], a["value"])
+            totals = np_totals.tolist()
+        counts = set(self.columns["script_type"])
+        return {
+            name: totals[idx] for idx, name in enumerate(SCRIPT_TYPES) if idx in counts
+        }
+
+    def to_numpy(self) -> dict[str, Any]:
+        """
+        Return the columns as NumPy arrays that share memory with this batch.
+        tx_hash and prevout_hash have shape (n, 32). Requires NumPy.
+        """
+        import numpy
+
+        d = {}
+        for name, typecode, width in COLUMNS:
+            a = numpy.frombuffer(self.columns[name], dtype=NUMPY_DTYPES[typecode])
+            d[name] = a.reshape(-1, width) if width > 1 else a
+        return d
+
+    def save(self, path: str) -> None:
+        """
+        Write the batch to a file that :func:`load` can map into memory. Columns
+        are written in this machine's byte order.
+        """
+        header: dict[str, Any] = dict(byteorder=sys.byteorder, columns=[])
+        offset = 0
+        for name, typecode, _ in COLUMNS:
+            size = memoryview(self.columns[name]).nbytes
+            header["columns"].append([name, typecode, offset, size])
+            offset += -(-size // 8) * 8
+        header_bin = json.dumps(header).encode("utf8")
+        header_bin += b" " * (-len(header_bin) % 8)
+        with open(path, "wb") as f:
+            f.write(MAGIC)
+            f.write(len(header_bin).to_bytes(8, "little"))
+            f.write(header_bin)
+            for name, typecode, column_offset, size in header["columns"]:
+                f.write(memoryview(self.columns[name]).cast("B"))
+                f.write(b"\0" * (-size % 8))
+
+    @classmethod
+    def load(class_: type[TxBatch], path: str) -> TxBatch:
+        """
+        Map a file written by :func:`save` into memory. The columns are read-only
+        memoryviews of the file, so nothing is read until it's used.
+        """
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError("%s is not a TxBatch file" % path)
+            header_size = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(header_size))
+            if header["byteorder"] != sys.byteorder:
+                raise ValueError("TxBatch file was saved with another byte order")
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        base = memoryview(mm)[len(MAGIC) + 8 + header_size :]
+        columns = {}
+        for name, typecode, offset, size in header["columns"]:
+            columns[name] = base[offset : offset + size].cast(typecode)
+        batch = class_(columns)
+        batch._buffer = mm
+        return batch
@@ -6,11 +6,17 @@ from typing import Any
 
 from pycoin.encoding.hexbytes import b2h, h2b, b2h_rev, h2b_rev
 from pycoin.key.BIP32Node import BIP32Node
+from pycoin.key.DerivationCache import DerivationCache
 
 
 class SQLite3Persistence(object):
-    def __init__(self, sqlite3_db: sqlite3.Connection) -> None:
+    def __init__(
+        self,
+        sqlite3_db: sqlite3.Connection,
+        derivation_cache: DerivationCache | None = None,
+    ) -> None:
         self.db = sqlite3_db
+        self.derivation_cache = derivation_cache
         self._init_tables()
 
     def _exec_sql(self, sql: str, *args: Any) -> sqlite3.Cursor:
@@ -71,7 +77,11 @@ unique(path, key_id)
         self.db.commit()
 
     def add_bip32_path(self, bip32_node: Any, path: str) -> str:
-        address = bip32_node.subkey_for_path(path).address()
+        if self.derivation_cache is not None:
+            subkey = self.derivation_cache.public_subkey_for_path(bip32_node, path)
+        else:
+            subkey = bip32_node.subkey_for_path(path)
+        address = subkey.address()
         key_id = bip32_node.id
         self._exec_sql(
             "insert or ignore into BIP32Node values (?, ?, ?)", path, key_id, address
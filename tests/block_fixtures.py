@@ -0,0 +1,29 @@
+"""
+Blocks of made-up transactions, for the tests of tools that parse blocks.
+"""
+
+import struct
+
+from pycoin.encoding.hash import double_sha256
+from pycoin.merkle import merkle
+from pycoin.symbols.btc import network
+
+
+def make_block(tx_count):
+    """
+    Return the bytes of a block with a coinbase and tx_count - 1 transactions
+    of different sizes, every other one with a witness.
+    """
+    Tx = network.tx
+    txs = [Tx.coinbase_tx(b"\2" * 33, 5000000000, b"\0\0")]
+    for i in range(1, tx_count):
+        tx_in = Tx.TxIn(struct.pack("<L", i) * 8, i, b"\x51" * i)
+        tx = Tx(1, [tx_in], [Tx.TxOut(i, b"\x52" * (i % 7))], lock_time=i)
+        if i % 2:
+            tx_in.witness = [b"\1" * i, b""]
+        txs.append(tx)
+    block = network.block(
+        1, b"\0" * 32, merkle([tx.hash() for tx in txs], double_sha256), 0, 0, 0
+    )
+    block.set_txs(txs)
+    return block.as_bin()
@@ -0,0 +1,83 @@
+import os
+import sqlite3
+import struct
+import tempfile
+import unittest
+
+from pycoin.symbols.btc import network
+from pycoin.tools.bitcoind_disk import Blockfiles
+from pycoin.tools.block_index import BlockIndex
+from pycoin.tools.mapped_blockfiles import MappedBlockfiles
+
+from .utxo_store_test import make_chain
+
+
+MAGIC = b"\xf9\xbe\xb4\xd9"
+
+
+def write_file(base_dir, file_index, blocks, mode="wb"):
+    path = os.path.join(base_dir, "blocks", "blk%05d.dat" % file_index)
+    with open(path, mode) as f:
+        for block in blocks:
+            data = block.as_bin()
+            f.write(MAGIC + struct.pack("<L", len(data)) + data)
+
+
+class BlockIndexTest(unittest.TestCase):
+    def test_index(self):
+        chain = make_chain(6)
+        fork = make_chain(3, chain[2].hash(), tag=100)
+        with tempfile.TemporaryDirectory() as base_dir:
+            os.mkdir(os.path.join(base_dir, "blocks"))
+            # chain[2] comes after its child
+            write_file(base_dir, 0, chain[:2] + [chain[3], chain[2]] + fork[:1])
+            db_path = os.path.join(base_dir, "index.db")
+            blockfiles = MappedBlockfiles(base_dir)
+            block_index = BlockIndex(sqlite3.connect(db_path))
+            self.assertEqual(block_index.update(blockfiles), 5)
+            self.assertEqual(block_index.height(), 3)
+            self.assertEqual(
+                [block_index.hash_for_height(h) for h in range(4)],
+                [b.hash() for b in chain[:4]],
+            )
+            self.assertEqual(block_index.update(blockfiles), 0)
+
+            # more blocks in the same file and a new one, indexed from where we left off
+            write_file(base_dir, 0, fork[1:2], mode="ab")
+            write_file(base_dir, 1, chain[4:] + chain[:1])
+            blockfiles.close()
+            block_index = BlockIndex(sqlite3.connect(db_path))
+            self.assertEqual(block_index.update(blockfiles), 3)
+            self.assertEqual(len(block_index), 8)
+            self.assertEqual(block_index.height(), 5)
+            self.assertEqual(block_index.hash_for_height(5), chain[5].hash())
+            self.assertEqual(block_index.height_for_hash(chain[4].hash()), 4)
+            self.assertIsNone(block_index.height_for_hash(fork[0].hash()))
+            self.assertIsNone(block_index.hash_for_height(6))
+
+            # a longer fork takes over
+            fork += make_chain(4, fork[-1].hash(), tag=200)
+            write_file(base_dir, 2, fork[2:])
+            block_index.update(blockfiles)
+            self.assertEqual(block_index.height(), 9)
+            self.assertEqual(
+                [block_index.hash_for_height(h) for h in range(10)],
+                [b.hash() for b in chain[:3] + fork],
+            )
+            self.assertIsNone(block_index.height_for_hash(chain[5].hash()))
+
+            block = block_index.block_for_height(blockfiles, 4, network.block)
+            self.assertEqual(block.as_bin(), fork[1].as_bin())
+            self.assertEqual(block.height, 4)
+            block = block_index.block_for_hash(
+                Blockfiles(base_dir), chain[5].hash(), network.block
+            )
+            self.assertEqual(block.as_bin(), chain[5].as_bin())
+            self.assertIsNone(block.height)
+            self.assertEqual(block_index.location_for_hash(chain[4].hash())[0], 1)
+            self.assertRaises(KeyError, block_index.block_for_height, blockfiles, 10)
+            blockfiles.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
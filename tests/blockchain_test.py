@@ -157,6 +157,56 @@ class BlockchainTestCase(unittest.TestCase):
         assert ops == expected
         assert set(BC.chain_finder.missing_parents()) == set([parent_for_0])
 
+    def test_most_work(self):
+        parent_for_0 = b"\0" * 32
+        # 0 <= 1 <= ... <= 6, and 2 <= 301 <= 302 with a higher difficulty
+        ITEMS = [FakeBlock(i) for i in range(7)]
+        ITEMS[0] = FakeBlock(0, parent_for_0)
+        for item in ITEMS:
+            item.difficulty = 0x207FFFFF
+        FORK = [FakeBlock(301, 2), FakeBlock(302, 301)]
+        for item in FORK:
+            item.difficulty = 0x1D00FFFF
+
+        BC = BlockChain(parent_for_0)
+        BC.add_headers(ITEMS)
+        assert BC.length() == 7
+        ops = BC.add_headers(FORK[:1])
+        expected = [("remove", ITEMS[i], i) for i in range(6, 2, -1)]
+        expected += [("add", FORK[0], 3)]
+        assert ops == expected
+        assert longest_block_chain(BC) == [0, 1, 2, 301]
+        assert BC.chain_work[301][0] > BC.chain_work[6][0]
+
+        # the same work doesn't take over the tip
+        rival = FakeBlock(303, 2)
+        rival.difficulty = 0x1D00FFFF
+        assert BC.add_headers([rival]) == []
+        assert BC.chain_work[303] == BC.chain_work[301]
+        assert BC.index_for_hash(303) is None
+
+        ops = BC.add_headers(FORK[1:])
+        assert ops == [("add", FORK[1], 4)]
+        assert BC.tuple_for_index(-1) == (302, 301, 0x1D00FFFF)
+
+    def test_lock_keeps_tip_on_tie(self):
+        ITEMS = [FakeBlock(i) for i in range(4)]
+        ITEMS[0] = FakeBlock(0, parent_for_0)
+        BC = BlockChain(parent_for_0)
+        BC.add_headers(ITEMS)
+        BC.add_headers([FakeBlock(100, 3), FakeBlock(101, 100)])
+        assert BC.add_headers([FakeBlock(200, 3), FakeBlock(201, 200)]) == []
+        assert longest_block_chain(BC) == [0, 1, 2, 3, 100, 101]
+
+        BC.lock_to_index(2)
+        assert BC.locked_length() == 2
+        assert longest_block_chain(BC) == [0, 1, 2, 3, 100, 101]
+        assert BC.index_for_hash(101) == 5
+        assert BC.index_for_hash(201) is None
+        ops = BC.add_headers([FakeBlock(102, 101)])
+        assert [(op[0], op[2]) for op in ops] == [("add", 6)]
+        assert BC.hash_for_index(-1) == 102
+
     def test_callback(self):
         R = []
 
@@ -1,6 +1,7 @@
 import unittest
 
 from pycoin.encoding.hexbytes import h2b
+from pycoin.key.BIP32Node import BIP32Node, PublicPrivateMismatchError
 from pycoin.symbols.btc import network as BTC
 from pycoin.symbols.xtn import network as XTN
 
@@ -303,6 +304,78 @@ class Bip0032TestCase(unittest.TestCase):
         self.assertRaises(ValueError, list, my_prv.subkeys("-1"))
         self.assertRaises(ValueError, list, my_prv.subkeys("-1-0"))
 
+    def test_subkeys_range(self):
+        my_prv = BTC.keys.bip32_seed(b"foo")
+        my_pub = my_prv.public_copy()
+        for key in (my_prv, my_pub):
+            as_private = key.is_private()
+            subkeys = key.subkeys_range(5, 20)
+            self.assertEqual(
+                [k.hwif(as_private=as_private) for k in subkeys],
+                [key.subkey(i).hwif(as_private=as_private) for i in range(5, 25)],
+            )
+            self.assertEqual(
+                key.subkeys_range(5, 20, as_hash160=True),
+                [k.hash160() for k in subkeys],
+            )
+            self.assertEqual(
+                key.subkeys_range(0x7FFFFFFF, 1)[0].child_index(), 0x7FFFFFFF
+            )
+            self.assertEqual(key.subkeys_range(3, 0), [])
+            self.assertRaises(ValueError, key.subkeys_range, -1, 2)
+            self.assertRaises(ValueError, key.subkeys_range, 0x7FFFFFFF, 2)
+
+        hardened = my_prv.subkeys_range(0, 3, hardened=True)
+        self.assertEqual(
+            [k.hwif(as_private=True) for k in hardened],
+            [
+                my_prv.subkey(i, is_hardened=True).hwif(as_private=True)
+                for i in range(3)
+            ],
+        )
+        self.assertRaises(
+            PublicPrivateMismatchError, my_pub.subkeys_range, 0, 3, hardened=True
+        )
+
+    def test_subkey_cache(self):
+        my_prv = BTC.keys.bip32_seed(b"foo")
+        my_prv.set_subkey_cache_size(3)
+        subkeys = [my_prv.subkey(i) for i in range(4)]
+        self.assertIs(my_prv.subkey(3), subkeys[3])
+        self.assertIs(my_prv.subkey(1), subkeys[1])
+        # 0 was the least recently used, so it was dropped
+        self.assertIsNot(my_prv.subkey(0), subkeys[0])
+        self.assertEqual(my_prv.subkey(0).hwif(), subkeys[0].hwif())
+        stats = my_prv.subkey_cache_stats()
+        self.assertEqual(
+            (stats["hits"], stats["misses"], stats["size"], stats["max_size"]),
+            (3, 5, 3, 3),
+        )
+        self.assertGreater(stats["bytes"], 0)
+
+        # turned off, for a node and for new nodes
+        my_prv.set_subkey_cache_size(0)
+        self.assertEqual(my_prv.subkey_cache_stats()["size"], 0)
+        self.assertEqual(my_prv.subkey_cache_stats()["bytes"], 0)
+        self.assertIsNot(my_prv.subkey(0), my_prv.subkey(0))
+        old_size = BIP32Node.subkey_cache_size
+        BIP32Node.subkey_cache_size = 0
+        try:
+            key = BTC.keys.bip32_seed(b"bar")
+            self.assertIsNot(key.subkey(0), key.subkey(0))
+            self.assertEqual(key.subkey_cache_stats()["misses"], 0)
+        finally:
+            BIP32Node.subkey_cache_size = old_size
+
+        # paths with a common prefix share the nodes along it
+        key = BTC.keys.bip32_seed(b"bar")
+        account = key.subkey_for_path("84H/0H/0H/0")
+        key.subkey_for_path("84H/0H/0H/0/5")
+        key.subkey_for_path("84H/0H/0H/0/6")
+        self.assertEqual(key.subkey_cache_stats()["misses"], 1)
+        self.assertEqual(key.subkey_cache_stats()["hits"], 2)
+        self.assertEqual(account.subkey_cache_stats()["misses"], 2)
+
     def test_repr(self):
         key = XTN.keys.private(secret_exponent=273)
         wallet = XTN.keys.bip32_seed(bytes(key.wif().encode("utf8")))
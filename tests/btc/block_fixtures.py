@@ -0,0 +1,122 @@
+"""
+Blocks built from the transactions in data/tx_valid.json, for the
+BlockValidator tests and benchmark.
+
+Transactions are grouped by their verification flags and packed into blocks
+that don't spend the same outpoint twice, each with a coinbase (and witness
+commitment when needed) and a header mined at regtest difficulty.
+"""
+
+import json
+import os
+
+from pycoin.block import target_for_bits
+from pycoin.coins.bitcoin.BlockValidator import WITNESS_COMMITMENT_HEADER, block_subsidy
+from pycoin.encoding.hash import double_sha256
+from pycoin.encoding.hexbytes import h2b_rev
+from pycoin.merkle import merkle
+from pycoin.symbols.btc import network
+
+
+TX_VALID_JSON = os.path.join(os.path.dirname(__file__), "data", "tx_valid.json")
+
+REGTEST_BITS = 0x207FFFFF
+
+ZERO32 = b"\0" * 32
+
+
+def parse_flags(flag_string):
+    v = 0
+    for f in flag_string.split(","):
+        if f != "NONE":
+            v |= getattr(network.validator.flags, "VERIFY_%s" % f)
+    return v
+
+
+def tx_vectors(path=TX_VALID_JSON):
+    """
+    Yield (tx, flags, utxos) for each transaction, where utxos maps the
+    outpoints it spends to a TxOut. Prevouts without an amount get the total
+    output value, so every transaction pays a fee of at least zero.
+    """
+    with open(path) as f:
+        for tvec in json.load(f):
+            if len(tvec) != 3:
+                continue
+            prevouts, tx_hex, flag_string = tvec
+            tx = network.tx.from_hex(tx_hex)
+            if tx.is_coinbase():
+                continue
+            utxos = {}
+            for prevout in prevouts:
+                coin_value = prevout[3] if len(prevout) == 4 else tx.total_out()
+                script = network.script.compile(prevout[2])
+                utxos[(h2b_rev(prevout[0]), prevout[1])] = network.tx.TxOut(
+                    coin_value, script
+                )
+            if any(
+                (tx_in.previous_hash, tx_in.previous_index) not in utxos
+                for tx_in in tx.txs_in
+            ):
+                continue
+            if sum(u.coin_value for u in utxos.values()) < tx.total_out():
+                continue
+            yield tx, parse_flags(flag_string), utxos
+
+
+def make_block(txs, fees, block_index=0):
+    """Add a coinbase to txs, and mine a block for them."""
+    coinbase = network.tx.coinbase_tx(
+        b"\2" * 33, block_subsidy(0) + fees, b"\0\0" + block_index.to_bytes(4, "little")
+    )
+    if any(tx.has_witness_data() for tx in txs):
+        coinbase.txs_in[0].witness = [ZERO32]
+        w_hashes = [ZERO32] + [tx.w_hash() for tx in txs]
+        commitment = double_sha256(merkle(w_hashes, double_sha256) + ZERO32)
+        coinbase.txs_out.append(
+            network.tx.TxOut(0, WITNESS_COMMITMENT_HEADER + commitment)
+        )
+    txs = [coinbase] + txs
+    merkle_root = merkle([tx.hash() for tx in txs], double_sha256)
+    target = target_for_bits(REGTEST_BITS)
+    nonce = 0
+    while True:
+        block = network.block(1, ZERO32, merkle_root, 0, REGTEST_BITS, nonce)
+        if int.from_bytes(block.hash(), "little") <= target:
+            break
+        nonce += 1
+    block.set_txs(txs)
+    return block
+
+
+def make_blocks(path=TX_VALID_JSON):
+    """
+    Return a list of (block, flags, utxo_dict) built from the transaction
+    test vectors.
+    """
+    groups = {}
+    for tx, flags, utxos in tx_vectors(path):
+        for group in groups.setdefault(flags, []):
+            if not (group["utxos"].keys() & utxos.keys()) and (
+                tx.hash() not in group["hashes"]
+            ):
+                break
+        else:
+            group = dict(txs=[], utxos={}, hashes=set(), fees=0)
+            groups[flags].append(group)
+        group["txs"].append(tx)
+        group["utxos"].update(utxos)
+        group["hashes"].add(tx.hash())
+        group["fees"] += (
+            sum(
+                utxos[(tx_in.previous_hash, tx_in.previous_index)].coin_value
+                for tx_in in tx.txs_in
+            )
+            - tx.total_out()
+        )
+    blocks = []
+    for flags, group_list in sorted(groups.items()):
+        for group in group_list:
+            block = make_block(group["txs"], group["fees"], len(blocks))
+            blocks.append((block, flags, group["utxos"]))
+    return blocks
@@ -0,0 +1,61 @@
+"""
+Measure BlockValidator throughput on blocks built from the transactions in
+data/tx_valid.json.
+
+    python -m tests.btc.block_validator_benchmark [--workers N] [--rounds N]
+
+The blocks are made by :func:`block_fixtures.make_blocks`.
+"""
+
+import argparse
+import concurrent.futures
+import time
+
+from pycoin.coins.bitcoin.BlockValidator import BlockValidator, DictUTXOProvider
+
+from .block_fixtures import make_blocks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark BlockValidator.")
+    parser.add_argument(
+        "--workers", type=int, default=0, help="check scripts in N processes"
+    )
+    parser.add_argument("--rounds", type=int, default=5, help="times to validate")
+    args = parser.parse_args()
+
+    blocks = make_blocks()
+    tx_count = sum(len(block.txs) for block, _, _ in blocks)
+    tx_in_count = sum(len(tx.txs_in) for block, _, _ in blocks for tx in block.txs)
+    executor = None
+    if args.workers:
+        executor = concurrent.futures.ProcessPoolExecutor(args.workers)
+    try:
+        start = time.time()
+        for _ in range(args.rounds):
+            for block, flags, utxos in blocks:
+                validator = BlockValidator(
+                    DictUTXOProvider(utxos), flags=flags, executor=executor
+                )
+                validator.validate(block, 0)
+        elapsed = time.time() - start
+    finally:
+        if executor:
+            executor.shutdown()
+    count = args.rounds * len(blocks)
+    print(
+        "%d blocks (%d txs, %d inputs) in %.3fs: %.1f blocks/s, %.0f txs/s, %.0f inputs/s"
+        % (
+            count,
+            args.rounds * tx_count,
+            args.rounds * tx_in_count,
+            elapsed,
+            count / elapsed,
+            args.rounds * tx_count / elapsed,
+            args.rounds * tx_in_count / elapsed,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+import concurrent.futures
+import unittest
+
+from pycoin.coins.bitcoin.BlockValidator import (
+    BIP30_EXCEPTIONS,
+    BIP34_HEIGHT,
+    BIP34_IMPLIES_BIP30_LIMIT,
+    BlockValidator,
+    DictUTXOProvider,
+)
+from pycoin.coins.exceptions import BlockValidationError
+from pycoin.merkle import merkle
+from pycoin.symbols.btc import network
+
+from .block_fixtures import make_block, make_blocks, tx_vectors
+
+
+P2SH = network.validator.flags.VERIFY_P2SH
+WITNESS = network.validator.flags.VERIFY_WITNESS
+
+
+def vectors_for_flags(flags, count):
+    """Return (txs, utxos, fees) for count vectors with the flags that don't conflict."""
+    txs = []
+    utxos = {}
+    fees = 0
+    for tx, tx_flags, tx_utxos in tx_vectors():
+        if tx_flags != flags or utxos.keys() & tx_utxos.keys():
+            continue
+        if any(tx.hash() == t.hash() for t in txs):
+            continue
+        txs.append(tx)
+        utxos.update(tx_utxos)
+        fees += sum(u.coin_value for u in tx_utxos.values()) - tx.total_out()
+        if len(txs) == count:
+            break
+    return txs, utxos, fees
+
+
+class BlockValidatorTest(unittest.TestCase):
+    def assertFails(self, validator, block, message, tx_index=None, tx_in_index=None):
+        with self.assertRaises(BlockValidationError) as cm:
+            validator.validate(block, 0)
+        self.assertTrue(cm.exception.args[0].startswith(message), str(cm.exception))
+        self.assertEqual(
+            (cm.exception.tx_index, cm.exception.tx_in_index), (tx_index, tx_in_index)
+        )
+
+    def test_vectors(self):
+        blocks = make_blocks()
+        self.assertTrue(len(blocks) > 10)
+        for block, flags, utxos in blocks:
+            validator = BlockValidator(DictUTXOProvider(utxos), flags=flags)
+            fees = validator.validate(block, 0)
+            self.assertEqual(fees, block.txs[0].total_out() - 50 * 100000000)
+
+    def test_structure(self):
+        txs, utxos, fees = vectors_for_flags(P2SH | WITNESS, 3)
+        self.assertTrue(any(tx.has_witness_data() for tx in txs))
+        validator = BlockValidator(DictUTXOProvider(utxos), flags=P2SH | WITNESS)
+        block = make_block(txs, fees)
+        validator.validate(block, 0)
+
+        nonce = block.nonce
+        while True:
+            nonce += 1
+            block.set_nonce(nonce)
+            if block.hash()[-1] & 0x80:
+                break
+        self.assertFails(validator, block, "proof of work")
+        validator.check_pow = False
+        validator.validate(block, 0)
+
+        block.merkle_root = b"\0" * 32
+        self.assertFails(validator, block, "bad merkle root")
+
+        block = make_block([network.tx.from_bin(tx.as_bin()) for tx in txs], fees)
+        block.txs[2].txs_out = []
+        self.assertFails(validator, block, "txs_out = []", 2)
+
+        block = make_block(txs, fees)
+        block.txs.append(block.txs[1])
+        self.assertFails(validator, block, "duplicate transaction", 4)
+
+        block = make_block(txs + [txs[0]], fees)
+        block.txs[1], block.txs[0] = block.txs[0], block.txs[1]
+        self.assertFails(validator, block, "first transaction is not a coinbase", 0)
+
+    def test_witness_commitment(self):
+        txs, utxos, fees = vectors_for_flags(P2SH | WITNESS, 3)
+        validator = BlockValidator(
+            DictUTXOProvider(utxos), flags=P2SH | WITNESS, check_pow=False
+        )
+        block = make_block(txs, fees)
+        coinbase = block.txs[0]
+        coinbase.txs_out[-1].script = coinbase.txs_out[-1].script[:-1] + b"\0"
+        block.merkle_root = merkle(block.tx_hashes())
+        self.assertFails(validator, block, "bad witness commitment", 0)
+
+        coinbase.txs_out.pop()
+        block.merkle_root = merkle(block.tx_hashes())
+        tx_index = min(i for i, tx in enumerate(block.txs) if tx.has_witness_data())
+        self.assertFails(
+            validator, block, "witness data without a witness commitment", tx_index
+        )
+
+    def test_inputs(self):
+        txs, utxos, fees = vectors_for_flags(P2SH, 4)
+        block = make_block(txs, fees)
+        validator = BlockValidator(DictUTXOProvider(utxos), flags=P2SH)
+        validator.validate(block, 0)
+
+        # the subsidy halves
+        validator.validate(block, 209999)
+        with self.assertRaises(BlockValidationError) as cm:
+            validator.validate(block, 210000)
+        self.assertEqual(cm.exception.args[0], "coinbase pays too much")
+
+        tx_in = txs[2].txs_in[0]
+        outpoint = (tx_in.previous_hash, tx_in.previous_index)
+        missing = dict(utxos)
+        del missing[outpoint]
+        self.assertFails(
+            BlockValidator(DictUTXOProvider(missing), flags=P2SH),
+            block,
+            "input spends a missing or spent output",
+            3,
+            0,
+        )
+
+        low_value = dict(utxos)
+        for tx_in in txs[3].txs_in:
+            low_outpoint = (tx_in.previous_hash, tx_in.previous_index)
+            low_value[low_outpoint] = network.tx.TxOut(0, utxos[low_outpoint].script)
+        self.assertFails(
+            BlockValidator(DictUTXOProvider(low_value), flags=P2SH),
+            block,
+            "outputs exceed inputs",
+            4,
+        )
+
+        existing = dict(utxos)
+        existing[(txs[1].hash(), 0)] = network.tx.TxOut(1, b"")
+        self.assertFails(
+            BlockValidator(DictUTXOProvider(existing), flags=P2SH),
+            block,
+            "transaction overwrites an unspent output",
+            2,
+        )
+
+    def test_bip30(self):
+        txs, utxos, fees = vectors_for_flags(P2SH, 4)
+        block = make_block(txs, fees)
+        existing = dict(utxos)
+        existing[(txs[1].hash(), 0)] = network.tx.TxOut(1, b"")
+
+        class CountingProvider(DictUTXOProvider):
+            calls = 0
+
+            def get_utxos(self, outpoints):
+                self.calls += 1
+                return super(CountingProvider, self).get_utxos(outpoints)
+
+        provider = CountingProvider(existing)
+        validator = BlockValidator(provider, flags=P2SH, check_pow=False)
+
+        def overwrites(height):
+            # at these heights the coinbase may pay more than the subsidy
+            try:
+                validator.check_inputs(block, height)
+            except BlockValidationError as ex:
+                return ex.args[0] == "transaction overwrites an unspent output"
+            return False
+
+        # the outputs created are looked up with the ones spent
+        self.assertTrue(overwrites(91842))
+        self.assertEqual(provider.calls, 1)
+        # BIP34 implies BIP30 for a while
+        self.assertTrue(overwrites(BIP34_HEIGHT - 1))
+        self.assertFalse(overwrites(BIP34_HEIGHT))
+        self.assertFalse(overwrites(BIP34_IMPLIES_BIP30_LIMIT - 1))
+        self.assertTrue(overwrites(BIP34_IMPLIES_BIP30_LIMIT))
+        validator.bip34_height = None
+        self.assertTrue(overwrites(BIP34_HEIGHT))
+
+        # the exceptions are by height and hash
+        self.assertEqual(sorted(BIP30_EXCEPTIONS), [91842, 91880])
+        validator.bip30_exceptions = {91842: block.hash()}
+        self.assertFalse(overwrites(91842))
+        self.assertTrue(overwrites(91880))
+
+        # a second tx spending the same outpoint
+        double_spend = network.tx.from_bin(txs[2].as_bin())
+        double_spend.lock_time += 1
+        block = make_block(txs + [double_spend], fees)
+        self.assertFails(validator, block, "input spent twice in block", 5, 0)
+
+    def test_first_script_failure(self):
+        txs, utxos, fees = vectors_for_flags(P2SH, 6)
+        block = make_block(txs, fees)
+        bad_utxos = dict(utxos)
+        for tx in (txs[4], txs[2]):
+            tx_in = tx.txs_in[-1]
+            outpoint = (tx_in.previous_hash, tx_in.previous_index)
+            bad_utxos[outpoint] = network.tx.TxOut(
+                utxos[outpoint].coin_value, network.script.compile("OP_0")
+            )
+        tx_index, tx_in_index = 3, len(txs[2].txs_in) - 1
+        self.assertFails(
+            BlockValidator(DictUTXOProvider(bad_utxos), flags=P2SH),
+            block,
+            "",
+            tx_index,
+            tx_in_index,
+        )
+        for executor_class in (
+            concurrent.futures.ThreadPoolExecutor,
+            concurrent.futures.ProcessPoolExecutor,
+        ):
+            with executor_class(2) as executor:
+                validator = BlockValidator(
+                    DictUTXOProvider(bad_utxos),
+                    flags=P2SH,
+                    executor=executor,
+                    script_jobs=6,
+                )
+                self.assertFails(validator, block, "", tx_index, tx_in_index)
+                validator.utxo_provider = DictUTXOProvider(utxos)
+                validator.validate(block, 0)
@@ -1,11 +1,27 @@
 import io
 import unittest
 
+from pycoin.block import BadMerkleRootError, LazyTxList
+from pycoin.encoding.hash import double_sha256
 from pycoin.encoding.hexbytes import b2h_rev, h2b
+from pycoin.merkle import merkle
 from pycoin.symbols.btc import network
 
 Block = network.block
 
+SEGWIT_TX_HEX = (
+    "01000000000102fff7f7881a8099afa6940d42d1e7f6362bec38171ea3edf433541db4"
+    "e4ad969f00000000494830450221008b9d1dc26ba6a9cb62127b02742fa9d754cd3beb"
+    "f337f7a55d114c8e5cdd30be022040529b194ba3f9281a99f2b1c0a19c0489bc22ede9"
+    "44ccf4ecbab4cc618ef3ed01eeffffffef51e1b804cc89d182d279655c3aa89e815b1b"
+    "309fe287d9b2b55d57b90ec68a0100000000ffffffff02202cb206000000001976a914"
+    "8280b37df378db99f66f85c95a783a76ac7a6d5988ac9093510d000000001976a9143b"
+    "de42dbee7e4dbe6a21b2d50ce2f0167faa815988ac000247304402203609e17b84f6a7"
+    "d30c80bfa610b5b4542f32a8a0d5447a12fb1366d7f01cc44a0220573a954c45183315"
+    "61406f90300e8f3358f51928d43c212a8caed02de67eebee0121025476c2e83188368d"
+    "a1ff3e292e7acafcdb3566bb0ad253f62fc70f07aeee635711000000"
+)
+
 
 class BlockTest(unittest.TestCase):
     def test_block(self):
@@ -46,3 +62,68 @@ class BlockTest(unittest.TestCase):
         # parse already validated block
         block = Block.parse(io.BytesIO(block_data), check_merkle_hash=False)
         assert block.as_bin() == block_data
+
+        # parse from the middle of a buffer
+        buf = b"\0" * 8 + block_data + b"\0" * 8
+        block, end = Block.from_buffer(buf, 8, include_offsets=True)
+        assert end == 8 + len(block_data)
+        assert block.as_bin() == block_data
+        f = io.BytesIO(block_data)
+        block_from_file = Block.parse(f, include_offsets=True)
+        assert f.tell() == len(block_data)
+        offsets = [tx.offset_in_block for tx in block.txs]
+        assert offsets == [tx.offset_in_block for tx in block_from_file.txs]
+        assert offsets[0] == 81
+        for tx, offset in zip(block.txs, offsets):
+            assert Block.Tx.from_bin(block_data[offset:]).id() == tx.id()
+
+    def test_lazy(self):
+        coinbase = Block.Tx.coinbase_tx(b"\2" * 33, 5000000000, b"\0\0")
+        segwit_tx = Block.Tx.from_hex(SEGWIT_TX_HEX)
+        txs = [coinbase, segwit_tx, coinbase]
+        merkle_root = merkle([tx.hash() for tx in txs], double_sha256)
+        block = Block(1, b"\0" * 32, merkle_root, 0, 0, 0)
+        block.set_txs(txs)
+        block_data = block.as_bin()
+
+        lazy_block, end = Block.from_buffer(
+            b"junk" + block_data, 4, include_offsets=True, lazy=True
+        )
+        self.assertEqual(end, 4 + len(block_data))
+        lazy_txs = lazy_block.txs
+        self.assertIsInstance(lazy_txs, LazyTxList)
+        self.assertEqual(len(lazy_txs), 3)
+        # the merkle check only needs the hashes
+        self.assertFalse(any(lazy_txs.is_parsed(i) for i in range(3)))
+        self.assertEqual(lazy_block.tx_hashes(), [tx.hash() for tx in txs])
+        spans = lazy_txs.spans()
+        self.assertEqual(spans[0][0], 81)
+        for (offset, length), tx in zip(spans, txs):
+            self.assertEqual(block_data[offset : offset + length], tx.as_bin())
+        self.assertEqual(lazy_txs.tx_bin(1), segwit_tx.as_bin())
+        self.assertEqual(lazy_block.as_bin(), block_data)
+
+        tx = lazy_txs[1]
+        self.assertTrue(lazy_txs.is_parsed(1))
+        self.assertIs(lazy_txs[1], tx)
+        self.assertIs(tx.block, lazy_block)
+        self.assertEqual(tx.offset_in_block, spans[1][0])
+        self.assertEqual(tx.w_id(), segwit_tx.w_id())
+        self.assertEqual([t.id() for t in lazy_txs[::2]], [coinbase.id()] * 2)
+
+        # changes to parsed transactions are streamed
+        tx.lock_time = 1
+        self.assertNotEqual(lazy_block.as_bin(), block_data)
+        reparsed_block = Block.parse(
+            io.BytesIO(lazy_block.as_bin()), check_merkle_hash=False
+        )
+        self.assertEqual(reparsed_block.txs[1].lock_time, 1)
+        self.assertRaises(BadMerkleRootError, lazy_block.check_merkle_hash)
+
+        bad_header = Block(1, b"\0" * 32, b"\1" * 32, 0, 0, 0).as_bin()
+        self.assertRaises(
+            BadMerkleRootError,
+            Block.from_buffer,
+            bad_header + block_data[80:],
+            lazy=True,
+        )
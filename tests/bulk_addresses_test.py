@@ -0,0 +1,83 @@
+import io
+import json
+import unittest
+
+from pycoin.encoding.hexbytes import b2h
+from pycoin.key.BIP32Node import PublicPrivateMismatchError
+from pycoin.key.subpaths import subpaths_for_path_range
+from pycoin.symbols.btc import network
+from pycoin.symbols.doge import network as DOGE
+from pycoin.tools.bulk_addresses import FIELDS, bulk_rows, rows_for_paths, write_rows
+
+
+def expected_row(key, path):
+    subkey = key.subkey_for_path(path)
+    h160 = subkey.hash160()
+    return (
+        path,
+        b2h(subkey.sec()),
+        b2h(h160),
+        subkey.address(),
+        network.address.for_p2s(network.contract.for_p2pkh_wit(h160)),
+        network.address.for_p2pkh_wit(h160),
+    )
+
+
+class BulkAddressesTest(unittest.TestCase):
+    def test_rows_for_paths(self):
+        key = network.keys.bip32_seed(b"foo")
+        paths = list(subpaths_for_path_range("0-1/0-4,7H,9")) + ["3", "", "2/4"]
+        self.assertEqual(
+            rows_for_paths(key, paths), [expected_row(key, path) for path in paths]
+        )
+        self.assertEqual(
+            rows_for_paths(
+                key.public_copy(), ["1/2", "1/3"], ["address", "subkey_path"]
+            ),
+            [(key.subkey_for_path(p).address(), p) for p in ("1/2", "1/3")],
+        )
+        self.assertRaises(
+            PublicPrivateMismatchError, rows_for_paths, key.public_copy(), ["0/1H"]
+        )
+
+        # no segwit on this network
+        doge_key = DOGE.keys.bip32_seed(b"foo")
+        row = rows_for_paths(doge_key, ["0/1"])[0]
+        self.assertEqual(row[3], doge_key.subkey_for_path("0/1").address())
+        self.assertEqual(row[4:], (None, None))
+
+    def test_bulk_rows(self):
+        key = network.keys.bip32_seed(b"foo")
+        expected = [expected_row(key, p) for p in subpaths_for_path_range("0-1/0-9")]
+        self.assertEqual(list(bulk_rows(key, "0-1/0-9", max_workers=1)), expected)
+        self.assertEqual(
+            list(bulk_rows(key.public_copy(), "0-1/0-9", max_workers=2, chunk_size=3)),
+            expected,
+        )
+        self.assertEqual(
+            list(bulk_rows(key, "1H/0-2", max_workers=2, chunk_size=2)),
+            [expected_row(key, p) for p in subpaths_for_path_range("1H/0-2")],
+        )
+        self.assertRaises(ValueError, list, bulk_rows(key, "0", ["wif"]))
+
+    def test_write_rows(self):
+        rows = [("0/1", "1abc", None), ("0/2", "1def", "3xyz")]
+        fields = ("subkey_path", "address", "p2sh_segwit")
+        f = io.StringIO()
+        write_rows(rows, f, fields)
+        self.assertEqual(
+            [json.loads(line) for line in f.getvalue().splitlines()],
+            [dict(zip(fields, row)) for row in rows],
+        )
+        f = io.StringIO()
+        write_rows(rows, f, fields, "csv")
+        self.assertEqual(
+            f.getvalue(),
+            "subkey_path,address,p2sh_segwit\n0/1,1abc,\n0/2,1def,3xyz\n",
+        )
+        self.assertRaises(ValueError, write_rows, rows, f, fields, "xml")
+        self.assertEqual(len(FIELDS), 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
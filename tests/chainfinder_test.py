@@ -198,3 +198,42 @@ class ChainFinderTestCase(unittest.TestCase):
         cf = ChainFinder()
         load_items(cf, ITEMS)
         old_subpath, new_subpath = cf.find_ancestral_path(5000, 9000)
+
+    def test_load_nodes_returns_new(self):
+        cf = ChainFinder()
+        assert load_items(cf, [BHO(0), BHO(1)]) == [(0, -1), (1, 0)]
+        assert load_items(cf, [BHO(1), BHO(2), BHO(2)]) == [(2, 1)]
+        assert dict(cf.parent_lookup) == {0: -1, 1: 0, 2: 1}
+        assert len(cf.parent_lookup) == 3
+
+    def test_prune(self):
+        # 0 <= 1 <= 2 <= 3 <= 4, 2 <= 201 <= 202, 0 <= 101, and 302 <= 303
+        ITEMS = [BHO(i) for i in range(5)]
+        ITEMS += [BHO(201, 2), BHO(202), BHO(101, 0), BHO(303, 302)]
+        cf = ChainFinder()
+        load_items(cf, ITEMS)
+
+        cf.prune([0, 1])
+        assert cf.trees_from_bottom == {
+            4: [4, 3, 2, 1],
+            202: [202, 201, 2, 1],
+            101: [101, 0],
+            303: [303, 302],
+        }
+        assert cf.descendents_by_top == {1: {4, 202}, 0: {101}, 302: {303}}
+        assert set(cf.parent_lookup) == {2, 3, 4, 201, 202, 101, 303}
+
+        cf.prune([2])
+        assert cf.trees_from_bottom == {
+            4: [4, 3, 2],
+            202: [202, 201, 2],
+            101: [101, 0],
+            303: [303, 302],
+        }
+        assert cf.descendents_by_top == {2: {4, 202}, 0: {101}, 302: {303}}
+
+        # pruned hashes can come back
+        load_items(cf, [BHO(5), BHO(1)])
+        assert cf.trees_from_bottom[5] == [5, 4, 3, 2]
+        assert cf.trees_from_bottom[1] == [1, 0]
+        assert cf.descendents_by_top == {2: {5, 202}, 0: {101, 1}, 302: {303}}
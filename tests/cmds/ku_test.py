@@ -1,4 +1,7 @@
+import io
+import json
 import unittest
+from unittest import mock
 
 from pycoin.cmds import ku
 from pycoin.networks.registry import network_for_netcode
@@ -22,6 +25,52 @@ def make_tests_for_netcode(netcode):
             bip32_as_text = bip32.hwif(as_private=True)
             self.assertEqual(output[0], bip32_as_text)
 
+        def test_ku_bulk(self):
+            output = self.launch_tool(
+                "ku --bulk --workers 1 -s 0/0-2 -n %s P:foo" % netcode
+            ).splitlines()
+            self.assertEqual(len(output), 3)
+            for idx, line in enumerate(output):
+                row = json.loads(line)
+                self.assertEqual(row["subkey_path"], "0/%d" % idx)
+                address = self.launch_tool(
+                    "ku -a -s 0/%d -n %s P:foo" % (idx, netcode)
+                ).strip()
+                self.assertEqual(row["address"], address)
+
+            output = self.launch_tool(
+                "ku --bulk --bulk-format csv --workers 1 -b subkey_path hash160"
+                " -s 1-2 -n %s P:foo" % netcode
+            ).splitlines()
+            self.assertEqual(output[0], "subkey_path,hash160")
+            self.assertEqual([line.split(",")[0] for line in output[1:]], ["1", "2"])
+
+        def test_ku_stream(self):
+            keys = [network.keys.private(secret_exponent=i) for i in range(1, 6)]
+            stdin = io.StringIO(
+                "%s %s\n%s\nnotakey\n%s %s\n" % tuple(k.wif() for k in keys)
+            )
+            with mock.patch("sys.stdin", stdin):
+                output = self.launch_tool(
+                    "ku --stream --workers 1 -b input address -n %s" % netcode
+                ).splitlines()
+            self.assertEqual(
+                [json.loads(line) for line in output],
+                [dict(input=k.wif(), address=k.address()) for k in keys],
+            )
+
+            output = self.launch_tool(
+                "ku --stream --workers 1 -P -s 0-1 -n %s P:foo" % netcode
+            ).splitlines()
+            self.assertEqual(len(output), 2)
+            for idx, line in enumerate(output):
+                row = json.loads(line)
+                wallet_key = self.launch_tool(
+                    "ku -w -P -s %d -n %s P:foo" % (idx, netcode)
+                ).strip()
+                self.assertEqual(row["wallet_key"], wallet_key)
+                self.assertEqual(row["private_key"], "no")
+
     return KuTest
 
 
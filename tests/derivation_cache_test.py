@@ -0,0 +1,156 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from pycoin.key.BIP32Node import BIP32Node
+from pycoin.key.DerivationCache import DerivationCache, DerivationCacheError
+from pycoin.key.subpaths import subpaths_for_path_range
+from pycoin.symbols.btc import network
+from pycoin.wallet.SQLite3Persistence import SQLite3Persistence
+
+
+PATHS = list(subpaths_for_path_range("0-1/0-4"))
+
+
+class DerivationCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.prv = network.keys.bip32_seed(b"foo")
+        self.xpub = self.prv.public_copy()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "derivations.db")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def open_cache(self):
+        return DerivationCache(sqlite3.connect(self.path))
+
+    def test_bip32_node(self):
+        expected = [self.xpub.subkey_for_path(path).hwif() for path in PATHS]
+        cache = self.open_cache()
+        self.xpub.derivation_cache = cache
+        self.assertEqual([self.xpub.subkey_for_path(p).hwif() for p in PATHS], expected)
+        cache.commit()
+        self.assertEqual(cache.stats(), dict(hits=0, misses=10, corrupt=0))
+
+        # after a restart
+        xpub = network.parse.bip32(self.xpub.hwif())
+        xpub.derivation_cache = cache = self.open_cache()
+        subkeys = [xpub.subkey_for_path(path) for path in PATHS]
+        self.assertEqual([k.hwif() for k in subkeys], expected)
+        self.assertEqual(
+            [k.address() for k in subkeys],
+            [self.xpub.subkey_for_path(path).address() for path in PATHS],
+        )
+        self.assertEqual(cache.stats(), dict(hits=10, misses=0, corrupt=0))
+
+        # private keys come from the cache only if they're made public
+        self.prv.derivation_cache = cache
+        self.assertEqual(self.prv.subkey_for_path("1/3.pub").hwif(), expected[-2])
+        self.assertTrue(self.prv.subkey_for_path("1/3").is_private())
+        self.assertEqual(cache.hits, 11)
+        self.assertEqual(
+            cache.hash160_for_path(self.prv, "0H/1"),
+            cache.hash160_for_path(self.prv, "0'/1"),
+        )
+        self.assertEqual(
+            cache.hash160_for_path(self.prv, "0p/1"),
+            self.prv.subkey_for_path("0H/1").hash160(),
+        )
+
+    def test_global(self):
+        cache = DerivationCache()
+        BIP32Node.derivation_cache = cache
+        try:
+            self.xpub.subkey_for_path("3/4")
+            network.parse.bip32(self.xpub.hwif()).subkey_for_path("3/4")
+        finally:
+            BIP32Node.derivation_cache = None
+        self.assertEqual(cache.stats(), dict(hits=1, misses=1, corrupt=0))
+
+    def test_corrupt_rows(self):
+        cache = self.open_cache()
+        for path in PATHS:
+            cache.public_subkey_for_path(self.xpub, path)
+        cache.commit()
+        db = sqlite3.connect(self.path)
+        rows = db.execute(
+            "select path, node from DerivationCache order by path"
+        ).fetchall()
+        node = bytearray(rows[0][1])
+        node[50] ^= 1
+        db.execute(
+            "update DerivationCache set node = ? where path = ?",
+            (bytes(node), rows[0][0]),
+        )
+        # a row moved from another path
+        db.execute(
+            "update DerivationCache set node = ? where path = ?",
+            (rows[2][1], rows[1][0]),
+        )
+        db.execute(
+            "update DerivationCache set node = ? where path = ?", (b"short", rows[3][0])
+        )
+        db.commit()
+
+        cache = self.open_cache()
+        self.assertIsNone(cache.get(self.xpub, rows[0][0]))
+        self.assertEqual(cache.corrupt, 1)
+        for path in PATHS:
+            self.assertEqual(
+                cache.public_subkey_for_path(self.xpub, path).hwif(),
+                self.xpub.subkey_for_path(path).hwif(),
+            )
+        self.assertEqual(cache.corrupt, 4)
+        # the bad rows were replaced
+        cache.commit()
+        cache = self.open_cache()
+        for path in PATHS:
+            cache.public_subkey_for_path(self.xpub, path)
+        self.assertEqual(cache.stats(), dict(hits=10, misses=0, corrupt=0))
+
+        # another key's rows aren't found
+        other = network.keys.bip32_seed(b"bar").public_copy()
+        self.assertIsNone(cache.get(other, PATHS[0]))
+
+    def test_corrupt_database(self):
+        cache = self.open_cache()
+        cache.public_subkey_for_path(self.xpub, "0/1")
+        cache.commit()
+        with open(self.path, "r+b") as f:
+            f.write(b"\xff" * 100)
+        self.assertRaises(DerivationCacheError, self.open_cache)
+
+        os.unlink(self.path)
+        db = sqlite3.connect(self.path)
+        DerivationCache(db)
+        db.execute("update DerivationCacheMeta set value = 99")
+        db.commit()
+        self.assertRaises(DerivationCacheError, self.open_cache)
+
+    def test_keychain(self):
+        cache = self.open_cache()
+        keychain = network.keychain(derivation_cache=cache)
+        keychain.add_key_paths(self.prv, PATHS)
+        keychain.add_secrets([self.prv])
+        subkey = self.prv.subkey_for_path("1/2")
+        self.assertEqual(keychain.get(subkey.hash160())[0], subkey.secret_exponent())
+        cache.commit()
+
+        keychain = network.keychain(derivation_cache=self.open_cache())
+        keychain.add_keys_path([self.prv, self.xpub], "1/2")
+        self.assertEqual(keychain._derivation_cache.hits, 2)
+
+    def test_persistence(self):
+        db = sqlite3.connect(":memory:")
+        persistence = SQLite3Persistence(db, DerivationCache(db))
+        self.xpub.id = 1
+        address = persistence.add_bip32_path(self.xpub, "0/7")
+        self.assertEqual(address, self.xpub.subkey_for_path("0/7").address())
+        self.assertEqual(persistence.add_bip32_path(self.xpub, "0/7"), address)
+        self.assertEqual(persistence.derivation_cache.hits, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
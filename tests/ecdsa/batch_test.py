@@ -0,0 +1,38 @@
+import random
+import unittest
+
+from pycoin.ecdsa.batch import batch_inverse, multiply_batch
+from pycoin.ecdsa.secp256k1 import secp256k1_generator
+from pycoin.ecdsa.secp256r1 import secp256r1_generator
+
+
+class BatchTestCase(unittest.TestCase):
+    def test_batch_inverse(self):
+        self.assertEqual(batch_inverse([3, 5, 1, 22], 23), [8, 14, 1, 22])
+        self.assertEqual(batch_inverse([], 23), [])
+
+    def test_multiply_batch(self):
+        r = random.Random(1)
+        for generator in (secp256k1_generator, secp256r1_generator):
+            order = generator.order()
+            point = generator * r.randrange(1, order)
+            exponents = [r.randrange(order) for _ in range(10)] + [0, 1, order - 1]
+            self.assertEqual(
+                multiply_batch(generator, exponents),
+                [tuple(e * generator) if e else None for e in exponents],
+            )
+            self.assertEqual(
+                multiply_batch(generator, exponents, tuple(point)),
+                [tuple(e * generator + point) for e in exponents],
+            )
+            # sums that are doublings, or the point at infinity
+            e = r.randrange(1, order)
+            P = e * generator
+            self.assertEqual(
+                multiply_batch(generator, [e, order - e], tuple(P)),
+                [tuple(P + P), None],
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,238 @@
+import unittest
+
+from pycoin.block import bits_for_target, target_for_bits
+from pycoin.blockchain.BlockChain import BlockChain
+from pycoin.blockchain.HeaderValidator import HeaderValidator, first_early_timestamp
+from pycoin.blockchain.LockedHeaderChain import LockedHeaderChain, header_bytes_for
+from pycoin.coins.exceptions import HeaderValidationError
+from pycoin.symbols.btc import network
+
+from .utxo_store_test import ZERO32
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+POW_LIMIT_BITS = 0x207FFFFF
+INTERVAL = 8
+SPACING = 600
+HEADER_FIELDS = (
+    "version",
+    "previous_block_hash",
+    "merkle_root",
+    "timestamp",
+    "difficulty",
+    "nonce",
+)
+
+
+def mine(previous_block_hash, timestamp, bits, nonce=0):
+    target = target_for_bits(bits)
+    while True:
+        header = network.block(1, previous_block_hash, ZERO32, timestamp, bits, nonce)
+        if int.from_bytes(header.hash(), "little") <= target:
+            return header
+        nonce += 1
+
+
+def make_headers(count, previous=(), spacing=SPACING):
+    """Mine count headers that follow the rules, after the chain previous."""
+    validator = make_validator()
+    headers = list(previous)
+    for h in range(len(headers), len(headers) + count):
+        bits = POW_LIMIT_BITS
+        timestamp = 1500000000
+        if headers:
+            bits = headers[-1].difficulty
+            timestamp = headers[-1].timestamp + spacing
+        if h and h % INTERVAL == 0:
+            timespan = headers[-1].timestamp - headers[-INTERVAL].timestamp
+            bits = validator.next_bits(bits, timespan)
+        previous_hash = headers[-1].hash() if headers else ZERO32
+        headers.append(mine(previous_hash, timestamp, bits))
+    return headers[len(previous) :]
+
+
+def make_validator(**kwargs):
+    return HeaderValidator(
+        POW_LIMIT_BITS, INTERVAL, INTERVAL * SPACING, use_numpy=False, **kwargs
+    )
+
+
+class HeaderValidatorTest(unittest.TestCase):
+    def test_bits_for_target(self):
+        for bits in (0x1D00FFFF, 0x1B0404CB, 0x1715A35C, 0x207FFFFF, 0x03123456):
+            self.assertEqual(bits_for_target(target_for_bits(bits)), bits)
+        # the sign bit takes another byte
+        self.assertEqual(bits_for_target(0x80), 0x02008000)
+        self.assertEqual(bits_for_target(0), 0)
+
+    def test_next_bits(self):
+        # the first retarget on mainnet, at height 32256
+        validator = HeaderValidator()
+        self.assertEqual(
+            validator.next_bits(0x1D00FFFF, 1262152739 - 1261130161), 0x1D00D86A
+        )
+        # the target can't go past the limit, or change by more than 4x
+        self.assertEqual(validator.next_bits(0x1D00FFFF, 10**9), 0x1D00FFFF)
+        self.assertEqual(
+            validator.next_bits(0x1C00FFFF, 10**9), bits_for_target(0xFFFF << 202)
+        )
+        self.assertEqual(
+            validator.next_bits(0x1C00FFFF, 1), bits_for_target(0xFFFF << 198)
+        )
+
+    def test_first_early_timestamp(self):
+        prior = list(range(100, 111))
+        self.assertIsNone(first_early_timestamp(prior, [111, 107, 112]))
+        self.assertEqual(first_early_timestamp(prior, [111, 106, 112]), 1)
+        # fewer than 11 timestamps before it near genesis
+        self.assertEqual(first_early_timestamp([], [5, 6, 7, 6]), 3)
+        # windows with a timestamp that isn't known aren't checked
+        prior[-2] = None
+        self.assertIsNone(first_early_timestamp(prior, [1] * 10))
+        self.assertEqual(first_early_timestamp(prior, [1] * 11), 10)
+
+    @unittest.skipIf(numpy is None, "numpy is not installed")
+    def test_first_early_timestamp_numpy(self):
+        import random
+
+        r = random.Random(1)
+        for _ in range(20):
+            timestamps = [r.randrange(1000) + 10 * i for i in range(200)]
+            self.assertEqual(
+                first_early_timestamp(timestamps[:11], timestamps[11:]),
+                first_early_timestamp(timestamps[:11], timestamps[11:], False),
+            )
+
+    def test_check_headers(self):
+        headers = make_headers(30)
+        self.assertNotEqual(headers[8].difficulty, headers[7].difficulty)
+        make_validator().check_headers(headers, 0)
+        # the end of the chain, with its ancestors
+        make_validator().check_headers(
+            headers[20:], 20, lambda h: (headers[h].timestamp, headers[h].difficulty)
+        )
+
+        def check_fails(index, message, headers, **kwargs):
+            with self.assertRaises(HeaderValidationError) as cm:
+                make_validator(**kwargs).check_headers(headers, 0)
+            self.assertEqual(cm.exception.header_index, index)
+            self.assertIn(message, str(cm.exception))
+
+        # proof of work
+        bad = network.block(*(getattr(headers[5], a) for a in HEADER_FIELDS))
+        target = target_for_bits(bad.difficulty)
+        while int.from_bytes(bad.hash(), "little") <= target:
+            bad = network.block(
+                *(getattr(bad, a) for a in HEADER_FIELDS[:-1]), bad.nonce + 1
+            )
+        check_fails(5, "proof of work", headers[:5] + [bad])
+
+        # bits that change between retargets, or don't change at one
+        self.assertNotEqual(headers[11].difficulty, POW_LIMIT_BITS)
+        easy = mine(headers[11].hash(), headers[11].timestamp + SPACING, POW_LIMIT_BITS)
+        check_fails(12, "changed", headers[:12] + [easy])
+        lazy = mine(headers[15].hash(), headers[15].timestamp + SPACING, 0x200FFFFF)
+        check_fails(16, "retarget", headers[:16] + [lazy])
+        check_fails(8, "changed", headers[:9], no_retargeting=True)
+
+        # a timestamp that's not after the median time past
+        early = mine(headers[19].hash(), headers[14].timestamp, headers[19].difficulty)
+        check_fails(20, "median time past", headers[:20] + [early])
+
+        # checkpoints are checked, and headers up to the last one aren't
+        check_fails(3, "checkpoint", headers, checkpoints={3: headers[4].hash()})
+        make_validator(checkpoints={20: early.hash()}).check_headers(
+            headers[:20] + [early], 0
+        )
+        check_fails(
+            20,
+            "median time past",
+            headers[:20] + [early],
+            checkpoints={19: headers[19].hash()},
+        )
+
+    def test_block_chain(self):
+        headers = make_headers(40)
+        fork = make_headers(12, headers[:20], spacing=60)
+        block_chain = BlockChain(ZERO32, {}, header_validator=make_validator())
+        ops = block_chain.add_headers(headers[:12])
+        self.assertEqual(len(ops), 12)
+
+        # a batch with a bad header isn't added at all
+        early = mine(headers[19].hash(), headers[14].timestamp, headers[19].difficulty)
+        with self.assertRaises(HeaderValidationError) as cm:
+            block_chain.add_headers(headers[10:20] + [early])
+        self.assertEqual(cm.exception.header_index, 10)
+        self.assertEqual(block_chain.length(), 12)
+        with self.assertRaises(HeaderValidationError) as cm:
+            block_chain.add_headers(headers[13:20])
+        self.assertIn("connect", str(cm.exception))
+
+        # known headers, new ones and a fork, in one batch
+        ops = block_chain.add_headers(headers[10:25] + fork[:4])
+        self.assertEqual(len(ops), 13)
+        self.assertEqual(block_chain.length(), 25)
+
+        # the fork is checked against its own ancestors, and takes over
+        block_chain.add_headers(fork[4:])
+        self.assertEqual(block_chain.length(), 32)
+        self.assertEqual(block_chain.last_block_hash(), fork[-1].hash())
+
+    def test_fork_below_checkpoint(self):
+        headers = make_headers(20)
+        validator = make_validator(checkpoints={100: ZERO32})
+        block_chain = BlockChain(ZERO32, {}, header_validator=validator)
+        block_chain.add_headers(headers)
+
+        # a fork with no proof of work, well short of the checkpoint
+        fork = network.block(
+            1, headers[5].hash(), ZERO32, headers[5].timestamp + SPACING, 0x1B0404CB, 0
+        )
+        self.assertGreater(
+            int.from_bytes(fork.hash(), "little"), target_for_bits(fork.difficulty)
+        )
+        with self.assertRaises(HeaderValidationError) as cm:
+            block_chain.add_headers([fork])
+        self.assertIn("proof of work", str(cm.exception))
+        self.assertEqual(block_chain.length(), 20)
+        self.assertEqual(block_chain.last_block_hash(), headers[-1].hash())
+
+    def test_locked_blocks(self):
+        headers = make_headers(40)
+        block_chain = BlockChain(ZERO32, {}, header_validator=make_validator())
+        block_chain.add_headers(headers[:20])
+        block_chain.lock_to_index(18)
+        # the locked blocks have no timestamps, so the retarget at 24 isn't
+        # checked, but the one at 32 is
+        lazy = mine(
+            headers[31].hash(), headers[31].timestamp + SPACING, headers[31].difficulty
+        )
+        self.assertNotEqual(headers[32].difficulty, lazy.difficulty)
+        self.assertRaises(
+            HeaderValidationError, block_chain.add_headers, headers[20:32] + [lazy]
+        )
+        block_chain.add_headers(headers[20:])
+        self.assertEqual(block_chain.length(), 40)
+
+    def test_locked_header_chain(self):
+        headers = make_headers(30)
+        data = b"".join(header_bytes_for(h) for h in headers[:20])
+        block_chain = BlockChain(ZERO32, {}, header_validator=make_validator())
+        block_chain.preload_locked_blocks(LockedHeaderChain.from_headers(data))
+        # the retarget at 24 needs the timestamp at 16, from the locked headers
+        lazy = make_headers(5, headers[:20], spacing=10)
+        self.assertNotEqual(lazy[4].difficulty, POW_LIMIT_BITS)
+        lazy[4] = mine(lazy[3].hash(), lazy[4].timestamp, POW_LIMIT_BITS)
+        with self.assertRaises(HeaderValidationError) as cm:
+            block_chain.add_headers(lazy)
+        self.assertIn("retarget", str(cm.exception))
+        block_chain.add_headers(headers[20:])
+        self.assertEqual(block_chain.length(), 30)
+
+
+if __name__ == "__main__":
+    unittest.main()
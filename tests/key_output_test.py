@@ -0,0 +1,65 @@
+import unittest
+
+from pycoin.networks.registry import network_for_netcode
+from pycoin.symbols.btc import network
+from pycoin.tools.key_output import (
+    FIELD_FUNCTIONS,
+    has_standard_output,
+    output_for_key,
+)
+
+
+class KeyOutputTest(unittest.TestCase):
+    def test_same_as_ku_output(self):
+        fields = list(FIELD_FUNCTIONS)
+        for netcode in ["BTC", "LTC", "BCH", "DOGE", "XTN"]:
+            net = network_for_netcode(netcode)
+            bip32 = net.keys.bip32_seed(b"foo")
+            keys = [
+                bip32,
+                bip32.public_copy(),
+                bip32.subkey_for_path("1H/2"),
+                net.keys.private(secret_exponent=1),
+                net.keys.private(secret_exponent=2, is_compressed=False),
+                net.keys.public(bip32.public_pair()),
+            ]
+            for key in keys:
+                self.assertTrue(has_standard_output(key))
+                expected = {
+                    k: v for k, v in output_for_key("item", key).items() if k in fields
+                }
+                self.assertEqual(output_for_key("item", key, fields), expected)
+
+    def test_only_fields_computed(self):
+        key = network.keys.private(secret_exponent=1)
+        self.assertEqual(
+            output_for_key("1", key, ["address", "input"]),
+            dict(address=key.address(), input="1"),
+        )
+        self.assertIsNone(key._hash160_uncompressed)
+        output_for_key("1", key)
+        self.assertIsNotNone(key._hash160_uncompressed)
+
+    def test_fallback(self):
+        key = network.keys.bip32_seed(b"foo")
+        self.assertEqual(
+            output_for_key("foo", key, ["BTC_address", "hash160"]),
+            dict(
+                hash160=FIELD_FUNCTIONS["hash160"]("foo", key),
+                BTC_address=key.address(),
+            ),
+        )
+        bip49 = network.keys.bip49_deserialize(b"\0" * 4 + key.serialize())
+        self.assertFalse(has_standard_output(bip49))
+        self.assertEqual(
+            output_for_key("foo", bip49, ["address"]), dict(address=bip49.address())
+        )
+        contract = network.parse.address(key.address())
+        self.assertEqual(
+            output_for_key("foo", contract, ["address", "wif"]),
+            dict(address=key.address()),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
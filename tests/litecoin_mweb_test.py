@@ -1,6 +1,11 @@
+import io
+import struct
 import unittest
+from unittest import mock
 
+from pycoin.encoding.hash import double_sha256
 from pycoin.encoding.hexbytes import h2b
+from pycoin.merkle import merkle
 from pycoin.symbols.ltc import network
 
 BLOCK_BLOB = h2b(
@@ -53,3 +58,30 @@ class LTCMWebTestCase(unittest.TestCase):
     def test_parse_block(self):
         block = network.Block.from_bin(BLOCK_BLOB)
         assert block is not None
+
+    def test_parse_many_txs(self):
+        Tx = network.tx
+        self.assertFalse(Tx.has_buffer_parser())
+        txs = [Tx.coinbase_tx(b"\2" * 33, 5000000000, b"\0\0")]
+        for i in range(1, 2000):
+            tx_in = Tx.TxIn(struct.pack("<L", i) * 8, i, b"\x51")
+            txs.append(Tx(1, [tx_in], [Tx.TxOut(i, b"\x52")], lock_time=i))
+        block = network.block(
+            1, b"\0" * 32, merkle([tx.hash() for tx in txs], double_sha256), 0, 0, 0
+        )
+        block.set_txs(txs)
+        blob = block.as_bin()
+
+        # Tx.parse reads a stream, so Block.parse doesn't go through the buffer
+        # one transaction at a time
+        with mock.patch.object(Tx, "from_buffer", side_effect=AssertionError):
+            parsed = network.block.parse(io.BytesIO(blob))
+        self.assertEqual([tx.id() for tx in parsed.txs], [tx.id() for tx in txs])
+        parsed = network.block.from_bin(blob)
+        self.assertEqual([tx.id() for tx in parsed.txs], [tx.id() for tx in txs])
+        parsed, end = network.block.from_buffer(blob, include_offsets=True)
+        self.assertEqual(end, len(blob))
+        self.assertEqual([tx.id() for tx in parsed.txs], [tx.id() for tx in txs])
+        self.assertEqual(
+            Tx.from_buffer(blob, parsed.txs[5].offset_in_block)[0].id(), txs[5].id()
+        )
@@ -0,0 +1,98 @@
+import os
+import tempfile
+import unittest
+
+from pycoin.blockchain.BlockChain import BlockChain
+from pycoin.blockchain.LockedHeaderChain import LockedHeaderChain, header_bytes_for
+
+from .utxo_store_test import ZERO32, make_chain
+
+
+class LockedHeaderChainTest(unittest.TestCase):
+    def test_from_headers(self):
+        blocks = make_chain(20)
+        data = b"".join(header_bytes_for(b) for b in blocks)
+        for check_hashes in (True, False):
+            chain = LockedHeaderChain.from_headers(data, check_hashes=check_hashes)
+            self.assertEqual(len(chain), 20)
+            self.assertEqual(
+                chain[:],
+                [(b.hash(), b.previous_block_hash, b.difficulty) for b in blocks],
+            )
+            self.assertEqual(chain[-1][0], blocks[-1].hash())
+            for idx, block in enumerate(blocks):
+                self.assertEqual(chain.index_for_hash(block.hash()), idx)
+            self.assertIsNone(chain.index_for_hash(ZERO32))
+            self.assertNotIn(b"\1" * 32, chain)
+            self.assertRaises(IndexError, chain.__getitem__, 20)
+
+        bad = data[:80] + data[160:]
+        self.assertRaises(ValueError, LockedHeaderChain.from_headers, bad)
+        self.assertRaises(ValueError, LockedHeaderChain.from_headers, data[:-1])
+        self.assertRaises(ValueError, LockedHeaderChain.from_headers, data[80:])
+
+    def test_append_and_save(self):
+        blocks = make_chain(30)
+        chain = LockedHeaderChain(max_unsorted=4)
+        chain.extend_headers(blocks[:10])
+        self.assertRaises(ValueError, chain.extend_headers, blocks[11:12])
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "headers")
+            chain.save(path)
+            chain = LockedHeaderChain.from_header_file(path, max_unsorted=4)
+            self.assertEqual(len(chain), 10)
+            chain.extend_headers(blocks[10:])
+            self.assertEqual(
+                [chain.index_for_hash(b.hash()) for b in blocks], list(range(30))
+            )
+            self.assertEqual(chain.header_bytes(29), header_bytes_for(blocks[29]))
+            chain.save(path)
+            self.assertEqual(len(LockedHeaderChain.from_header_file(path)), 30)
+            open(path, "wb").close()
+            self.assertEqual(len(LockedHeaderChain.from_header_file(path)), 0)
+
+    def test_block_chain(self):
+        blocks = make_chain(30)
+        data = b"".join(header_bytes_for(b) for b in blocks[:10])
+        locked = LockedHeaderChain.from_headers(data)
+        locked_chunks = []
+
+        def did_lock_to_index_f(items, index):
+            locked_chunks.append((items, index))
+
+        block_chain = BlockChain(ZERO32, {}, did_lock_to_index_f)
+        block_chain.preload_locked_blocks(locked)
+        self.assertEqual(block_chain.length(), 10)
+        self.assertEqual(block_chain.index_for_hash(blocks[3].hash()), 3)
+        self.assertTrue(block_chain.is_hash_known(blocks[9].hash()))
+
+        ops = block_chain.add_headers(blocks[10:])
+        self.assertEqual(ops, [("add", b, i + 10) for i, b in enumerate(blocks[10:])])
+        block_chain.lock_to_index(25)
+        self.assertEqual(block_chain.locked_length(), 25)
+        self.assertEqual(len(locked), 25)
+        self.assertEqual(locked_chunks[0][1], 10)
+        self.assertEqual(
+            locked_chunks[0][0],
+            [(b.hash(), b.previous_block_hash, b.difficulty) for b in blocks[10:25]],
+        )
+        for idx, block in enumerate(blocks):
+            self.assertEqual(block_chain.index_for_hash(block.hash()), idx)
+            self.assertEqual(block_chain.hash_for_index(idx), block.hash())
+        self.assertEqual(len(block_chain.hash_to_index_lookup), 5)
+
+    def test_block_chain_parent_hash(self):
+        blocks = make_chain(10)
+        data = b"".join(header_bytes_for(b) for b in blocks[5:])
+        locked = LockedHeaderChain.from_headers(data, blocks[4].hash())
+        block_chain = BlockChain(ZERO32)
+        self.assertRaises(ValueError, block_chain.preload_locked_blocks, locked)
+        self.assertEqual(block_chain.length(), 0)
+        block_chain = BlockChain(blocks[4].hash())
+        block_chain.preload_locked_blocks(locked)
+        self.assertEqual(block_chain.length(), 5)
+        self.assertEqual(block_chain.hash_for_index(-1), blocks[9].hash())
+
+
+if __name__ == "__main__":
+    unittest.main()
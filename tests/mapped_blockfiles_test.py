@@ -0,0 +1,137 @@
+import os
+import struct
+import tempfile
+import unittest
+
+from pycoin.symbols.btc import network
+from pycoin.tools.bitcoind_disk import Blockfiles
+from pycoin.tools.mapped_blockfiles import MappedBlockfiles, deobfuscate, iter_records
+
+from .block_fixtures import make_block
+
+
+MAGIC = b"\xf9\xbe\xb4\xd9"
+XOR_KEY = bytes.fromhex("0123456789abcdef")
+
+
+def record_header(file_index, offset, mv):
+    return offset, bytes(mv[:80])
+
+
+def write_blocks(base_dir, xor_key=None):
+    """Write two block files, the first padded with zeros, and return their blocks."""
+    os.mkdir(os.path.join(base_dir, "blocks"))
+    if xor_key:
+        with open(os.path.join(base_dir, "blocks", "xor.dat"), "wb") as f:
+            f.write(xor_key)
+    files = [[make_block(n) for n in (1, 3, 2)], [make_block(n) for n in (4, 1)]]
+    for file_index, blocks in enumerate(files):
+        data = b"".join(MAGIC + struct.pack("<L", len(b)) + b for b in blocks)
+        if file_index == 0:
+            data += bytes(100)
+        if xor_key:
+            data = deobfuscate(data, xor_key)
+        path = os.path.join(base_dir, "blocks", "blk%05d.dat" % file_index)
+        with open(path, "wb") as f:
+            f.write(data)
+    return files
+
+
+class MappedBlockfilesTest(unittest.TestCase):
+    def test_deobfuscate(self):
+        data = os.urandom(100)
+        obfuscated = deobfuscate(data, XOR_KEY)
+        self.assertEqual(
+            obfuscated, bytes(b ^ XOR_KEY[i % 8] for i, b in enumerate(data))
+        )
+        self.assertEqual(deobfuscate(obfuscated[13:50], XOR_KEY, 13), data[13:50])
+        self.assertEqual(deobfuscate(b"", XOR_KEY), b"")
+
+    def test_iter_records(self):
+        block = make_block(1)
+        data = MAGIC + struct.pack("<L", len(block)) + block
+        self.assertEqual(
+            list(iter_records(data * 2, MAGIC)),
+            [(8, len(block)), (16 + len(block), len(block))],
+        )
+        # a truncated record is ignored
+        self.assertEqual(len(list(iter_records(data + data[:-1], MAGIC))), 1)
+        self.assertRaises(ValueError, list, iter_records(b"junkjunk" + data, MAGIC))
+
+    def check_blockfiles(self, xor_key):
+        with tempfile.TemporaryDirectory() as base_dir:
+            files = write_blocks(base_dir, xor_key)
+            blockfiles = MappedBlockfiles(base_dir)
+            self.assertEqual(blockfiles.xor_key, xor_key)
+            records = list(blockfiles.iter_records())
+            expected = [(i, b) for i, blocks in enumerate(files) for b in blocks]
+            self.assertEqual(
+                [(file_index, bytes(mv)) for file_index, _, mv in records], expected
+            )
+            if xor_key is None:
+                # the same block_info as Blockfiles
+                old_blockfiles = Blockfiles(base_dir)
+                block_info = old_blockfiles.next_offset((0, 0))[1]
+                block_info = old_blockfiles.next_offset(block_info)[0]
+                self.assertEqual(block_info, records[1][:2])
+                old_blockfiles.close()
+            self.assertEqual(bytes(blockfiles.block_bytes(records[3][:2])), files[1][0])
+
+            blocks = list(
+                blockfiles.blocks(network.block, start_info=(0, records[2][1] - 8))
+            )
+            self.assertEqual(
+                [b.as_bin() for b in blocks], [bytes(mv) for _, _, mv in records[2:]]
+            )
+            self.assertEqual(blocks[1].info, records[3][:2])
+            del records, blocks
+
+            results = list(blockfiles.map_files(record_header, max_workers=2))
+            self.assertEqual([file_index for file_index, _ in results], [0, 1])
+            self.assertEqual(
+                [header for _, r in results for _, header in r],
+                [b[:80] for _, b in expected],
+            )
+            blockfiles.close()
+
+    def test_blockfiles(self):
+        self.check_blockfiles(None)
+
+    def test_obfuscated_blockfiles(self):
+        self.check_blockfiles(XOR_KEY)
+
+    def test_ignore_xor_key(self):
+        with tempfile.TemporaryDirectory() as base_dir:
+            write_blocks(base_dir, XOR_KEY)
+            blockfiles = MappedBlockfiles(base_dir, xor_key=b"")
+            self.assertEqual(blockfiles.xor_key, b"")
+            data = bytes(blockfiles.buffer(0))
+            with open(blockfiles.path_for_file_index(0), "rb") as f:
+                self.assertEqual(data, f.read())
+            # the records are still obfuscated, so the magic doesn't match
+            self.assertRaises(ValueError, list, blockfiles.records(0))
+            with self.assertRaises(ValueError):
+                list(blockfiles.map_files(record_header, [0], max_workers=1))
+            blockfiles.close()
+
+    def test_map_files_in_flight(self):
+        with tempfile.TemporaryDirectory() as base_dir:
+            write_blocks(base_dir)
+            blockfiles = MappedBlockfiles(base_dir)
+            submitted = []
+
+            def file_indices():
+                for file_index in (0, 1, 0, 1, 0):
+                    submitted.append(file_index)
+                    yield file_index
+
+            results = blockfiles.map_files(record_header, file_indices(), 1)
+            self.assertEqual(next(results)[0], 0)
+            # file indices are taken as workers free up
+            self.assertEqual(len(submitted), 2)
+            self.assertEqual([r[0] for r in results], [1, 0, 1, 0])
+            self.assertEqual(len(submitted), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+
+from pycoin.encoding.hash import double_sha256
+from pycoin.merkle import merkle, MerkleTree, verify_merkle_branch
+from pycoin.message.make_parser_and_packer import (
+    make_parser_and_packer,
+    standard_messages,
+    standard_message_post_unpacks,
+    standard_parsing_functions,
+    standard_streamer,
+)
+from pycoin.symbols.btc import network
+
+
+def leaves(count):
+    return [double_sha256(bytes([i & 0xFF, i >> 8])) for i in range(count)]
+
+
+class MerkleTreeTest(unittest.TestCase):
+    def test_root_and_branches(self):
+        for count in range(1, 20):
+            hashes = leaves(count)
+            tree = MerkleTree(hashes)
+            root = merkle(hashes)
+            self.assertEqual(tree.root(), root)
+            for idx, h in enumerate(hashes):
+                branch = tree.branch(idx)
+                self.assertTrue(verify_merkle_branch(h, idx, branch, root))
+                self.assertFalse(verify_merkle_branch(b"\0" * 32, idx, branch, root))
+            self.assertEqual(tree.index(hashes[-1]), count - 1)
+        self.assertRaises(IndexError, tree.branch, count)
+        self.assertRaises(ValueError, MerkleTree([]).root)
+
+    def test_append_and_replace(self):
+        hashes = leaves(33)
+        tree = MerkleTree([])
+        for count, h in enumerate(hashes, start=1):
+            tree.append(h)
+            self.assertEqual(tree.root(), merkle(hashes[:count]))
+            self.assertEqual(tree.levels, MerkleTree(hashes[:count]).levels)
+        tree.index(hashes[0])
+        for idx in (0, 7, 32):
+            hashes[idx] = double_sha256(hashes[idx])
+            tree.replace(idx, hashes[idx])
+            self.assertEqual(tree.root(), merkle(hashes))
+            self.assertEqual(tree.index(hashes[idx]), idx)
+
+    def test_partial_tree(self):
+        streamer = standard_streamer(
+            standard_parsing_functions(network.block, network.tx)
+        )
+        parser, packer = make_parser_and_packer(
+            streamer, standard_messages(), standard_message_post_unpacks(streamer)
+        )
+        for count in (1, 2, 7, 16, 45):
+            hashes = leaves(count)
+            tree = MerkleTree(hashes)
+            header = network.block(1, b"\0" * 32, tree.root(), 0, 0, 0)
+            for matched in ([], [0], [count - 1], list(range(0, count, 3))):
+                total, partial_hashes, flags = tree.partial_tree(matched)
+                data = packer(
+                    "merkleblock",
+                    header=header,
+                    total_transactions=total,
+                    hashes=partial_hashes,
+                    flags=flags,
+                )
+                d = parser("merkleblock", data)
+                self.assertEqual(d["tx_hashes"], [hashes[idx] for idx in matched])
+        self.assertRaises(IndexError, tree.partial_tree, [count])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import io
+import os
+import struct
+import tempfile
+import unittest
+
+from pycoin.block import BadMerkleRootError
+from pycoin.symbols.btc import network
+from pycoin.tools.bitcoind_disk import Blockfiles
+from pycoin.tools.parallel_parse import ParallelBlockParser
+
+from .block_fixtures import make_block
+
+
+Block = network.block
+
+
+class ParallelParseTest(unittest.TestCase):
+    def test_parse(self):
+        block_data = make_block(41)
+        expected = Block.parse(io.BytesIO(block_data), include_offsets=True)
+        with ParallelBlockParser(max_workers=2, min_parallel_txs=2) as parser:
+            block = parser.parse(Block, b"junk" + block_data, 4, include_offsets=True)
+            self.assertEqual(block.as_bin(), block_data)
+            self.assertEqual(block.id(), expected.id())
+            self.assertEqual(
+                [(tx.w_id(), tx.offset_in_block) for tx in block.txs],
+                [(tx.w_id(), tx.offset_in_block) for tx in expected.txs],
+            )
+            self.assertTrue(all(tx.block is block for tx in block.txs))
+
+            # small blocks are parsed in this process
+            small_block_data = make_block(1)
+            self.assertEqual(
+                parser.parse(Block, small_block_data).as_bin(), small_block_data
+            )
+
+            bad_block = Block(1, b"\0" * 32, b"\1" * 32, 0, 0, 0).as_bin()
+            self.assertRaises(
+                BadMerkleRootError, parser.parse, Block, bad_block + block_data[80:]
+            )
+
+    def test_chunks(self):
+        parser = ParallelBlockParser(max_workers=2, chunks_per_worker=2)
+        spans = [(0, 10)] * 9 + [(0, 90)]
+        self.assertEqual(parser._chunks(spans), [(0, 5), (5, 9), (9, 10)])
+        self.assertEqual(parser._chunks([(0, 1)] * 3), [(0, 1), (1, 2), (2, 3)])
+
+    def test_block_bytes(self):
+        block_data = make_block(3)
+        with tempfile.TemporaryDirectory() as base_dir:
+            os.mkdir(os.path.join(base_dir, "blocks"))
+            with open(os.path.join(base_dir, "blocks", "blk00000.dat"), "wb") as f:
+                for i in range(2):
+                    f.write(b"\xf9\xbe\xb4\xd9" + struct.pack("<L", len(block_data)))
+                    f.write(block_data)
+            blockfiles = Blockfiles(base_dir)
+            block_info, next_info = blockfiles.next_offset((0, 0))
+            self.assertEqual(blockfiles.block_bytes(block_info), block_data)
+            block_info, next_info = blockfiles.next_offset(next_info)
+            self.assertEqual(blockfiles.block_bytes(block_info), block_data)
+            blockfiles.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
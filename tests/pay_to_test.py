@@ -1,7 +1,7 @@
 import io
 import unittest
 
-from pycoin.encoding.hexbytes import h2b
+from pycoin.encoding.hexbytes import b2h, h2b
 from pycoin.symbols.btc import network
 
 
@@ -81,6 +81,88 @@ class PayToTest(unittest.TestCase):
             # convert between asm and back to ensure no bugs with compilation
             self.assertEqual(sc, network.script.compile(network.script.disassemble(sc)))
 
+    def test_standard_script_classifier(self):
+        contract = network.contract
+        keys = [network.keys.private(secret_exponent=i) for i in range(1, 4)]
+        h160 = keys[0].hash160()
+        scripts = [
+            contract.for_p2pkh(h160),
+            contract.for_p2pkh_wit(h160),
+            contract.for_p2sh(h160),
+            contract.for_p2sh_wit(b"\2" * 32),
+            contract.for_p2pk(keys[0].sec()),
+            contract.for_p2pk(keys[0].sec(is_compressed=False)),
+            contract.for_p2tr(b"\3" * 32),
+            contract.for_multisig(2, [k.sec() for k in keys]),
+            contract.for_nulldata(b"hello"),
+            contract.for_nulldata_push(b"hello"),
+            # non-canonical pushes only the opcode-by-opcode matcher recognizes
+            network.script.compile("OP_DUP OP_HASH160 OP_PUSHDATA1 0x14")
+            + h160
+            + network.script.compile("OP_EQUALVERIFY OP_CHECKSIG"),
+            network.script.compile("OP_0 OP_PUSHDATA1 0x20") + b"\2" * 32,
+            b"",
+            b"\xac" * 25,
+            network.script.compile("OP_1 OP_1 OP_CHECKMULTISIG"),
+        ]
+        types = []
+        for script in scripts:
+            info = contract.info_for_script(script)
+            self.assertEqual(info, contract._info_for_script_by_matching(script))
+            types.append(info["type"])
+        self.assertEqual(
+            types,
+            "p2pkh p2pkh_wit p2sh p2sh_wit p2pk p2pk p2tr multisig nulldata nulldata "
+            "p2pkh p2sh_wit unknown unknown unknown".split(),
+        )
+        self.assertIsNone(contract._info_for_standard_script(scripts[10]))
+
+    def test_script_builders(self):
+        contract = network.contract
+        compile = network.script.compile
+        key = network.keys.private(secret_exponent=1)
+        h160 = key.hash160()
+        h160_hex = b2h(h160)
+        self.assertEqual(
+            contract.for_p2pkh(h160),
+            compile("OP_DUP OP_HASH160 %s OP_EQUALVERIFY OP_CHECKSIG" % h160_hex),
+        )
+        self.assertEqual(
+            contract.for_p2sh(h160), compile("OP_HASH160 %s OP_EQUAL" % h160_hex)
+        )
+        self.assertEqual(contract.for_p2pkh_wit(h160), compile("OP_0 %s" % h160_hex))
+        self.assertEqual(
+            contract.for_p2sh_wit(b"\1" * 32), compile("OP_0 %s" % ("01" * 32))
+        )
+        self.assertEqual(
+            contract.for_p2tr(b"\1" * 32), compile("OP_1 %s" % ("01" * 32))
+        )
+        for is_compressed in (True, False):
+            sec = key.sec(is_compressed=is_compressed)
+            self.assertEqual(
+                contract.for_p2pk(sec), compile("%s OP_CHECKSIG" % b2h(sec))
+            )
+        sec_keys = [network.keys.private(secret_exponent=i).sec() for i in range(1, 4)]
+        self.assertEqual(
+            contract.for_multisig(2, sec_keys),
+            compile("2 %s 3 OP_CHECKMULTISIG" % " ".join(b2h(sk) for sk in sec_keys)),
+        )
+        # sizes without a template still compile
+        self.assertEqual(
+            contract.for_p2pkh(b"\1" * 4),
+            compile("OP_DUP OP_HASH160 01010101 OP_EQUALVERIFY OP_CHECKSIG"),
+        )
+        self.assertEqual(contract.for_nulldata_push(b""), compile("OP_RETURN OP_0"))
+
+    def test_for_address_cache(self):
+        address = network.keys.private(secret_exponent=1).address()
+        script = network.contract.for_address(address)
+        self.assertEqual(
+            script, network.contract.for_p2pkh(network.parse.address(address).hash160())
+        )
+        self.assertIs(network.contract.for_address(address), script)
+        self.assertIsNone(network.contract.for_address("not an address"))
+
 
 if __name__ == "__main__":
     unittest.main()
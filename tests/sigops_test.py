@@ -0,0 +1,113 @@
+import unittest
+
+from pycoin.coins.bitcoin.sigops import (
+    block_validation_cost,
+    script_sigop_count,
+    summarize_script,
+)
+from pycoin.symbols.btc import network
+
+
+Tx = network.tx
+TxIn = network.tx.TxIn
+TxOut = network.tx.TxOut
+Spendable = network.tx.Spendable
+
+
+class SigopsTest(unittest.TestCase):
+    def setUp(self):
+        self.keys = [network.keys.private(secret_exponent=i) for i in range(1, 5)]
+
+    def test_script_sigop_count(self):
+        compile = network.script.compile
+        self.assertEqual(script_sigop_count(b""), 0)
+        p2pkh = network.contract.for_p2pkh(self.keys[0].hash160())
+        self.assertEqual(script_sigop_count(p2pkh), 1)
+        self.assertEqual(script_sigop_count(p2pkh, accurate=True), 1)
+        multisig = network.contract.for_multisig(
+            m=2, sec_keys=[k.sec() for k in self.keys[:3]]
+        )
+        self.assertEqual(script_sigop_count(multisig), 20)
+        self.assertEqual(script_sigop_count(multisig, accurate=True), 3)
+        script = compile("OP_CHECKSIG OP_CHECKSIGVERIFY OP_DROP OP_CHECKMULTISIGVERIFY")
+        self.assertEqual(script_sigop_count(script), 22)
+        self.assertEqual(script_sigop_count(script, accurate=True), 22)
+        # counting stops at a truncated push
+        script = compile("OP_CHECKSIG") + b"\x4c\xff" + compile("OP_CHECKSIG")
+        self.assertEqual(script_sigop_count(script), 1)
+
+    def test_summarize_script(self):
+        compile = network.script.compile
+        summary = summarize_script(compile("OP_0 [0102] [03]"))
+        self.assertTrue(summary.push_only)
+        self.assertEqual(summary.last_push, b"\3")
+        summary = summarize_script(compile("OP_0 OP_DUP"))
+        self.assertFalse(summary.push_only)
+
+    def _spend(self, puzzle_script, script=b"", witness=()):
+        spendable = Spendable(10000, puzzle_script, b"\1" * 32, 0)
+        tx = Tx(1, [spendable.tx_in(script=script)], [TxOut(9000, b"")])
+        tx.txs_in[0].witness = list(witness)
+        tx.set_unspents([spendable])
+        return tx
+
+    def test_p2sh_multisig(self):
+        underlying_script = network.contract.for_multisig(
+            m=2, sec_keys=[k.sec() for k in self.keys[:3]]
+        )
+        puzzle_script = network.contract.for_p2s(underlying_script)
+        solution = network.script.compile_push_data_list(
+            [b"", b"\x30" * 71, b"\x30" * 71, underlying_script]
+        )
+        cost = self._spend(puzzle_script, solution).validation_cost()
+        self.assertEqual(cost.legacy_sigops, 0)
+        self.assertEqual(cost.p2sh_sigops, 3)
+        self.assertEqual(cost.witness_sigops, 0)
+        self.assertEqual(cost.ec_verifications, 3)
+        self.assertEqual(cost.sigop_cost(), 12)
+        self.assertEqual(cost.missing_unspents, 0)
+
+    def test_witness(self):
+        h160 = self.keys[0].hash160()
+        cost = self._spend(
+            network.contract.for_p2pkh_wit(h160), witness=[b"sig", b"sec"]
+        ).validation_cost()
+        self.assertEqual((cost.legacy_sigops, cost.witness_sigops), (0, 1))
+        self.assertEqual(cost.sigop_cost(), 1)
+
+        witness_script = network.contract.for_multisig(
+            m=1, sec_keys=[k.sec() for k in self.keys[:2]]
+        )
+        p2wsh = network.contract.for_p2s_wit(witness_script)
+        tx = self._spend(p2wsh, witness=[b"", b"sig", witness_script])
+        self.assertEqual(tx.validation_cost().witness_sigops, 2)
+
+        # p2sh-wrapped p2wpkh
+        redeem_script = network.contract.for_p2pkh_wit(h160)
+        solution = network.script.compile_push_data_list([redeem_script])
+        cost = self._spend(
+            network.contract.for_p2s(redeem_script), solution, [b"sig", b"sec"]
+        ).validation_cost()
+        self.assertEqual((cost.p2sh_sigops, cost.witness_sigops), (0, 1))
+
+    def test_missing_unspents_and_histogram(self):
+        tx = self._spend(network.contract.for_p2pkh(self.keys[0].hash160()))
+        tx.unspents = []
+        cost = tx.validation_cost()
+        self.assertEqual(cost.missing_unspents, 1)
+        self.assertEqual(cost.ec_verifications, 0)
+        self.assertEqual(cost.script_size_histogram, {0: 2})
+
+    def test_block_validation_cost(self):
+        tx = self._spend(network.contract.for_p2pkh(self.keys[0].hash160()))
+        coinbase = Tx.coinbase_tx(self.keys[1].sec(), 5000000000, b"\0\0")
+        block = network.block(1, b"\0" * 32, b"\0" * 32, 0, 0, 0)
+        block.set_txs([coinbase, tx], check_merkle_hash=False)
+        cost = block_validation_cost(block)
+        self.assertEqual(cost.legacy_sigops, 1)
+        self.assertEqual(cost.ec_verifications, 1)
+        self.assertEqual(cost.script_size_histogram, {0: 2, 2: 1, 64: 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
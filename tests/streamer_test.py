@@ -0,0 +1,79 @@
+import io
+import struct
+import unittest
+
+from pycoin.encoding.hexbytes import bytes_as_revhex, h2b
+from pycoin.satoshi.satoshi_streamer import STREAMER_FUNCTIONS, STRUCT_CODES
+from pycoin.satoshi.satoshi_struct import pack_struct, parse_struct, stream_struct
+from pycoin.serialize.streamer import Streamer
+
+
+class StreamerTest(unittest.TestCase):
+    def test_merged_fields(self):
+        h1, h2 = b"\1" * 32, b"\2" * 32
+        blob = pack_struct("L##LLL", 1, h1, h2, 2, 3, 4)
+        self.assertEqual(blob, struct.pack("<L32s32sLLL", 1, h1, h2, 2, 3, 4))
+        items = parse_struct("L##LLL", io.BytesIO(blob))
+        self.assertEqual(items, (1, h1, h2, 2, 3, 4))
+        self.assertIsInstance(items[1], bytes_as_revhex)
+        self.assertIsInstance(items[2], bytes_as_revhex)
+
+        # mixed byte orders and variable-size fields between fixed ones
+        blob = pack_struct("Q@hSLb", 5, b"\3" * 16, 8333, b"foo", 7, True)
+        self.assertEqual(
+            blob, h2b("0500000000000000") + b"\3" * 16 + h2b("208d03666f6f0700000001")
+        )
+        self.assertEqual(
+            parse_struct("Q@hSLb", io.BytesIO(blob)),
+            (5, b"\3" * 16, 8333, b"foo", 7, True),
+        )
+
+    def test_arrays(self):
+        blob = pack_struct("ILLL", 3, 1, 2, 3) + pack_struct(
+            "IQSQS", 2, 4, b"a", 5, b""
+        )
+        f = io.BytesIO(blob + b"\x07\0\0\0")
+        self.assertEqual(
+            parse_struct("[L][QS]L", f), ((1, 2, 3), ((4, b"a"), (5, b"")), 7)
+        )
+        self.assertEqual(f.read(), b"")
+        self.assertRaises(ValueError, parse_struct, "[L", io.BytesIO(blob))
+
+    def test_stream_fewer_args(self):
+        f = io.BytesIO()
+        stream_struct("LLL", f, 1, 2)
+        self.assertEqual(f.getvalue(), struct.pack("<LL", 1, 2))
+
+    def test_stream_hash_sizes(self):
+        # "#" and "@" values are truncated, but short ones aren't padded
+        self.assertEqual(pack_struct("L#", 1, b"\1" * 33), h2b("01000000") + b"\1" * 32)
+        self.assertEqual(
+            pack_struct("L#L", 1, b"\1" * 3, 2), h2b("01000000010101") + h2b("02000000")
+        )
+        self.assertEqual(pack_struct("@", b"ab"), b"ab")
+        self.assertEqual(pack_struct("@", b"\2" * 16), b"\2" * 16)
+
+    def test_short_read(self):
+        self.assertRaises(struct.error, parse_struct, "LL", io.BytesIO(b"\0" * 7))
+
+    def test_override(self):
+        streamer = Streamer()
+        streamer.register_array_count_parse(STREAMER_FUNCTIONS["I"][0])
+        streamer.register_functions(STREAMER_FUNCTIONS.items())
+        streamer.register_struct_codes(STRUCT_CODES.items())
+        self.assertEqual(streamer.unpack_struct("LL", b"\1\0\0\0\2\0\0\0"), (1, 2))
+        # replacing the functions for a field drops its struct code
+        streamer.register_functions(
+            [("L", (lambda f: f.read(4)[::-1], lambda f, v: f.write(v[::-1])))]
+        )
+        self.assertEqual(
+            streamer.unpack_struct("LL", b"\1\0\0\0\2\0\0\0"),
+            (b"\0\0\0\1", b"\0\0\0\2"),
+        )
+        self.assertEqual(
+            streamer.pack_struct("QL", 1, b"abcd"), h2b("0100000000000000") + b"dcba"
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
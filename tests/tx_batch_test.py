@@ -0,0 +1,90 @@
+import os
+import tempfile
+import unittest
+
+from pycoin.symbols.btc import network
+from pycoin.tools.tx_batch import TxBatch
+
+from .block_fixtures import make_block
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def make_blocks():
+    blocks = [network.block.from_bin(make_block(tx_count)) for tx_count in (1, 5, 12)]
+    # a script of each of a few types
+    tx = blocks[-1].txs[3]
+    address = "1KissFDVu2wAYWPRm4UGh5ZCDU9sE9an8T"
+    tx.txs_out[0].script = network.contract.for_address(address)
+    tx.txs_out.append(network.tx.TxOut(1234, network.contract.for_nulldata(b"hi")))
+    return blocks
+
+
+class TxBatchTest(unittest.TestCase):
+    def check_batch(self, batch, blocks):
+        txs = [tx for block in blocks for tx in block.txs]
+        self.assertEqual(len(batch), len(txs))
+        self.assertEqual(batch.block_count(), len(blocks))
+        self.assertEqual(list(batch.block_tx_start), [0, 1, 6, 18])
+        tx_ins = [tx_in for tx in txs for tx_in in tx.txs_in]
+        tx_outs = [tx_out for tx in txs for tx_out in tx.txs_out]
+        for idx, tx in enumerate(txs):
+            self.assertEqual(bytes(batch.tx_hash[idx * 32 : idx * 32 + 32]), tx.hash())
+            self.assertEqual(batch.lock_time[idx], tx.lock_time)
+            self.assertEqual(len(batch.tx_in_range(idx)), len(tx.txs_in))
+            self.assertEqual(
+                [batch.value[i] for i in batch.tx_out_range(idx)],
+                [tx_out.coin_value for tx_out in tx.txs_out],
+            )
+        self.assertEqual(
+            [
+                bytes(batch.prevout_hash[i * 32 : i * 32 + 32])
+                for i in range(len(tx_ins))
+            ],
+            [tx_in.previous_hash for tx_in in tx_ins],
+        )
+        self.assertEqual(list(batch.sequence), [tx_in.sequence for tx_in in tx_ins])
+        self.assertEqual(
+            [batch.script(i) for i in range(len(tx_outs))],
+            [tx_out.script for tx_out in tx_outs],
+        )
+        totals = batch.value_by_script_type()
+        self.assertEqual(totals["nulldata"], 1234)
+        self.assertEqual(totals["p2pkh"], 3)
+        self.assertEqual(sum(totals.values()), sum(tx.total_out() for tx in txs))
+
+    def test_from_blocks(self):
+        blocks = make_blocks()
+        self.check_batch(TxBatch.from_blocks(blocks, network.contract), blocks)
+
+    def test_save_load(self):
+        blocks = make_blocks()
+        batch = TxBatch.from_blocks(blocks, network.contract)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "batch")
+            batch.save(path)
+            loaded = TxBatch.load(path)
+            self.check_batch(loaded, blocks)
+            with open(path, "r+b") as f:
+                f.write(b"junk")
+            self.assertRaises(ValueError, TxBatch.load, path)
+
+    def test_lazy_blocks(self):
+        blocks = make_blocks()
+        lazy_blocks = [
+            network.block.from_buffer(b.as_bin(), lazy=True, check_merkle_hash=False)[0]
+            for b in blocks
+        ]
+        self.check_batch(TxBatch.from_blocks(lazy_blocks, network.contract), blocks)
+
+    @unittest.skipIf(numpy is None, "numpy is not installed")
+    def test_to_numpy(self):
+        blocks = make_blocks()
+        batch = TxBatch.from_blocks(blocks, network.contract)
+        a = batch.to_numpy()
+        self.assertEqual(a["tx_hash"].shape, (18, 32))
+        self.assertEqual(bytes(a["tx_hash"][4]), blocks[1].txs[3].hash())
+        self.assertEqual(int(a["value"].sum()), sum(batch.value))
@@ -1,10 +1,15 @@
 import binascii
+import io
+import pickle
+import struct
 import unittest
 
-from pycoin.encoding.hexbytes import b2h, h2b_rev
+from pycoin.encoding.hexbytes import b2h, h2b, h2b_rev
 from pycoin.symbols.btc import network
 
 Tx = network.tx
+TxIn = network.tx.TxIn
+TxOut = network.tx.TxOut
 
 TX_E1A18B843FC420734DEEB68FF6DF041A2585E1A0D7DBF3B82AAB98291A6D9952_HEX = (
     "0100000001a8f57056b016d7d243fc0fc2a73f9146e7e4c7766ec6033b5ac4cb89c64e"
@@ -72,6 +77,153 @@ class TxTest(unittest.TestCase):
             "c91910058722f1c0f52fc5c734939053c9b87882a9c72b609f21632e0bd13751",
         )
 
+    def test_from_buffer(self):
+        segwit_hex = (
+            "01000000000102fff7f7881a8099afa6940d42d1e7f6362bec38171ea3edf433541db4"
+            "e4ad969f00000000494830450221008b9d1dc26ba6a9cb62127b02742fa9d754cd3beb"
+            "f337f7a55d114c8e5cdd30be022040529b194ba3f9281a99f2b1c0a19c0489bc22ede9"
+            "44ccf4ecbab4cc618ef3ed01eeffffffef51e1b804cc89d182d279655c3aa89e815b1b"
+            "309fe287d9b2b55d57b90ec68a0100000000ffffffff02202cb206000000001976a914"
+            "8280b37df378db99f66f85c95a783a76ac7a6d5988ac9093510d000000001976a9143b"
+            "de42dbee7e4dbe6a21b2d50ce2f0167faa815988ac000247304402203609e17b84f6a7"
+            "d30c80bfa610b5b4542f32a8a0d5447a12fb1366d7f01cc44a0220573a954c45183315"
+            "61406f90300e8f3358f51928d43c212a8caed02de67eebee0121025476c2e83188368d"
+            "a1ff3e292e7acafcdb3566bb0ad253f62fc70f07aeee635711000000"
+        )
+        for tx_hex in [
+            TX_E1A18B843FC420734DEEB68FF6DF041A2585E1A0D7DBF3B82AAB98291A6D9952_HEX,
+            segwit_hex,
+        ]:
+            blob = h2b(tx_hex)
+            buf = bytearray(b"junk" + blob + b"more junk")
+            tx, end = Tx.from_buffer(memoryview(buf), 4)
+            self.assertEqual(end, 4 + len(blob))
+            self.assertEqual(tx.as_bin(), blob)
+            tx1 = Tx.parse(io.BytesIO(blob))
+            self.assertEqual(tx.id(), tx1.id())
+            self.assertEqual(tx.w_id(), tx1.w_id())
+            for tx_in, tx_in1 in zip(tx.txs_in, tx1.txs_in):
+                self.assertEqual(type(tx_in.previous_hash), type(tx_in1.previous_hash))
+                self.assertEqual(type(tx_in.script), bytes)
+                self.assertEqual(tx_in.witness, tx_in1.witness)
+        # a non-canonical flag isn't kept in the serialization
+        blob = bytearray(h2b(segwit_hex))
+        blob[5] = 3
+        tx, end = Tx.from_buffer(bytes(blob))
+        self.assertEqual(tx.as_bin(), h2b(segwit_hex))
+        self.assertEqual(tx.w_id(), Tx.from_hex(segwit_hex).w_id())
+        with self.assertRaises(struct.error):
+            Tx.from_buffer(h2b(segwit_hex)[:-2])
+        with self.assertRaises(ValueError):
+            Tx.from_buffer(h2b("010000000000"))
+
+    def test_cached_serialization(self):
+        blob = h2b(
+            TX_E1A18B843FC420734DEEB68FF6DF041A2585E1A0D7DBF3B82AAB98291A6D9952_HEX
+        )
+        tx = Tx.from_bin(blob)
+
+        def check(tx):
+            # compare to a fresh tx built from the same fields
+            tx1 = Tx(
+                tx.version,
+                [
+                    TxIn(t.previous_hash, t.previous_index, t.script, t.sequence)
+                    for t in tx.txs_in
+                ],
+                [TxOut(t.coin_value, bytes(t.script)) for t in tx.txs_out],
+                tx.lock_time,
+            )
+            for t, t1 in zip(tx.txs_in, tx1.txs_in):
+                t1.witness = list(t.witness)
+            self.assertEqual(tx.as_bin(), tx1.as_bin())
+            self.assertEqual(tx.id(), tx1.id())
+            self.assertEqual(tx.w_id(), tx1.w_id())
+            self.assertEqual(tx.hash(hash_type=1), tx1.hash(hash_type=1))
+
+        self.assertEqual(tx.as_bin(), blob)
+        self.assertIs(tx.as_bin(), tx.as_bin())
+        self.assertIs(tx.hash(), tx.hash())
+        h = tx.hash()
+        check(tx)
+
+        tx.txs_in[0].script = b""
+        self.assertNotEqual(tx.hash(), h)
+        check(tx)
+        tx.txs_out[0].coin_value += 1
+        check(tx)
+        tx.txs_out.append(TxOut(1000, b"\x51"))
+        check(tx)
+        tx.txs_in.append(TxIn(b"\1" * 32, 0))
+        check(tx)
+        del tx.txs_in[1:]
+        check(tx)
+        tx.lock_time = 1000
+        check(tx)
+
+        # witness data changes the wtxid but not the txid
+        h, w_h = tx.hash(), tx.w_hash()
+        self.assertEqual(h, w_h)
+        tx.set_witness(0, [b"foo"])
+        self.assertEqual(tx.hash(), h)
+        self.assertNotEqual(tx.w_hash(), w_h)
+        check(tx)
+        tx.txs_in[0].witness = [b"foo"]
+        tx.txs_in[0].witness.append(b"bar")
+        check(tx)
+
+        # a buffer changed in place can't be noticed without mark_dirty
+        tx.txs_out[0].script = bytearray(b"\x51")
+        bin1 = tx.as_bin()
+        tx.txs_out[0].script[0] = 0x52
+        self.assertEqual(tx.as_bin(), bin1)
+        tx.mark_dirty()
+        self.assertNotEqual(tx.as_bin(), bin1)
+        check(tx)
+
+    def test_sizes(self):
+        tx = Tx.from_hex(
+            TX_E1A18B843FC420734DEEB68FF6DF041A2585E1A0D7DBF3B82AAB98291A6D9952_HEX
+        )
+        size = len(tx.as_bin())
+        self.assertEqual(tx.sizes(), (size, size))
+        self.assertEqual((tx.weight(), tx.vsize()), (4 * size, size))
+
+        tx.set_witness(0, [b"\1" * 72, b"\2" * 33])
+        tx.txs_out.append(TxOut(1, b"\3" * 300))
+        size = len(tx.as_bin())
+        stripped_size = len(tx.as_bin(include_witness_data=False))
+        self.assertEqual(size, stripped_size + 2 + 1 + 73 + 34)
+        self.assertEqual(tx.size(), size)
+        self.assertEqual(tx.stripped_size(), stripped_size)
+        self.assertEqual(tx.weight(), 3 * stripped_size + size)
+        self.assertEqual(tx.vsize(), (3 * stripped_size + size + 3) // 4)
+
+    def test_slots(self):
+        tx = Tx.from_hex(
+            TX_E1A18B843FC420734DEEB68FF6DF041A2585E1A0D7DBF3B82AAB98291A6D9952_HEX
+        )
+        spendable = tx.tx_outs_as_spendable()[0]
+        block = network.block(1, b"\0" * 32, b"\0" * 32, 0, 0, 0)
+        for obj in [tx.txs_in[0], tx.txs_out[0], spendable, block]:
+            self.assertFalse(hasattr(obj, "__dict__"))
+        self.assertRaises(AttributeError, setattr, spendable, "foo", 1)
+
+        # inputs without witness data share one immutable empty witness
+        tx_in = TxIn(b"\0" * 32, 0)
+        self.assertIs(tx_in.witness, tx.txs_in[0].witness)
+        self.assertEqual(tx_in.witness, ())
+
+        # dynamic attributes set by block sources still work
+        block.height = 100
+        block.index = 3
+        self.assertEqual((block.height, block.index), (100, 3))
+
+        tx_out = pickle.loads(pickle.dumps(tx.txs_out[0]))
+        self.assertEqual(tx_out.as_bin(), tx.txs_out[0].as_bin())
+        spendable_copy = pickle.loads(pickle.dumps(spendable))
+        self.assertEqual(spendable_copy.as_dict(), spendable.as_dict())
+
     def test_issue_39(self):
         """
         See https://github.com/richardkiss/pycoin/issues/39 and
@@ -62,6 +62,36 @@ class SpendTest(unittest.TestCase):
                     tx.txs_out[i].coin_value, (COIN_VALUE - FEE) // count + extra
                 )
 
+    def test_estimated_sizes(self):
+        keys = [network.keys.private(i) for i in range(1, 4)]
+        scripts = [
+            network.contract.for_p2pkh(keys[0].hash160()),
+            network.contract.for_p2pkh_wit(keys[1].hash160()),
+            network.contract.for_p2pk(keys[2].sec()),
+        ]
+        spendables = [
+            Spendable(100000, script, FAKE_HASH, idx)
+            for idx, script in enumerate(scripts)
+        ]
+        tx = network.tx_utils.create_tx(spendables, BITCOIN_ADDRESSES[:2], fee=1000)
+        estimated_sizes = network.tx_utils.estimated_sizes(tx)
+        estimated_vsize = network.tx_utils.estimated_vsize(tx)
+        keychain = network.keychain()
+        keychain.add_secrets(keys)
+        tx.sign(keychain)
+        self.assertEqual(tx.bad_solution_count(), 0)
+        stripped_size, size = tx.sizes()
+        # signatures are sometimes a byte shorter than the estimate
+        self.assertTrue(0 <= estimated_sizes[0] - stripped_size <= 2)
+        self.assertTrue(0 <= estimated_sizes[1] - size <= 3)
+        self.assertTrue(0 <= estimated_vsize - tx.vsize() <= 2)
+        # signed inputs are counted as they are
+        self.assertEqual(network.tx_utils.estimated_sizes(tx), (stripped_size, size))
+
+        tx.txs_in[0].script = b""
+        tx.unspents[0] = Spendable(1, b"\x6a", FAKE_HASH, 0)
+        self.assertRaises(ValueError, network.tx_utils.estimated_sizes, tx)
+
     def test_confirm_input(self):
         # create a fake Spendable
         COIN_VALUE = 100000000
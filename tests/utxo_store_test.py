@@ -0,0 +1,185 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from pycoin.blockchain.BlockChain import BlockChain
+from pycoin.blockchain.UTXOStore import UTXOEntry, UTXOStore
+from pycoin.coins.bitcoin.BlockValidator import BlockValidator
+from pycoin.coins.exceptions import BlockValidationError
+from pycoin.merkle import merkle
+from pycoin.encoding.hash import double_sha256
+from pycoin.symbols.btc import network
+
+
+ZERO32 = b"\0" * 32
+SCRIPT = network.contract.for_address("1KissFDVu2wAYWPRm4UGh5ZCDU9sE9an8T")
+
+
+def make_block(previous_block_hash, index, spends=()):
+    """A block with a coinbase and a tx for each (tx_hash, tx_out_index, coin_value) in spends."""
+    coinbase = network.tx.coinbase_tx(b"\2" * 33, 5000, index.to_bytes(4, "little"))
+    coinbase.txs_out.append(network.tx.TxOut(0, network.contract.for_nulldata(b"hi")))
+    txs = [coinbase]
+    for tx_hash, tx_out_index, coin_value in spends:
+        tx_in = network.tx.TxIn(tx_hash, tx_out_index)
+        tx_outs = [
+            network.tx.TxOut(coin_value // 2, SCRIPT),
+            network.tx.TxOut(coin_value - coin_value // 2, SCRIPT),
+        ]
+        txs.append(network.tx(1, [tx_in], tx_outs))
+    merkle_root = merkle([tx.hash() for tx in txs], double_sha256)
+    block = network.block(1, previous_block_hash, merkle_root, index, 0x207FFFFF, 0)
+    block.set_txs(txs)
+    return block
+
+
+def make_chain(count, previous_block_hash=ZERO32, tag=0):
+    blocks = []
+    for index in range(count):
+        spends = []
+        if blocks:
+            # spend the coinbase of the previous block
+            spends.append((blocks[-1].txs[0].hash(), 0, 5000))
+        if len(blocks) > 1:
+            # and an output of a tx in the block before that
+            spends.append((blocks[-1].txs[1].hash(), 1, 2500))
+        block = make_block(previous_block_hash, index + tag, spends)
+        previous_block_hash = block.hash()
+        blocks.append(block)
+    return blocks
+
+
+def snapshot(store):
+    c = store.db.execute("select * from UTXO order by tx_hash, tx_out_index")
+    return c.fetchall()
+
+
+class UTXOStoreTest(unittest.TestCase):
+    def test_apply_and_undo(self):
+        blocks = make_chain(5)
+        store = UTXOStore(max_dirty=4)
+        states = []
+        for height, block in enumerate(blocks):
+            store.flush()
+            states.append(snapshot(store))
+            store.apply_block(block, height)
+        self.assertEqual(store.tip(), (4, blocks[-1].hash()))
+
+        coinbase = blocks[-1].txs[0]
+        self.assertEqual(
+            store.get_entry(coinbase.hash(), 0),
+            UTXOEntry(5000, coinbase.txs_out[0].script, 4, True),
+        )
+        # OP_RETURN outputs aren't stored
+        self.assertIsNone(store.get_entry(coinbase.hash(), 1))
+        self.assertNotIn((blocks[0].txs[0].hash(), 0), store)
+        # each block adds a coinbase output, and each tx spends one output and adds two
+        self.assertEqual(len(store), 5 + 4 + 3)
+
+        tx_outs = store.get_utxos([(coinbase.hash(), 0), (ZERO32, 0)])
+        self.assertEqual(tx_outs[0].coin_value, 5000)
+        self.assertIsNone(tx_outs[1])
+        tx = network.tx(1, [network.tx.TxIn(coinbase.hash(), 0)], [])
+        tx.unspents_from_db(store)
+        self.assertEqual(tx.unspents[0].script, coinbase.txs_out[0].script)
+        self.assertRaises(KeyError, tx.unspents_from_db, UTXOStore())
+        tx.unspents_from_db(UTXOStore(), ignore_missing=True)
+        self.assertEqual(tx.unspents, [None])
+
+        for height in reversed(range(len(blocks))):
+            store.undo_block(blocks[height].hash())
+            store.flush()
+            self.assertEqual(snapshot(store), states[height])
+        self.assertIsNone(store.tip())
+        self.assertRaises(ValueError, store.undo_block, blocks[0].hash())
+
+    def test_undo_in_block_spend(self):
+        blocks = make_chain(1)
+        block = make_block(blocks[0].hash(), 1, [(blocks[0].txs[0].hash(), 0, 5000)])
+        t1 = block.txs[1]
+        # t2 spends t1:0 in the same block
+        t2 = network.tx(
+            1, [network.tx.TxIn(t1.hash(), 0)], [network.tx.TxOut(2500, SCRIPT)]
+        )
+        txs = block.txs + [t2]
+        block.merkle_root = merkle([tx.hash() for tx in txs], double_sha256)
+        block.set_txs(txs)
+
+        store = UTXOStore()
+        store.apply_block(blocks[0], 0)
+        store.flush()
+        before = snapshot(store)
+        store.apply_block(block, 1)
+        self.assertNotIn((t1.hash(), 0), store)
+        self.assertIn((t1.hash(), 1), store)
+        self.assertIn((t2.hash(), 0), store)
+        store.undo_block(block.hash())
+        self.assertNotIn((t1.hash(), 0), store)
+        store.flush()
+        self.assertEqual(snapshot(store), before)
+
+    def test_bad_blocks(self):
+        blocks = make_chain(3)
+        store = UTXOStore()
+        store.apply_block(blocks[0], 0)
+        self.assertRaises(ValueError, store.apply_block, blocks[2], 2)
+        self.assertRaises(ValueError, store.undo_block, blocks[1].hash())
+        store.apply_block(blocks[1], 1)
+        bad = make_block(blocks[1].hash(), 2, [(blocks[0].txs[0].hash(), 0, 5000)])
+        before = dict(store._dirty)
+        self.assertRaises(KeyError, store.apply_block, bad, 2)
+        self.assertEqual(store._dirty, before)
+        store.apply_block(blocks[2], 2)
+
+    def test_persistence(self):
+        blocks = make_chain(4)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "utxo.db")
+            store = UTXOStore(sqlite3.connect(path), undo_depth=2)
+            for height, block in enumerate(blocks):
+                store.apply_block(block, height)
+            store.flush()
+            store.db.close()
+
+            store = UTXOStore(sqlite3.connect(path), undo_depth=2)
+            self.assertEqual(store.tip(), (3, blocks[-1].hash()))
+            self.assertEqual(store.dirty_count(), 0)
+            heights = [r[0] for r in store.db.execute("select height from UTXOUndo")]
+            self.assertEqual(heights, [2, 3])
+            store.undo_block(blocks[3].hash())
+            store.undo_block(blocks[2].hash())
+            # undo data beyond undo_depth is gone
+            self.assertRaises(ValueError, store.undo_block, blocks[1].hash())
+            store.db.close()
+
+    def test_validator(self):
+        blocks = make_chain(3)
+        store = UTXOStore()
+        store.apply_block(blocks[0], 0)
+        store.apply_block(blocks[1], 1)
+        validator = BlockValidator(store, check_pow=False, check_bip30=False)
+        self.assertRaises(BlockValidationError, validator.validate, blocks[2], 2)
+        # the scripts don't validate, but the outputs are found
+        self.assertEqual(blocks[2].txs[1].unspents[0].coin_value, 5000)
+
+    def test_block_chain_callback(self):
+        blocks = make_chain(4)
+        fork = make_chain(3, blocks[1].hash(), tag=100)
+        store = UTXOStore()
+        block_chain = BlockChain(ZERO32)
+        block_chain.add_change_callback(store)
+        block_chain.add_headers(blocks)
+        self.assertEqual(store.tip(), (3, blocks[3].hash()))
+        self.assertEqual(store.dirty_count(), 0)
+        expected = UTXOStore()
+        for height, block in enumerate(blocks[:2] + fork):
+            expected.apply_block(block, height)
+        expected.flush()
+        block_chain.add_headers(fork)
+        self.assertEqual(store.tip(), (4, fork[-1].hash()))
+        self.assertEqual(snapshot(store), snapshot(expected))
+
+
+if __name__ == "__main__":
+    unittest.main()